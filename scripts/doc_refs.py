@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Inverted index of RQ-/CD-/PD- references across docs/
+
+One pass over every markdown file under docs/ records each identifier
+mention with the file, the heading whose section contains it and its byte
+offset. The index is persisted in .cache/doc_refs_index.json with each file's
+mtime and size; update() rescans only files that changed, were added or were
+removed, so a warm load costs a stat() per file.
+
+Compound mentions are expanded: "RQ-048a/b" is indexed under RQ-048a, RQ-048b
+and RQ-048, and "RQ-010cdf" under RQ-010c, RQ-010d, RQ-010f and RQ-010, so a
+lookup of the parent question finds its sub-questions too.
+
+Lookups are dict hits on the in-memory index; context() then reads just the
+text around a mention from disk (a seek and a short read). Each section also
+carries a content hash, so changed_refs() can tell which identifiers an edit
+actually touched. Generated output (docs/CORE/implementation_actions) is not
+indexed, so generated files never quote each other.
+
+    from doc_refs import DocRefIndex
+    index = DocRefIndex.load()
+    for ref in index.lookup("RQ-019"):
+        print(ref.path, ref.heading)
+        print(index.context(ref))
+
+Usage:
+    python3 scripts/doc_refs.py RQ-019 CD-015
+    python3 scripts/doc_refs.py --stats
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DOCS_DIR = REPO_ROOT / "docs"
+CACHE_PATH = REPO_ROOT / ".cache" / "doc_refs_index.json"
+INDEX_VERSION = 2
+# Directories of generated files, skipped when indexing
+GENERATED_DIRS = {"implementation_actions"}
+
+REF_PATTERN = re.compile(rb"\b(RQ|CD|PD)-(\d+)((?:[a-z]+)(?:/[a-z]+)*)?\b")
+HEADING_PATTERN = re.compile(rb"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+
+# Where context is most useful, best first; anything else ranks after these
+SOURCE_RANK = (
+    ("RECONCILIATION_", 0),
+    ("IMPACT_ANALYSIS", 1),
+    ("/decisions/", 2),
+    ("IMPLEMENTATION_ACTIONS", 3),
+    ("/index/", 4),
+)
+ARCHIVE_RANK = 9
+
+
+def expand_ref(prefix, number, suffix):
+    """Identifiers a single mention should be indexed under."""
+    base = f"{prefix}-{number}"
+    if not suffix:
+        return [base]
+    letters = [c for part in suffix.split("/") for c in part]
+    return [f"{base}{c}" for c in letters] + [base]
+
+
+def find_refs(text):
+    """Identifiers as specifically as they are written: "RQ-048a/b, CD-015" -> RQ-048a, RQ-048b, CD-015."""
+    ids = []
+    for match in REF_PATTERN.finditer(text.encode() if isinstance(text, str) else text):
+        suffix = match.group(3).decode() if match.group(3) else ""
+        expanded = expand_ref(match.group(1).decode(), match.group(2).decode(), suffix)
+        ids += expanded[:-1] if suffix else expanded
+    return list(dict.fromkeys(ids))
+
+
+def normalise_ref(ref_id):
+    """Upper-case the prefix and keep the sub-question letter lower-case: "rq-048A" -> "RQ-048a"."""
+    prefix, _, rest = ref_id.partition("-")
+    return f"{prefix.upper()}-{rest.lower()}"
+
+
+def scan_file(raw):
+    """Return (sections, mentions) for one markdown file.
+
+    sections: [start, end, level, title, digest] byte ranges, each running to
+    the next heading of the same or a higher level; headings inside code
+    fences are ignored. mentions: [ref_id, section_index, offset]; section_index -1
+    means the mention precedes the first heading.
+    """
+    headings = []
+    in_fence = False
+    offset = 0
+    for line in raw.splitlines(keepends=True):
+        stripped = line.lstrip()
+        if stripped.startswith(b"```") or stripped.startswith(b"~~~"):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = HEADING_PATTERN.match(line.rstrip(b"\r\n"))
+            if match:
+                headings.append([offset, len(match.group(1)), match.group(2).decode("utf-8", "replace")])
+        offset += len(line)
+
+    sections = []
+    for i, (start, level, title) in enumerate(headings):
+        end = len(raw)
+        for next_start, next_level, _ in headings[i + 1:]:
+            if next_level <= level:
+                end = next_start
+                break
+        sections.append([start, end, level, title, hashlib.blake2b(raw[start:end], digest_size=8).hexdigest()])
+
+    mentions = []
+    seen = set()
+    section = -1
+    starts = [s[0] for s in sections]
+    for match in REF_PATTERN.finditer(raw):
+        pos = match.start()
+        while section + 1 < len(starts) and starts[section + 1] <= pos:
+            section += 1
+        suffix = match.group(3).decode() if match.group(3) else ""
+        for ref_id in expand_ref(match.group(1).decode(), match.group(2).decode(), suffix):
+            # One posting per identifier per section is enough for context
+            if (ref_id, section) not in seen:
+                seen.add((ref_id, section))
+                mentions.append([ref_id, section, pos])
+    return sections, mentions
+
+
+def changed_refs(old, new):
+    """Identifiers whose referencing sections differ between two scans of a file (either may be None)."""
+    def keyed(entry):
+        refs = {}
+        for ref_id, section, offset in entry["mentions"] if entry else ():
+            # Mentions before the first heading have no section hash; key them by position
+            refs.setdefault(ref_id, set()).add(entry["sections"][section][4] if section >= 0 else offset)
+        return refs
+
+    before, after = keyed(old), keyed(new)
+    return {ref_id for ref_id in before.keys() | after.keys() if before.get(ref_id) != after.get(ref_id)}
+
+
+class Ref:
+    __slots__ = ("path", "heading", "level", "start", "end", "offset", "rank")
+
+    def __init__(self, path, section, offset, rank):
+        self.path = path
+        self.heading, self.level = (section[3], section[2]) if section else (None, 0)
+        self.start, self.end = (section[0], section[1]) if section else (0, None)
+        self.offset = offset
+        self.rank = rank
+
+    def __repr__(self):
+        return f"Ref({self.path!r}, {self.heading!r}, offset={self.offset})"
+
+
+def source_rank(path):
+    if "/archive/" in f"/{path}":
+        return ARCHIVE_RANK
+    for marker, rank in SOURCE_RANK:
+        if marker in f"/{path}":
+            return rank
+    return len(SOURCE_RANK)
+
+
+class DocRefIndex:
+    """Identifier -> references, rebuilt incrementally from per-file scans."""
+
+    def __init__(self, root=DOCS_DIR, cache_path=CACHE_PATH):
+        self.root = Path(root)
+        self.cache_path = Path(cache_path)
+        # rel path -> {"mtime_ns", "size", "sections", "mentions"}
+        self.files = {}
+        self.refs = {}
+
+    @classmethod
+    def load(cls, root=DOCS_DIR, cache_path=CACHE_PATH, update=True):
+        index = cls(root, cache_path)
+        try:
+            cached = json.loads(index.cache_path.read_text())
+            if cached.get("version") == INDEX_VERSION and cached.get("root") == str(index.root):
+                index.files = cached["files"]
+        except (OSError, ValueError):
+            pass
+        if update:
+            index.update()
+        else:
+            index._rebuild()
+        return index
+
+    def _walk(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if d not in GENERATED_DIRS)
+            for name in sorted(filenames):
+                if name.endswith(".md"):
+                    path = os.path.join(dirpath, name)
+                    yield os.path.relpath(path, self.root).replace(os.sep, "/"), os.stat(path)
+
+    def update(self):
+        """Rescan changed, added and removed files; returns the changed relative paths."""
+        changed = []
+        present = set()
+        for rel, stat in self._walk():
+            present.add(rel)
+            entry = self.files.get(rel)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                continue
+            raw = (self.root / rel).read_bytes()
+            sections, mentions = scan_file(raw)
+            self.files[rel] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                               "sections": sections, "mentions": mentions}
+            changed.append(rel)
+        for rel in set(self.files) - present:
+            del self.files[rel]
+            changed.append(rel)
+
+        if changed or not self.refs:
+            self._rebuild()
+        if changed:
+            self.save()
+        return changed
+
+    def _rebuild(self):
+        refs = {}
+        for rel, entry in self.files.items():
+            for ref_id, section, offset in entry["mentions"]:
+                refs.setdefault(ref_id, []).append((rel, section, offset))
+        self.refs = refs
+
+    def save(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"version": INDEX_VERSION, "root": str(self.root), "files": self.files}))
+        os.replace(tmp_path, self.cache_path)
+
+    def lookup(self, ref_id):
+        """References to ref_id, best sources first (reconciliation docs, then impact analyses, ...)."""
+        ref_id = normalise_ref(ref_id)
+        result = []
+        for rel, section, offset in self.refs.get(ref_id, ()):
+            sections = self.files[rel]["sections"]
+            heading = sections[section] if section >= 0 else None
+            rank = source_rank(rel)
+            if heading and heading[2] == 1:
+                rank += 0.25  # a document-wide section is mostly preamble
+            elif heading and re.search(rf"(?<![\w-]){re.escape(ref_id)}(?![\w-])", heading[3]):
+                rank -= 0.5  # a section titled with the identifier is where it is defined
+            result.append(Ref(rel, heading, offset, rank))
+        result.sort(key=lambda r: (r.rank, r.path, r.offset))
+        return result
+
+    def files_referencing(self, ref_id):
+        return {rel for rel, _, _ in self.refs.get(normalise_ref(ref_id), ())}
+
+    def context(self, ref, limit=500):
+        """Up to limit characters of ref's section around the mention, heading line excluded.
+
+        The mention sits about a third of the way in, so the lines leading up to
+        it are kept too; near the start or end of the section the window shifts.
+        """
+        span = limit * 4  # bytes; a UTF-8 character is at most 4
+        lo = max(ref.start, ref.offset - span)
+        hi = ref.offset + span if ref.end is None else min(ref.end, ref.offset + span)
+        with open(self.root / ref.path, "rb") as f:
+            f.seek(lo)
+            raw = f.read(hi - lo)
+        anchor = ref.offset - lo
+        if ref.heading is not None and lo == ref.start:
+            # A mention in the heading itself anchors at the start of the body
+            body = raw.find(b"\n") + 1 or len(raw)
+            raw, anchor = raw[body:], max(anchor - body, 0)
+        before = raw[:anchor].decode("utf-8", "ignore")
+        after = raw[anchor:].decode("utf-8", "ignore")[:limit - min(len(before), limit // 3)]
+        keep = min(len(before), limit - len(after))
+        lead = before[len(before) - keep:]
+        if keep < len(before) and "\n" in lead:
+            lead = lead.partition("\n")[2]  # start on a whole line
+        return (lead + after).strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up RQ/CD/PD references across docs/")
+    parser.add_argument("ids", nargs="*", help="e.g. RQ-019 CD-015 PD-116")
+    parser.add_argument("--limit", type=int, default=10, help="references shown per identifier")
+    parser.add_argument("--context", type=int, default=0, help="characters of section context to show")
+    parser.add_argument("--stats", action="store_true", help="show index size and load time")
+    args = parser.parse_args()
+    if not args.ids and not args.stats:
+        parser.error("give identifiers to look up, or --stats")
+
+    start = time.perf_counter()
+    index = DocRefIndex.load()
+    load_ms = (time.perf_counter() - start) * 1000
+    if args.stats:
+        postings = sum(len(v) for v in index.refs.values())
+        print(f"{len(index.files)} files, {len(index.refs)} identifiers, {postings} references; "
+              f"loaded in {load_ms:.1f}ms")
+
+    for ref_id in args.ids:
+        start = time.perf_counter()
+        refs = index.lookup(ref_id)
+        lookup_us = (time.perf_counter() - start) * 1e6
+        print(f"\n{normalise_ref(ref_id)}: {len(refs)} references ({lookup_us:.0f}µs)")
+        for ref in refs[:args.limit]:
+            print(f"  {ref.path} › {ref.heading or '(top)'}")
+            if args.context:
+                print("    " + index.context(ref, args.context).replace("\n", "\n    "))
+    if args.ids and not any(index.lookup(ref_id) for ref_id in args.ids):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
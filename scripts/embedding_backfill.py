@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Bulk embedding backfill for evidence_logs and conversation_turns
+
+Streams rows that have no embedding yet, derives the text the app would have
+embedded, embeds it in batches and writes the vectors back:
+
+    source ──batches──▶ embedder pool ──in order──▶ writer ──▶ checkpoint
+
+- Sources: a Postgres connection (--dsn), paged by keyset on the primary key
+  (WHERE embedding IS NULL AND id > last ORDER BY id LIMIT n), or a JSONL
+  export (--jsonl) with one row per line, paged by byte offset.
+- Text: evidence rows use the same "event | habit: … | feeling: …" format as
+  EmbeddingService._buildSearchableText and conversation turns use
+  "User: … | AI: …", so backfilled vectors sit in the same space as the ones
+  the app writes live. (On evidence_logs, the generate_searchable_text trigger
+  still rewrites the searchable_text column on UPDATE, as it does for the app.)
+- Embedders: "gemini" calls batchEmbedContents with text-embedding-004 at 768
+  dims; "hash" is a deterministic local stand-in (signed feature hashing, so
+  texts sharing words get similar vectors) for tests and dry runs; any
+  "module:factory" returning an object with embed(texts) -> (n, dim) also works.
+- Sinks: Postgres COPYs each batch into a temp table, then runs one
+  UPDATE … FROM. That skips rows the app embedded in the meantime. A JSONL
+  sink (--out) writes id/searchable_text/embedding lines in the pgvector
+  string format.
+
+At most --max-in-flight batches are embedded ahead of the writer, so memory
+stays bounded and a slow sink applies back-pressure to the reader. After each
+batch is written, its source key (and the JSONL sink's size) is saved
+atomically in the checkpoint, so an interrupted run resumes where it stopped
+and never writes a row twice: a resumed JSONL sink is truncated back to the
+checkpointed size first (and refused if it is missing or shorter than that).
+
+Usage:
+    python3 scripts/embedding_backfill.py evidence_logs --dsn "$DATABASE_URL" --embedder gemini
+    python3 scripts/embedding_backfill.py conversation_turns --jsonl turns.jsonl --out turns_embedded.jsonl
+    python3 scripts/embedding_backfill.py evidence_logs --jsonl logs.jsonl --out out.jsonl --standin-latency-ms 150 --workers 8
+    python3 scripts/embedding_backfill.py evidence_logs --jsonl logs.jsonl --dry-run
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CHECKPOINT_DIR = REPO_ROOT / ".cache" / "embedding_backfill"
+
+# Must match EmbeddingService and the vector(768) columns in 20260105_vector_memory.sql
+EMBEDDING_MODEL = "text-embedding-004"
+EMBEDDING_DIM = 768
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:batchEmbedContents"
+# batchEmbedContents accepts at most this many texts per call
+GEMINI_MAX_BATCH = 100
+RETRY_STATUS = (429, 500, 502, 503, 504)
+NIL_UUID = "00000000-0000-0000-0000-000000000000"
+
+
+def _dart_str(value):
+    """A JSON value as Dart string interpolation renders it (true, null, {a: 1})."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{k}: {_dart_str(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, list):
+        return "[" + ", ".join(_dart_str(v) for v in value) + "]"
+    return str(value)
+
+
+def evidence_text(row):
+    """Mirror of EmbeddingService._buildSearchableText."""
+    payload = row.get("payload") or {}
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    parts = [row["event_type"]]
+    for key, label in (("habit_id", "habit"), ("emotion", "feeling"), ("app_name", "app"),
+                       ("completed_at", "completed at"), ("arm_id", "intervention")):
+        if key in payload:
+            parts.append(f"{label}: {_dart_str(payload[key])}")
+    if "engaged" in payload:
+        parts.append("user engaged" if payload["engaged"] is True else "user ignored")
+    if "habit_completed" in payload:
+        parts.append("habit done" if payload["habit_completed"] is True else "habit skipped")
+    return " | ".join(parts)
+
+
+def turn_text(row):
+    """Mirror of EmbeddingService.embedConversationTurn."""
+    return f"User: {row['user_transcript']} | AI: {row['ai_response']}"
+
+
+# columns read from the source, text derivation, and whether the table has searchable_text
+TABLES = {
+    "evidence_logs": {"columns": ("id", "event_type", "payload"), "text": evidence_text,
+                      "searchable_text": True},
+    "conversation_turns": {"columns": ("id", "user_transcript", "ai_response"), "text": turn_text,
+                           "searchable_text": False},
+}
+
+
+def format_vector(vector):
+    """pgvector text format, as embedForSupabase sends it: "[0.1,0.2,...]"."""
+    return "[" + ",".join(map(str, np.round(vector.astype(np.float64), 7).tolist())) + "]"
+
+
+# ---------------------------------------------------------------------------
+# Embedders
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=1 << 16)
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+
+class HashEmbedder:
+    """Deterministic stand-in: signed hashing of word unigrams and bigrams, L2-normalised.
+
+    The same text always gets the same vector, across runs and machines, and
+    texts that share words have positive cosine similarity. latency_ms adds a
+    sleep per call to stand in for the network round trip.
+    """
+
+    max_batch = 1000
+
+    def __init__(self, dim=EMBEDDING_DIM, latency_ms=0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+
+    def embed(self, texts):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        cells, signs = [], []
+        for i, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower()) or ["<empty>"]
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = _feature_hash(feature)
+                cells.append(i * self.dim + h % self.dim)
+                signs.append(1.0 if h >> 63 else -1.0)
+        vectors = np.bincount(cells, weights=signs, minlength=len(texts) * self.dim)
+        vectors = vectors.reshape(len(texts), self.dim).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1)
+        # Features can cancel out exactly; fall back to a fixed unit vector
+        vectors[norms == 0, 0] = 1.0
+        return vectors / np.where(norms == 0, 1.0, norms)[:, None]
+
+
+class GeminiEmbedder:
+    """batchEmbedContents over HTTPS, retrying rate limits and server errors with backoff."""
+
+    max_batch = GEMINI_MAX_BATCH
+
+    def __init__(self, api_key, model=EMBEDDING_MODEL, dim=EMBEDDING_DIM, retries=5, timeout=60):
+        self.url = GEMINI_URL.format(model=model)
+        self.model = f"models/{model}"
+        self.api_key = api_key
+        self.dim = dim
+        self.retries = retries
+        self.timeout = timeout
+
+    def embed(self, texts):
+        body = json.dumps({"requests": [
+            # No taskType: EmbeddingService doesn't set one, and the vectors must match its
+            {"model": self.model, "content": {"parts": [{"text": text}]}, "outputDimensionality": self.dim}
+            for text in texts
+        ]}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={
+            "Content-Type": "application/json", "x-goog-api-key": self.api_key})
+        for attempt in range(self.retries + 1):
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    result = json.load(response)
+                break
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRY_STATUS or attempt == self.retries:
+                    raise
+            except (urllib.error.URLError, TimeoutError):
+                if attempt == self.retries:
+                    raise
+            time.sleep(min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0))
+        return np.array([e["values"] for e in result["embeddings"]], dtype=np.float32)
+
+
+def make_embedder(spec, dim=EMBEDDING_DIM, api_key=None, latency_ms=0.0):
+    """"hash", "gemini" or "package.module:factory" (called with dim=)."""
+    if spec == "hash":
+        return HashEmbedder(dim, latency_ms)
+    if spec == "gemini":
+        if not api_key:
+            raise SystemExit("--embedder gemini needs --api-key or $GEMINI_API_KEY")
+        return GeminiEmbedder(api_key, dim=dim)
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise SystemExit(f"unknown embedder {spec!r}: use hash, gemini or module:factory")
+    return getattr(importlib.import_module(module), attr)(dim=dim)
+
+
+def embed_batch(embedder, texts, dim):
+    """Embed texts in calls of at most embedder.max_batch; returns (vectors, seconds)."""
+    start = time.perf_counter()
+    step = getattr(embedder, "max_batch", len(texts)) or len(texts)
+    vectors = np.concatenate([np.asarray(embedder.embed(texts[i:i + step]), dtype=np.float32)
+                              for i in range(0, len(texts), step)])
+    if vectors.shape != (len(texts), dim):
+        raise ValueError(f"embedder returned {vectors.shape}, expected ({len(texts)}, {dim})")
+    return vectors, time.perf_counter() - start
+
+
+# ---------------------------------------------------------------------------
+# Sources and sinks
+# ---------------------------------------------------------------------------
+
+def connect(dsn):
+    try:
+        import psycopg
+    except ImportError:
+        raise SystemExit("--dsn needs psycopg 3: pip install 'psycopg[binary]'")
+    return psycopg.connect(dsn)
+
+
+class JsonlSource:
+    """Rows from a JSONL export; the resume key is the byte offset after the batch."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def describe(self):
+        return f"jsonl:{self.path.resolve()}"
+
+    def batches(self, after, size, limit=None):
+        batch = []
+        remaining = limit
+        with open(self.path, "rb") as f:
+            f.seek(after or 0)
+            for line in iter(f.readline, b""):
+                if remaining == 0:
+                    break
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if row.get("embedding") is None:
+                    batch.append(row)
+                    remaining = remaining - 1 if remaining is not None else None
+                if len(batch) == size or (batch and remaining == 0):
+                    yield batch, f.tell()
+                    batch = []
+            if batch:
+                yield batch, f.tell()
+
+
+class PostgresSource:
+    """Rows still missing an embedding, paged by keyset on id (primary key index, no OFFSET)."""
+
+    def __init__(self, conn, table):
+        self.conn = conn
+        self.table = table
+        self.columns = TABLES[table]["columns"]
+
+    def describe(self):
+        info = self.conn.info
+        return f"postgres:{info.host}:{info.port}/{info.dbname}"
+
+    def batches(self, after, size, limit=None):
+        query = (f"SELECT {', '.join(self.columns)} FROM public.{self.table} "
+                 f"WHERE embedding IS NULL AND id > %s ORDER BY id LIMIT %s")
+        after = after or NIL_UUID
+        remaining = limit
+        while remaining != 0:
+            page = size if remaining is None else min(size, remaining)
+            with self.conn.cursor() as cur:
+                cur.execute(query, (after, page))
+                batch = [dict(zip(self.columns, row)) for row in cur.fetchall()]
+            # End the read transaction so no snapshot is held across the run
+            self.conn.commit()
+            if not batch:
+                return
+            after = str(batch[-1]["id"])
+            if remaining is not None:
+                remaining -= len(batch)
+            yield batch, after
+
+
+class JsonlSink:
+    """id / searchable_text / embedding lines; truncated to `position` so a resume never duplicates.
+
+    A resume needs the first `position` bytes the checkpoint vouches for; a
+    missing or shorter file would otherwise be padded with NULs, so it is refused.
+    """
+
+    def __init__(self, path, position=0):
+        self.path = Path(path)
+        size = self.path.stat().st_size if self.path.exists() else None
+        if position and (size is None or size < position):
+            found = "is missing" if size is None else f"has {size} bytes"
+            raise SystemExit(f"{self.path} {found} but the checkpoint expects {position}; "
+                             f"restore it, or pass --restart to start over")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "r+b" if self.path.exists() else "wb")
+        self.file.truncate(position)
+        self.file.seek(position)
+
+    def write(self, ids, texts, vectors):
+        lines = [json.dumps({"id": str(row_id), "searchable_text": text, "embedding": format_vector(vector)})
+                 for row_id, text, vector in zip(ids, texts, vectors)]
+        self.file.write(("\n".join(lines) + "\n").encode())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return len(lines)
+
+    def position(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class PostgresSink:
+    """COPY each batch into a temp table, then one UPDATE … FROM per batch."""
+
+    def __init__(self, conn, table):
+        self.conn = conn
+        self.table = table
+        self.searchable_text = TABLES[table]["searchable_text"]
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS embedding_backfill_stage "
+                        "(id uuid PRIMARY KEY, searchable_text text, embedding text) ON COMMIT DELETE ROWS")
+        conn.commit()
+
+    def write(self, ids, texts, vectors):
+        assignments = "embedding = s.embedding::vector"
+        if self.searchable_text:
+            assignments += ", searchable_text = s.searchable_text"
+        with self.conn.cursor() as cur:
+            with cur.copy("COPY embedding_backfill_stage (id, searchable_text, embedding) FROM STDIN") as copy:
+                for row_id, text, vector in zip(ids, texts, vectors):
+                    copy.write_row((str(row_id), text, format_vector(vector)))
+            # Rows the app embedded since they were read keep the app's vector
+            cur.execute(f"UPDATE public.{self.table} AS t SET {assignments} "
+                        f"FROM embedding_backfill_stage AS s WHERE t.id = s.id AND t.embedding IS NULL")
+            updated = cur.rowcount
+        self.conn.commit()
+        return updated
+
+    def position(self):
+        return None
+
+    def close(self):
+        self.conn.close()
+
+
+class Checkpoint:
+    """Last written source key per (table, source), saved atomically after every batch."""
+
+    def __init__(self, path, table, source):
+        self.path = Path(path)
+        self.table = table
+        self.source = source
+        self.key = None
+        self.rows = 0
+        self.sink_position = 0
+
+    def load(self):
+        try:
+            state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return self
+        if (state.get("table"), state.get("source")) != (self.table, self.source):
+            raise SystemExit(f"{self.path} is for {state.get('table')} from {state.get('source')}; "
+                             f"pass --restart or a different --checkpoint")
+        self.key, self.rows, self.sink_position = state["key"], state["rows"], state["sink_position"] or 0
+        return self
+
+    def save(self, key, rows, sink_position):
+        self.key, self.rows, self.sink_position = key, rows, sink_position
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"table": self.table, "source": self.source, "key": key,
+                                        "rows": rows, "sink_position": sink_position,
+                                        "saved_at": time.time()}))
+        os.replace(tmp_path, self.path)
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+def backfill(table, source, embedder, sink, checkpoint, batch_size=100, workers=4, max_in_flight=8,
+             limit=None, dim=EMBEDDING_DIM, progress_every=5.0, log=print):
+    """Run the pipeline until the source is exhausted (or `limit` rows); returns a stats dict.
+
+    The reader embeds batches on a pool of `workers` threads and hands them to
+    the writer thread through a queue of at most `max_in_flight` batches; the
+    writer writes them in source order and checkpoints after each one.
+    """
+    text_of = TABLES[table]["text"]
+    stats = {"read": 0, "written": 0, "batches": 0, "embed_s": 0.0, "write_s": 0.0,
+             "read_s": 0.0, "stall_s": 0.0}
+    handoff = queue.Queue(maxsize=max_in_flight)
+    failure = []
+    start = time.perf_counter()
+
+    def writer():
+        last_report = start
+        try:
+            while (item := handoff.get()) is not None:
+                ids, texts, future, key = item
+                vectors, embed_s = future.result()
+                write_start = time.perf_counter()
+                stats["written"] += sink.write(ids, texts, vectors)
+                stats["write_s"] += time.perf_counter() - write_start
+                stats["embed_s"] += embed_s
+                stats["batches"] += 1
+                checkpoint.save(key, checkpoint.rows + len(ids), sink.position())
+                now = time.perf_counter()
+                if progress_every and now - last_report >= progress_every:
+                    log(f"  {checkpoint.rows} rows, {stats['written'] / (now - start):.0f} rows/s, "
+                        f"{handoff.qsize()} batches in flight")
+                    last_report = now
+        except BaseException as e:
+            failure.append(e)
+            # Keep draining so the reader never blocks on a full queue
+            while handoff.get() is not None:
+                pass
+
+    thread = threading.Thread(target=writer, name="backfill-writer")
+    thread.start()
+    try:
+        with ThreadPoolExecutor(workers) as pool:
+            batches = source.batches(checkpoint.key, batch_size, limit)
+            while not failure:
+                read_start = time.perf_counter()
+                item = next(batches, None)
+                stats["read_s"] += time.perf_counter() - read_start
+                if item is None:
+                    break
+                rows, key = item
+                ids = [row["id"] for row in rows]
+                texts = [text_of(row) for row in rows]
+                stats["read"] += len(rows)
+                future = pool.submit(embed_batch, embedder, texts, dim)
+                stall_start = time.perf_counter()
+                handoff.put((ids, texts, future, key))
+                stats["stall_s"] += time.perf_counter() - stall_start
+    finally:
+        handoff.put(None)
+        thread.join()
+    if failure:
+        raise failure[0]
+    stats["elapsed_s"] = time.perf_counter() - start
+    return stats
+
+
+def print_report(table, stats, checkpoint, workers, log=print):
+    elapsed = stats["elapsed_s"]
+    batches = max(stats["batches"], 1)
+    log(f"\n✅ {table}: {stats['written']} rows written of {stats['read']} read in {elapsed:.1f}s "
+        f"({stats['read'] / max(elapsed, 1e-9):.0f} rows/s)")
+    log(f"   embed {stats['embed_s'] / batches * 1000:.0f}ms/batch on {workers} workers, "
+        f"write {stats['write_s'] / batches * 1000:.0f}ms/batch, "
+        f"read {stats['read_s'] / batches * 1000:.0f}ms/batch, reader stalled {stats['stall_s']:.1f}s")
+    if stats["read"] != stats["written"]:
+        log(f"⚠️ {stats['read'] - stats['written']} rows were embedded by someone else meanwhile and left as-is")
+    log(f"💾 {checkpoint.rows} rows done in total; checkpoint {checkpoint.path}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backfill embeddings for evidence_logs or conversation_turns")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("--dsn", help="Postgres connection string; the source unless --jsonl, the sink unless --out")
+    parser.add_argument("--jsonl", help="read rows from this JSONL export instead of Postgres")
+    parser.add_argument("--out", help="write id/searchable_text/embedding lines here instead of to Postgres")
+    parser.add_argument("--embedder", default="hash", help="hash, gemini or module:factory (default: hash)")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"),
+                        help="for --embedder gemini (default: $GEMINI_API_KEY)")
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--standin-latency-ms", type=float, default=0.0,
+                        help="sleep per call of the hash embedder, to stand in for the API round trip")
+    parser.add_argument("--batch-size", type=int, default=GEMINI_MAX_BATCH, help="rows per batch")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent embedding calls")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="batches embedded ahead of the writer")
+    parser.add_argument("--limit", type=int, help="stop after this many rows")
+    parser.add_argument("--checkpoint", help="default: .cache/embedding_backfill/<table>.json")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the beginning")
+    parser.add_argument("--progress", type=float, default=5.0, help="seconds between progress lines (0 for none)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="read rows and show the derived texts without embedding or writing")
+    args = parser.parse_args()
+    if not (args.dsn or args.jsonl):
+        parser.error("give a source: --dsn or --jsonl")
+    if not (args.dsn or args.out or args.dry_run):
+        parser.error("give a sink: --dsn or --out")
+    return args
+
+
+def main():
+    args = parse_args()
+    source = JsonlSource(args.jsonl) if args.jsonl else PostgresSource(connect(args.dsn), args.table)
+
+    if args.dry_run:
+        text_of = TABLES[args.table]["text"]
+        count = 0
+        for rows, _ in source.batches(None, args.batch_size, args.limit):
+            for row in rows:
+                if count < 5:
+                    print(f"{row['id']}: {text_of(row)}")
+                count += 1
+        print(f"\n{count} rows would be embedded")
+        return
+
+    checkpoint = Checkpoint(args.checkpoint or CHECKPOINT_DIR / f"{args.table}.json",
+                            args.table, source.describe())
+    if not args.restart:
+        checkpoint.load()
+        if checkpoint.key is not None:
+            print(f"Resuming {args.table} after {checkpoint.rows} rows")
+
+    embedder = make_embedder(args.embedder, args.dim, args.api_key, args.standin_latency_ms)
+    sink = JsonlSink(args.out, checkpoint.sink_position) if args.out else PostgresSink(connect(args.dsn), args.table)
+    try:
+        stats = backfill(args.table, source, embedder, sink, checkpoint, args.batch_size, args.workers,
+                         args.max_in_flight, args.limit, args.dim, args.progress)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; {checkpoint.rows} rows are checkpointed, rerun to resume")
+        sys.exit(130)
+    finally:
+        sink.close()
+    print_report(args.table, stats, checkpoint, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Quantised storage evaluator for 3072-dim embeddings
+
+Task A-02 plans root_embedding VECTOR(3072), which is 12 KB per row as
+float32. This script measures what cheaper encodings cost in search quality
+before the schema is committed. Each codec is fitted on a sample, re-read
+in blocks from the corpus on every pass, then encoded in chunks from a
+memory-mapped (N, D) .npy into a memory-mapped code file, then searched with
+one chunked pass per query batch:
+
+    fp32            4 bytes/dim, the exact scan is the baseline (pgvector vector)
+    fp16            2 bytes/dim                                 (halfvec)
+    int8            per-dimension affine scalar quantisation, 1 byte/dim
+    binary          sign bits, Hamming distance, 1 bit/dim      (bit + binary_quantize)
+    pq<M>           product quantisation, M sub-spaces x 256 centroids, M bytes/row
+    mrl<D>-<codec>  Matryoshka truncation to the first D dims (renormalised), then codec
+    <codec>+rescore<N>  re-rank the top N x k candidates with the fp32 vectors
+
+Ground truth is exact cosine top-k over the fp32 vectors (streamed, with a
+running top-k per query). The report gives bytes per row, the projected size
+at --project-rows, recall@k against exact, encode time, and search time with
+its speedup over the fp32 scan. Speedups are for these NumPy passes. The
+footprint (disk, buffer cache, RAM) is the part that carries over to
+Postgres as-is. +rescore keeps the fp32 vectors on disk, so only the hot
+footprint shrinks.
+
+Without --input, a synthetic corpus is written chunk by chunk. It has
+clustered rows whose energy decays across dimensions, as in
+Matryoshka-trained models (gemini-embedding-001 supports 768/1536/3072).
+Truncation results on it only reflect that assumed spectrum; run on real
+embeddings before deciding.
+
+Usage:
+    python3 scripts/embedding_quant_eval.py --rows 20000
+    python3 scripts/embedding_quant_eval.py --input embeddings.npy --codecs fp16,int8,binary+rescore4,mrl768-fp32
+"""
+
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+WORK_DIR = REPO_ROOT / ".cache" / "embedding_quant"
+
+DIM = 3072
+CHUNK_ROWS = 4096
+FIT_SAMPLE = 20000
+# Fit passes re-read the sample in blocks this size rather than holding it in memory
+FIT_BLOCK_ROWS = 512
+DEFAULT_CODECS = "fp16,int8,binary,binary+rescore4,pq96,pq96+rescore4,mrl768-fp32,mrl768-int8"
+
+# Synthetic corpus: rows are a topic plus noise, scaled by a decaying spectrum
+TOPICS = 512
+ROW_NOISE = 0.8
+QUERY_NOISE = 0.3
+SPECTRUM_KNEE = 128
+# int8 range from these percentiles of the sample, so outliers don't waste codes
+INT8_CLIP_PERCENTILE = 0.1
+# Per-dimension histogram resolution the percentiles are read from
+INT8_HIST_BINS = 1024
+PQ_CENTROIDS = 256
+PQ_ITERATIONS = 8
+PQ_TRAIN_ROWS = 10000
+
+_CODEC_SPEC = re.compile(r"^(?:mrl(\d+)-)?(fp32|fp16|int8|binary|pq(\d+))(?:\+rescore(\d+))?$")
+
+
+def normalise(x):
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+
+def chunks(array, rows=CHUNK_ROWS):
+    for start in range(0, len(array), rows):
+        yield start, array[start:start + rows]
+
+
+def write_synthetic(path, rows, dim, rng):
+    """Write a clustered, Matryoshka-like float32 corpus to `path` without holding it in memory."""
+    spectrum = (1 + np.arange(dim) / SPECTRUM_KNEE) ** -0.5
+    topics = rng.standard_normal((TOPICS, dim)).astype(np.float32)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(rows, dim))
+    for start in range(0, rows, CHUNK_ROWS):
+        n = min(CHUNK_ROWS, rows - start)
+        x = topics[rng.integers(0, TOPICS, n)] + ROW_NOISE * rng.standard_normal((n, dim), dtype=np.float32)
+        out[start:start + n] = normalise(x * spectrum)
+    out.flush()
+    return np.load(path, mmap_mode="r")
+
+
+class SampleBlocks:
+    """Fit sample: rows of a memory-mapped corpus, re-read as normalised blocks on every pass.
+
+    Iterating yields (rows, dims) float32 blocks, so a fit never holds more than
+    FIT_BLOCK_ROWS rows; `dims` truncates (before normalising) for Matryoshka codecs.
+    """
+
+    def __init__(self, vectors, rows, dims=None, block=FIT_BLOCK_ROWS):
+        self.vectors = vectors
+        self.rows = rows
+        self.dims = dims or vectors.shape[1]
+        self.block = block
+
+    @classmethod
+    def sample(cls, vectors, count, rng):
+        return cls(vectors, np.sort(rng.choice(len(vectors), min(count, len(vectors)), replace=False)))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        for start in range(0, len(self.rows), self.block):
+            yield self.take(np.arange(start, min(start + self.block, len(self.rows))))
+
+    def take(self, positions):
+        """The sample rows at `positions` (sorted), normalised."""
+        return normalise(self.vectors[self.rows[positions], :self.dims])
+
+    def subset(self, count, rng):
+        return SampleBlocks(self.vectors, np.sort(rng.choice(self.rows, min(count, len(self)), replace=False)),
+                            self.dims, self.block)
+
+    def truncated(self, dims):
+        return SampleBlocks(self.vectors, self.rows, dims, self.block)
+
+
+def histogram_percentiles(hist, lo, width, percentiles):
+    """Per-row percentiles from (rows, bins) histograms with bins of `width` starting at `lo`."""
+    cdf = np.cumsum(hist, axis=1)
+    index = np.arange(len(hist))
+    out = []
+    for pct in percentiles:
+        target = pct / 100 * cdf[:, -1]
+        b = np.argmax(cdf >= target[:, None], axis=1)
+        below = np.where(b > 0, cdf[index, b - 1], 0)
+        # Interpolate linearly inside the bin that crosses the target
+        fraction = (target - below) / np.maximum(hist[index, b], 1)
+        out.append((lo + (b + fraction) * width).astype(np.float32))
+    return out
+
+
+class Float32:
+    """Full precision; the baseline."""
+
+    dtype = np.float32
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.width = dim
+
+    def bytes_per_row(self):
+        return 4 * self.dim
+
+    def fit(self, sample):
+        pass
+
+    def encode(self, x):
+        return x.astype(self.dtype)
+
+    def prepare(self, queries):
+        return queries
+
+    def score(self, queries, codes):
+        return queries @ codes.astype(np.float32, copy=False).T
+
+
+class Float16(Float32):
+    dtype = np.float16
+
+    def bytes_per_row(self):
+        return 2 * self.dim
+
+
+class Int8(Float32):
+    """Per-dimension affine quantisation: x ~ lo + (code + 128) * step."""
+
+    dtype = np.int8
+
+    def bytes_per_row(self):
+        return self.dim
+
+    def fit(self, sample):
+        # Two streamed passes: per-dimension range, then per-dimension histograms over it
+        lo = np.full(self.dim, np.inf, dtype=np.float32)
+        hi = np.full(self.dim, -np.inf, dtype=np.float32)
+        for block in sample:
+            lo, hi = np.minimum(lo, block.min(axis=0)), np.maximum(hi, block.max(axis=0))
+        width = np.maximum(hi - lo, 1e-12) / INT8_HIST_BINS
+        offsets = np.arange(self.dim) * INT8_HIST_BINS
+        hist = np.zeros(self.dim * INT8_HIST_BINS, dtype=np.int64)
+        for block in sample:
+            bins = np.minimum(((block - lo) / width).astype(np.int64), INT8_HIST_BINS - 1)
+            hist += np.bincount((bins + offsets).ravel(), minlength=hist.size)
+        self.lo, hi = histogram_percentiles(hist.reshape(self.dim, INT8_HIST_BINS), lo, width,
+                                            (INT8_CLIP_PERCENTILE, 100 - INT8_CLIP_PERCENTILE))
+        self.step = np.maximum(hi - self.lo, 1e-12) / 255
+
+    def encode(self, x):
+        return (np.clip(np.rint((x - self.lo) / self.step), 0, 255) - 128).astype(np.int8)
+
+    def prepare(self, queries):
+        # q . x ~ (q * step) . code + q . (lo + 128 * step)
+        return queries * self.step, queries @ (self.lo + 128 * self.step)
+
+    def score(self, prepared, codes):
+        scaled, offset = prepared
+        return scaled @ codes.astype(np.float32).T + offset[:, None]
+
+
+class Binary(Float32):
+    """Sign bits packed into uint64 words; score is minus the Hamming distance."""
+
+    dtype = np.uint64
+
+    def __init__(self, dim):
+        super().__init__(dim)
+        self.width = -(-dim // 64)
+
+    def bytes_per_row(self):
+        return 8 * self.width
+
+    def encode(self, x):
+        bits = np.packbits(x > 0, axis=1)
+        padded = np.zeros((len(x), self.width * 8), dtype=np.uint8)
+        padded[:, :bits.shape[1]] = bits
+        return padded.view(np.uint64)
+
+    def prepare(self, queries):
+        return self.encode(queries)
+
+    def score(self, queries, codes, block=16):
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for i in range(0, len(queries), block):
+            xor = queries[i:i + block, None, :] ^ codes[None, :, :]
+            # Summed as signed ints: negating the unsigned popcount total would wrap around
+            out[i:i + block] = -np.bitwise_count(xor).sum(axis=2, dtype=np.int32)
+        return out
+
+
+class ProductQuantiser(Float32):
+    """M sub-spaces with PQ_CENTROIDS k-means centroids each; asymmetric (query-side float) scoring."""
+
+    dtype = np.uint8
+
+    def __init__(self, dim, m):
+        if dim % m:
+            raise ValueError(f"pq{m}: {dim} dims don't split into {m} sub-spaces")
+        super().__init__(dim)
+        self.m = self.width = m
+        self.sub = dim // m
+
+    def bytes_per_row(self):
+        return self.m
+
+    def _split(self, x):
+        """(rows, dim) -> (M, rows, sub) sub-vectors."""
+        return np.ascontiguousarray(x.reshape(len(x), self.m, self.sub).transpose(1, 0, 2))
+
+    def fit(self, sample):
+        # Lloyd iterations streamed over the training rows: each pass accumulates
+        # per-centroid sums and counts block by block
+        rng = np.random.default_rng(0)
+        train = sample.subset(PQ_TRAIN_ROWS, rng)
+        init = train.take(np.sort(rng.choice(len(train), PQ_CENTROIDS, replace=False)))
+        centroids = self._split(init)
+        for _ in range(PQ_ITERATIONS):
+            sums = np.zeros_like(centroids)
+            counts = np.zeros((self.m, PQ_CENTROIDS), dtype=np.int64)
+            for block in train:
+                parts = self._split(block)
+                assign = self._assign(parts, centroids)
+                for j in range(self.m):
+                    order = np.argsort(assign[j], kind="stable")
+                    n = np.bincount(assign[j], minlength=PQ_CENTROIDS)
+                    used = np.flatnonzero(n)
+                    sums[j, used] += np.add.reduceat(parts[j][order], np.concatenate([[0], np.cumsum(n)[:-1]])[used])
+                    counts[j] += n
+            used = counts > 0
+            centroids[used] = sums[used] / counts[used][:, None]
+        self.centroids = centroids
+
+    @staticmethod
+    def _assign(parts, centroids):
+        """Nearest centroid per sub-vector, shape (M, rows).
+
+        argmin |x - c|^2 = argmax (x . c - |c|^2 / 2), one sub-space at a time so
+        the score matrix is (rows, centroids) rather than (M, rows, centroids).
+        """
+        half_norms = 0.5 * (centroids ** 2).sum(axis=2)
+        out = np.empty(parts.shape[:2], dtype=np.intp)
+        for j in range(len(parts)):
+            out[j] = np.argmax(parts[j] @ centroids[j].T - half_norms[j], axis=1)
+        return out
+
+    def encode(self, x):
+        return self._assign(self._split(x), self.centroids).T.astype(np.uint8)
+
+    def prepare(self, queries):
+        # Lookup tables: query sub-vector . centroid, shape (queries, M, centroids)
+        return (self._split(queries) @ self.centroids.transpose(0, 2, 1)).transpose(1, 0, 2).copy()
+
+    def score(self, tables, codes):
+        out = np.zeros((len(tables), len(codes)), dtype=np.float32)
+        for j in range(self.m):
+            out += tables[:, j, codes[:, j]]
+        return out
+
+
+class Truncated:
+    """Matryoshka truncation to the first `dims` dimensions, renormalised, in front of another codec."""
+
+    def __init__(self, inner, dims):
+        self.inner = inner
+        self.dims = dims
+        self.dtype, self.width = inner.dtype, inner.width
+
+    def bytes_per_row(self):
+        return self.inner.bytes_per_row()
+
+    def _cut(self, x):
+        return normalise(x[:, :self.dims])
+
+    def fit(self, sample):
+        self.inner.fit(sample.truncated(self.dims))
+
+    def encode(self, x):
+        return self.inner.encode(self._cut(x))
+
+    def prepare(self, queries):
+        return self.inner.prepare(self._cut(queries))
+
+    def score(self, prepared, codes):
+        return self.inner.score(prepared, codes)
+
+
+def make_codec(spec, dim):
+    """Codec for a spec like "int8", "pq96", "mrl768-int8" or "binary+rescore4"; returns (codec, rescore)."""
+    match = _CODEC_SPEC.match(spec)
+    if not match:
+        raise ValueError(f"unknown codec {spec!r}")
+    truncate, base, pq_m, rescore = match.groups()
+    dims = int(truncate) if truncate else dim
+    if dims > dim:
+        raise ValueError(f"{spec}: can't truncate {dim} dims to {dims}")
+    if pq_m:
+        codec = ProductQuantiser(dims, int(pq_m))
+    else:
+        codec = {"fp32": Float32, "fp16": Float16, "int8": Int8, "binary": Binary}[base](dims)
+    if truncate:
+        codec = Truncated(codec, dims)
+    return codec, int(rescore) if rescore else 0
+
+
+def top_k(batches, k):
+    """Running top-k over (start, scores) batches of shape (queries, rows); returns (ids, scores), best first."""
+    best_ids = best = None
+    for start, scores in batches:
+        kk = min(k, scores.shape[1])
+        part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        ids, vals = part + start, np.take_along_axis(scores, part, axis=1)
+        if best is not None:
+            ids, vals = np.hstack([best_ids, ids]), np.hstack([best, vals])
+            keep = np.argpartition(-vals, min(k, vals.shape[1]) - 1, axis=1)[:, :k]
+            ids, vals = np.take_along_axis(ids, keep, axis=1), np.take_along_axis(vals, keep, axis=1)
+        best_ids, best = ids, vals
+    order = np.argsort(-best, axis=1, kind="stable")
+    return np.take_along_axis(best_ids, order, axis=1), np.take_along_axis(best, order, axis=1)
+
+
+def encode_corpus(codec, vectors, path):
+    """Encode vectors chunk by chunk into a memory-mapped code file; returns it opened read-only."""
+    codes = np.lib.format.open_memmap(path, mode="w+", dtype=codec.dtype, shape=(len(vectors), codec.width))
+    for start, chunk in chunks(vectors):
+        codes[start:start + len(chunk)] = codec.encode(normalise(chunk))
+    codes.flush()
+    del codes
+    return np.load(path, mmap_mode="r")
+
+
+def search(codec, codes, queries, k):
+    prepared = codec.prepare(queries)
+    return top_k(((start, codec.score(prepared, chunk)) for start, chunk in chunks(codes)), k)[0]
+
+
+def rescore(vectors, queries, candidates, k):
+    """Re-rank each query's candidate ids by exact cosine, reading only those rows."""
+    out = np.empty((len(queries), k), dtype=np.int64)
+    for i, (q, ids) in enumerate(zip(queries, candidates)):
+        ids = np.unique(ids)
+        scores = normalise(vectors[ids]) @ q
+        out[i] = ids[np.argsort(-scores, kind="stable")[:k]]
+    return out
+
+
+def recall(found, truth):
+    return float(np.mean([len(np.intersect1d(f, t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def evaluate(specs, vectors, queries, k, work_dir, rng, log=print):
+    """Fit, encode and search every codec spec; returns report rows, the exact fp32 scan first."""
+    dim = vectors.shape[1]
+    sample = SampleBlocks.sample(vectors, FIT_SAMPLE, rng)
+
+    start = time.perf_counter()
+    truth = top_k(((s, queries @ normalise(chunk).T) for s, chunk in chunks(vectors)), k)[0]
+    exact_s = time.perf_counter() - start
+    rows = [{"codec": "fp32 (exact)", "bytes_per_row": 4 * dim, "recall": 1.0,
+             "encode_s": 0.0, "search_s": exact_s}]
+
+    for spec in specs:
+        codec, oversample = make_codec(spec, dim)
+        start = time.perf_counter()
+        codec.fit(sample)
+        codes = encode_corpus(codec, vectors, work_dir / f"{spec.replace('+', '_')}.npy")
+        encode_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = search(codec, codes, queries, k * max(oversample, 1))
+        if oversample:
+            found = rescore(vectors, queries, found, k)
+        search_s = time.perf_counter() - start
+        rows.append({"codec": spec, "bytes_per_row": codec.bytes_per_row(), "recall": recall(found, truth),
+                     "encode_s": encode_s, "search_s": search_s})
+        log(f"  {spec:<18} recall@{k} {rows[-1]['recall']:.3f}  search {search_s * 1000:.0f}ms")
+        del codes
+    return rows
+
+
+def print_report(rows, rows_in_corpus, project_rows, k):
+    base = rows[0]
+    print(f"\n{'CODEC':<18} {'B/ROW':>7} {'RATIO':>6} {'@' + f'{project_rows:,}':>12} "
+          f"{'R@' + str(k):>6} {'LOSS':>6} {'ENCODE s':>9} {'SEARCH ms':>10} {'SPEEDUP':>8}")
+    for row in rows:
+        size_gb = row["bytes_per_row"] * project_rows / 1e9
+        print(f"{row['codec']:<18} {row['bytes_per_row']:>7,} {base['bytes_per_row'] / row['bytes_per_row']:>5.1f}x "
+              f"{size_gb:>10.2f}GB {row['recall']:>6.3f} {1 - row['recall']:>6.3f} {row['encode_s']:>9.2f} "
+              f"{row['search_s'] * 1000:>10.0f} {base['search_s'] / row['search_s']:>7.1f}x")
+    print(f"\nSearch times are for a full scan of {rows_in_corpus:,} rows; "
+          f"+rescore also keeps the fp32 vectors on disk")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate quantised storage for embedding vectors")
+    parser.add_argument("--input", help="(rows, dims) float32/float16 .npy, memory-mapped")
+    parser.add_argument("--rows", type=int, default=20000, help="synthetic corpus rows (without --input)")
+    parser.add_argument("--dim", type=int, default=DIM, help="synthetic corpus dims (without --input)")
+    parser.add_argument("--codecs", default=DEFAULT_CODECS, help="comma-separated codec specs")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--project-rows", type=int, default=1_000_000, help="rows to project storage for")
+    parser.add_argument("--work-dir", default=str(WORK_DIR), help="where code files (and the synthetic corpus) go")
+    parser.add_argument("--keep", action="store_true", help="keep code files after the run")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    work_dir = Path(args.work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    specs = [spec.strip() for spec in args.codecs.split(",") if spec.strip()]
+
+    if args.input:
+        vectors = np.load(args.input, mmap_mode="r")
+    else:
+        start = time.perf_counter()
+        vectors = write_synthetic(work_dir / "synthetic.npy", args.rows, args.dim, rng)
+        print(f"Wrote synthetic corpus in {time.perf_counter() - start:.1f}s")
+    for spec in specs:
+        make_codec(spec, vectors.shape[1])  # fail on a bad spec before any encoding
+
+    picks = rng.choice(len(vectors), args.queries, replace=False)
+    noise = QUERY_NOISE / np.sqrt(vectors.shape[1]) * rng.standard_normal((len(picks), vectors.shape[1]))
+    queries = normalise(normalise(vectors[np.sort(picks)]) + noise)
+    print(f"Corpus: {len(vectors):,} x {vectors.shape[1]} ({vectors.dtype}, "
+          f"{os.path.getsize(vectors.filename) / 2 ** 20:.0f} MB memory-mapped); {len(queries)} queries, k={args.k}")
+
+    try:
+        rows = evaluate(specs, vectors, queries, args.k, work_dir, rng)
+        print_report(rows, len(vectors), args.project_rows, args.k)
+    finally:
+        if not args.keep:
+            # Only what this run wrote; --work-dir may hold other files
+            del vectors
+            created = [work_dir / f"{spec.replace('+', '_')}.npy" for spec in specs]
+            for path in created + ([] if args.input else [work_dir / "synthetic.npy"]):
+                path.unlink(missing_ok=True)
+            if not any(work_dir.iterdir()):
+                work_dir.rmdir()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,21 @@
+import argparse
+import hashlib
 import subprocess
 import json
 import os
+import shutil
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Pipeline workers print concurrently; keep their lines whole
+PRINT_LOCK = threading.Lock()
+
+def log(msg=""):
+    with PRINT_LOCK:
+        print(msg)
 
 # Ensure correct path
 ASSETS_DIR = "assets/sounds"
@@ -31,7 +45,8 @@ SOUNDS = [
         "file": "clockwork.mp3",
         "search": "pocket watch ticking loop",
         "max_duration": 60,
-        "desc": "3-second countdown ticking"
+        "desc": "3-second countdown ticking",
+        "loop": {"min_s": 0.5, "max_s": 6}
     },
     {
         "file": "thud.mp3",
@@ -43,10 +58,40 @@ SOUNDS = [
         "file": "ambience.mp3",
         "search": "dark ambient background loop meditation",
         "max_duration": 300,
-        "desc": "Council Chamber background"
+        "desc": "Council Chamber background",
+        "loop": {"min_s": 8, "max_s": 60}
     }
 ]
 
+# yt-dlp executable; point YT_DLP (or --yt-dlp) at a stand-in to run offline
+YT_DLP = os.environ.get("YT_DLP", "yt-dlp")
+
+# Resolved search results, so re-scoring doesn't hit the network
+CACHE_PATH = os.environ.get("FETCH_SOUNDS_CACHE", ".cache/fetch_sounds_search.json")
+CACHE_TTL = 7 * 24 * 3600
+CACHE_MAX_BYTES = 1024 * 1024
+# yt-dlp dicts carry every format and thumbnail; keep only what scoring and download use
+CANDIDATE_FIELDS = (
+    "id", "title", "uploader", "channel", "channel_follower_count", "duration",
+    "webpage_url", "view_count", "like_count", "upload_date", "tags",
+)
+SEARCH_CACHE = None
+
+# Selected video, format and hash of every shipped asset. Kept outside
+# assets/sounds/ so it isn't bundled into the app.
+LOCK_PATH = "assets/sounds.lock.json"
+DOWNLOAD_FORMAT = {"audio_format": "mp3", "audio_quality": "128K"}
+ASSET_LOCK = None
+
+# With --optimise, pristine downloads are kept here (by video ID) and assets are
+# derived from them, so changing the budget never re-encodes an already lossy file
+SOURCES_DIR = ".cache/fetch_sounds_sources"
+# yt-dlp writes its container, .part and converted files here, outside the
+# bundled assets/sounds/, so an interrupted download leaves nothing in the app
+DOWNLOAD_DIR = ".cache/fetch_sounds_downloads"
+POSTPROCESS = None
+PENDING_OPTIMISE = []
+
 TRUSTED_CHANNELS = [
     "Free Sound Effects",
     "Pixabay",
@@ -56,40 +101,199 @@ TRUSTED_CHANNELS = [
     "Sound Effects"
 ]
 
-def get_candidates(query, limit=10):
-    cmd = [
-        "yt-dlp",
-        "--dump-json",
-        "--default-search", f"ytsearch{limit}",
-        "--no-playlist",
-        query
-    ]
+class SearchCache:
+    """On-disk cache of slimmed candidate dicts, keyed by query and result limit.
+
+    Entries older than `ttl` seconds are ignored and dropped; on save the least
+    recently used entries are evicted until the file fits in `max_bytes`.
+    Safe to share between the pipeline's worker threads.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, refresh=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(path) as f:
+                self._entries = json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _key(query, limit):
+        return f"{limit}:{query}"
+
+    def get(self, query, limit):
+        """Cached candidates, or None on a miss, expiry or --refresh."""
+        with self._lock:
+            entry = self._entries.get(self._key(query, limit))
+            now = time.time()
+            if self.refresh or entry is None or now - entry["stored"] > self.ttl:
+                self.misses += 1
+                return None
+            entry["used"] = now
+            self.hits += 1
+            return entry["candidates"]
+
+    def put(self, query, limit, candidates):
+        now = time.time()
+        with self._lock:
+            self._entries[self._key(query, limit)] = {
+                "stored": now, "used": now, "candidates": candidates,
+            }
+
+    def save(self):
+        with self._lock:
+            now = time.time()
+            live = {k: e for k, e in self._entries.items() if now - e["stored"] <= self.ttl}
+            sizes = {k: len(json.dumps(e)) for k, e in live.items()}
+            total = sum(sizes.values())
+            for key in sorted(live, key=lambda k: live[k]["used"]):
+                if total <= self.max_bytes:
+                    break
+                total -= sizes[key]
+                del live[key]
+            self._entries = live
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": 1, "entries": live}, f)
+            os.replace(tmp_path, self.path)
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class AssetLock:
+    """Lockfile mapping each asset to the video and format it was built from and its SHA-256.
+
+    verify() hashes every locked file once, in parallel; is_current() then
+    answers from those results, so a rerun only downloads assets whose
+    selection changed or whose file no longer matches.
+    """
+
+    def __init__(self, path=LOCK_PATH):
+        self.path = path
+        self.status = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.entries = json.load(f).get("assets", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _check(self, filename):
+        path = os.path.join(ASSETS_DIR, filename)
+        if not os.path.exists(path):
+            return "missing"
+        return "ok" if sha256_file(path) == self.entries[filename]["sha256"] else "modified"
+
+    def verify(self, workers=4):
+        """Hash all locked assets and return {filename: "ok" | "modified" | "missing"}."""
+        names = sorted(self.entries)
+        with ThreadPoolExecutor(workers) as pool:
+            self.status = dict(zip(names, pool.map(self._check, names)))
+        return self.status
+
+    def is_current(self, filename, candidate, postprocess=None):
+        entry = self.entries.get(filename)
+        return (entry is not None
+                and entry.get("video_id") == candidate.get("id")
+                and entry.get("format") == DOWNLOAD_FORMAT
+                and (entry.get("postprocess") or {}).get("settings") == postprocess
+                and self.status.get(filename) == "ok")
+
+    def record(self, filename, candidate, sha256, postprocess=None):
+        with self._lock:
+            self.entries[filename] = {
+                "video_id": candidate.get("id"),
+                "url": candidate.get("webpage_url"),
+                "title": candidate.get("title"),
+                "channel": candidate.get("channel") or candidate.get("uploader"),
+                "format": dict(DOWNLOAD_FORMAT),
+                "sha256": sha256,
+                "bytes": os.path.getsize(os.path.join(ASSETS_DIR, filename)),
+            }
+            if postprocess:
+                self.entries[filename]["postprocess"] = postprocess
+            self.status[filename] = "ok"
+
+    def save(self):
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": 1, "assets": dict(sorted(self.entries.items()))}, f, indent=2)
+                f.write("\n")
+            os.replace(tmp_path, self.path)
+
+def lookup_candidates(query, limit=5):
+    """Yield candidates from SEARCH_CACHE, or stream them from yt-dlp and cache them."""
+    if SEARCH_CACHE is not None:
+        cached = SEARCH_CACHE.get(query, limit)
+        if cached is not None:
+            yield from cached
+            return
+
+    candidates = []
+    status = {}
+    for cand in stream_candidates(query, limit, status):
+        cand = {k: cand[k] for k in CANDIDATE_FIELDS if k in cand}
+        candidates.append(cand)
+        yield cand
+    # A failed search may have printed only part of its results; don't keep those for CACHE_TTL
+    if SEARCH_CACHE is not None and candidates and status.get("returncode") == 0:
+        SEARCH_CACHE.put(query, limit, candidates)
+
+def get_candidates(query, limit=5):
     # We DO NOT use --flat-playlist because we need subscriber counts and duration which might require resolving
-    # However, resolving 10 items might be slow. 
-    # Let's try --flat-playlist first? No, --flat-playlist doesn't give sub count.
     # We'll just fetch full info for top 5 to be safe and fast enough.
+    log(f"Running search: {query}...")
+    return list(lookup_candidates(query, limit))
+
+def stream_candidates(query, limit=5, status=None):
+    """Yield candidate dicts as yt-dlp prints them, instead of after it exits.
+
+    yt-dlp emits one JSON line per resolved result, so the first candidate can
+    be scored while the rest are still being resolved. Once the generator is
+    exhausted, `status["returncode"]` holds yt-dlp's exit status.
+    """
     cmd = [
-        "yt-dlp",
+        YT_DLP,
         "--dump-json",
-        f"ytsearch5:{query}"
+        f"ytsearch{limit}:{query}"
     ]
-    
-    print(f"Running search: {query}...")
+    # stderr goes to a file rather than a pipe, so a chatty yt-dlp can't block on it
+    stderr = tempfile.TemporaryFile("w+")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True)
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error searching: {e}")
-        return []
-
-    candidates = []
-    for line in result.stdout.strip().split('\n'):
-        if not line: continue
-        try:
-            data = json.loads(line)
-            candidates.append(data)
-        except json.JSONDecodeError:
-            continue
-    return candidates
+        for line in proc.stdout:
+            line = line.strip()
+            if not line: continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+        if status is not None:
+            status["returncode"] = returncode
+        if returncode != 0:
+            stderr.seek(0)
+            reason = stderr.read().strip().splitlines()
+            log(f"Error searching: {query} (exit {returncode})" + (f": {reason[-1]}" if reason else ""))
+        stderr.close()
 
 def score_candidate(candidate, sound_def):
     score = 0
@@ -103,20 +307,20 @@ def score_candidate(candidate, sound_def):
     is_trusted = any(tc.lower() in channel.lower() for tc in TRUSTED_CHANNELS)
     if is_trusted:
         score += 20
-        print(f"  [+] Trusted Channel: {channel}")
+        log(f"  [+] Trusted Channel: {channel}")
     
     # 2. Subscriber Count constraint (>100K) if not explicitly trusted
     if subs and subs > 100000:
         score += 10
-        print(f"  [+] High Subs: {subs}")
+        log(f"  [+] High Subs: {subs}")
     elif not is_trusted and (subs is None or subs < 10000):
         # Strict penalty for low subs if not trusted list
-        print(f"  [-] Low Subs: {subs} ({channel})")
+        log(f"  [-] Low Subs: {subs} ({channel})")
         return -1 
 
     # 3. Duration match
     if duration > sound_def['max_duration'] * 3: # Allow wiggle room for intros
-        print(f"  [-] Too long: {duration}s")
+        log(f"  [-] Too long: {duration}s")
         return -1
     else:
         score += 5
@@ -127,35 +331,265 @@ def score_candidate(candidate, sound_def):
         
     return score
 
-def download_sound(url, filename):
-    print(f"Downloading {url} to {filename}...")
-    # remove existing placeholders
-    target_path = os.path.join(ASSETS_DIR, filename)
-    if os.path.exists(target_path):
-        os.remove(target_path)
-        
+def download_sound(url, filename, directory=ASSETS_DIR):
+    """Download into a temp dir under DOWNLOAD_DIR and swap it in; returns the SHA-256.
+
+    The existing asset stays in place until the new file is complete, so a
+    failed download never leaves it missing.
+    """
+    log(f"Downloading {url} to {filename}...")
+    target_path = os.path.join(directory, filename)
+    os.makedirs(directory, exist_ok=True)
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f"{os.path.splitext(filename)[0]}.", dir=DOWNLOAD_DIR)
+    # yt-dlp swaps the extension after extracting audio, so keep the real one last
+    tmp_path = os.path.join(tmp_dir, filename)
+
     cmd = [
-        "yt-dlp",
+        YT_DLP,
         "-x", # Extract audio
-        "--audio-format", "mp3",
-        "--audio-quality", "128K",
-        "-o", target_path,
+        "--audio-format", DOWNLOAD_FORMAT["audio_format"],
+        "--audio-quality", DOWNLOAD_FORMAT["audio_quality"],
+        "-o", tmp_path,
         url
     ]
-    subprocess.run(cmd, check=True)
-    
-    # Check file size
-    if os.path.exists(target_path):
-        size = os.path.getsize(target_path)
-        print(f"Success! {filename} size: {size} bytes")
+    try:
+        subprocess.run(cmd, check=True)
+        if not os.path.exists(tmp_path):
+            log(f"Failed to create {filename}")
+            return None
+        digest = sha256_file(tmp_path)
+        os.replace(tmp_path, target_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    size = os.path.getsize(target_path)
+    log(f"Success! {filename} size: {size} bytes")
+    return digest
+
+def postprocess_settings(sound):
+    """The optimisation settings an asset should have been built with, or None."""
+    if POSTPROCESS is None:
+        return None
+    return dict(POSTPROCESS, max_duration=sound['max_duration'], loop=sound.get('loop'))
+
+def fetch_selected(sound, candidate):
+    """Download the selected candidate unless the locked asset already matches it.
+
+    Returns True if a new file was written (or queued for optimisation).
+    """
+    settings = postprocess_settings(sound)
+    if ASSET_LOCK is not None and ASSET_LOCK.is_current(sound['file'], candidate, settings):
+        log(f"Unchanged: {sound['file']} (video {candidate.get('id')}, hash verified)")
+        return False
+    if settings is not None:
+        source = f"{candidate.get('id')}{os.path.splitext(sound['file'])[1]}"
+        if os.path.exists(os.path.join(SOURCES_DIR, source)):
+            log(f"Using cached source for {sound['file']}: {source}")
+        elif not download_sound(candidate.get('webpage_url'), source, SOURCES_DIR):
+            return False
+        PENDING_OPTIMISE.append((sound, candidate, os.path.join(SOURCES_DIR, source)))
+        return True
+    digest = download_sound(candidate.get('webpage_url'), sound['file'])
+    if digest and ASSET_LOCK is not None:
+        ASSET_LOCK.record(sound['file'], candidate, digest)
+    return digest is not None
+
+def search_best(sound, timings):
+    """Stage 1: stream candidates for one sound and keep the best as they arrive."""
+    start = time.monotonic()
+    best_candidate = None
+    best_score = -1
+    for cand in lookup_candidates(sound['search']):
+        if 'first_candidate' not in timings:
+            timings['first_candidate'] = time.monotonic() - start
+        score = score_candidate(cand, sound)
+        if score > best_score:
+            best_score = score
+            best_candidate = cand
+    timings['search'] = time.monotonic() - start
+    return best_candidate, best_score
+
+def fetch_pipelined(sound, download_pool, dry_run=False):
+    """Search for one sound, then hand the winner straight to the download pool."""
+    timings = {}
+    best_candidate, best_score = search_best(sound, timings)
+
+    if best_candidate:
+        log(f"[{sound['file']}] Selected: {best_candidate.get('title')} "
+            f"from {best_candidate.get('uploader')} (Score: {best_score})")
     else:
-        print(f"Failed to create {filename}")
+        log(f"[{sound['file']}] No suitable candidate found")
+    if not best_candidate or dry_run:
+        return sound['file'], timings, None
+
+    def download():
+        start = time.monotonic()
+        try:
+            fetch_selected(sound, best_candidate)
+            error = None
+        except Exception as e:
+            error = str(e)
+            log(f"[{sound['file']}] Download failed: {e}")
+        timings['download'] = time.monotonic() - start
+        return error
+
+    return sound['file'], timings, download_pool.submit(download)
+
+def main_pipelined(workers=4, dry_run=False):
+    """Run every search at once and start each download as soon as its winner is known.
+
+    Searches and downloads each get a bounded thread pool; yt-dlp does the real
+    work in subprocesses, so threads are enough.
+    """
+    log(f"Starting pipelined audio acquisition ({workers} workers per stage)...")
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(workers) as search_pool, ThreadPoolExecutor(workers) as download_pool:
+        searches = [search_pool.submit(fetch_pipelined, sound, download_pool, dry_run)
+                    for sound in SOUNDS]
+        results = [f.result() for f in searches]
+        for _, _, download in results:
+            if download:
+                download.result()
+
+    total = time.monotonic() - start
+    log(f"\n{'FILE':<15} {'1ST CAND':>9} {'SEARCH':>8} {'DOWNLOAD':>9}")
+    for filename, timings, _ in results:
+        cells = [f"{timings[k]:.1f}s" if k in timings else "-"
+                 for k in ('first_candidate', 'search', 'download')]
+        log(f"{filename:<15} {cells[0]:>9} {cells[1]:>8} {cells[2]:>9}")
+    sequential = sum(t.get('search', 0) + t.get('download', 0) for _, t, _ in results)
+    log(f"Total: {total:.1f}s (sum of stages: {sequential:.1f}s)")
+
+def optimise_pending(budget_kb, dry_run=False):
+    """Trim, normalise and re-encode the queued assets into whatever budget the unchanged ones leave.
+
+    With dry_run the bitrates are planned and reported but nothing is encoded or recorded.
+    """
+    import sound_optimize
+
+    if not PENDING_OPTIMISE:
+        return
+    pending = {sound['file'] for sound, _, _ in PENDING_OPTIMISE}
+    fixed = sum(os.path.getsize(os.path.join(ASSETS_DIR, s['file'])) for s in SOUNDS
+                if s['file'] not in pending and os.path.exists(os.path.join(ASSETS_DIR, s['file'])))
+    budget = budget_kb * 1024 - fixed
+    log(f"\nOptimising {len(pending)} assets into {budget / 1024:.0f}K "
+        f"({fixed / 1024:.0f}K used by unchanged assets)...")
+
+    jobs = []
+    loops = {}
+    for sound, _, src in PENDING_OPTIMISE:
+        job = {"name": sound['file'], "src": src, "dst": os.path.join(ASSETS_DIR, sound['file']),
+               "max_duration": sound['max_duration']}
+        if sound.get('loop'):
+            import sound_loops
+
+            # Ship one seamless period instead of the whole render
+            loop_path = f"{os.path.splitext(src)[0]}.loop.wav"
+            try:
+                meta = sound_loops.extract_loop(src, loop_path, sound['loop']['min_s'], sound['loop']['max_s'])
+            except ValueError as e:
+                log(f"No loop for {sound['file']}, shipping it trimmed: {e}")
+            else:
+                log(f"Loop for {sound['file']}: {meta['loop_length_s']:.2f}s of {meta['source_s']:.0f}s "
+                    f"(score {meta['score']:.3f})")
+                loops[sound['file']] = meta
+                job.update(src=loop_path, trim=False)
+        jobs.append(job)
+    rows = sound_optimize.optimise(jobs, budget, POSTPROCESS["silence_db"], POSTPROCESS["target_db"], dry_run)
+    sound_optimize.print_report(rows, budget, log)
+    if dry_run:
+        PENDING_OPTIMISE.clear()
+        return
+
+    for (sound, candidate, _), row in zip(PENDING_OPTIMISE, rows):
+        if ASSET_LOCK is not None:
+            postprocess = {
+                "settings": postprocess_settings(sound),
+                "bitrate_kbps": row['bitrate_kbps'],
+                "duration_s": round(row['duration_out_s'], 3),
+            }
+            if sound['file'] in loops:
+                meta = loops[sound['file']]
+                postprocess["loop"] = {k: meta[k] for k in
+                                       ("loop_start_s", "loop_length_s", "loop_samples", "sample_rate", "score")}
+            ASSET_LOCK.record(sound['file'], candidate, sha256_file(os.path.join(ASSETS_DIR, sound['file'])),
+                              postprocess)
+    PENDING_OPTIMISE.clear()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch and select sound assets with yt-dlp")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="search all sounds concurrently and download winners as they are chosen")
+    parser.add_argument("--workers", type=int, default=4, help="worker threads per pipeline stage")
+    parser.add_argument("--yt-dlp", dest="yt_dlp", default=YT_DLP,
+                        help="yt-dlp executable (e.g. a stand-in for offline runs)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="ignore cached search results and re-resolve every query")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the search cache")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL / 3600,
+                        help="hours before cached search results expire")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="score and select candidates without downloading")
+    parser.add_argument("--verify", action="store_true",
+                        help=f"check every asset against {LOCK_PATH} and exit")
+    parser.add_argument("--force", action="store_true",
+                        help="download selected assets even if the lockfile says they are unchanged")
+    parser.add_argument("--optimise", action="store_true",
+                        help="trim, normalise and re-encode assets to fit --budget-kb (needs NumPy and ffmpeg)")
+    parser.add_argument("--budget-kb", type=float, default=400, help="total size budget for --optimise")
+    return parser.parse_args()
+
+def verify_assets(lock):
+    start = time.monotonic()
+    status = lock.verify()
+    for filename, state in status.items():
+        log(f"  {'✓' if state == 'ok' else '✗'} {filename}: {state}")
+    unlocked = sorted(s['file'] for s in SOUNDS if s['file'] not in lock.entries)
+    for filename in unlocked:
+        log(f"  ? {filename}: not in lockfile")
+    log(f"Verified {len(status)} assets in {(time.monotonic() - start) * 1000:.0f}ms")
+    return all(state == "ok" for state in status.values())
 
 def main():
-    print("Starting audio acquisition...")
+    global YT_DLP, SEARCH_CACHE, ASSET_LOCK, POSTPROCESS
+    args = parse_args()
+    YT_DLP = args.yt_dlp
+    if args.optimise:
+        import sound_optimize
+        POSTPROCESS = {"budget_kb": args.budget_kb, "silence_db": sound_optimize.SILENCE_DB,
+                       "target_db": sound_optimize.TARGET_DB}
+    ASSET_LOCK = AssetLock()
+    if args.verify:
+        sys.exit(0 if verify_assets(ASSET_LOCK) else 1)
+    if not args.force:
+        verify_assets(ASSET_LOCK)
+    if not args.no_cache:
+        SEARCH_CACHE = SearchCache(ttl=args.cache_ttl * 3600, refresh=args.refresh)
+    try:
+        run(args)
+    finally:
+        if not args.dry_run:
+            ASSET_LOCK.save()
+        if SEARCH_CACHE is not None:
+            SEARCH_CACHE.save()
+            log(f"Search cache: {SEARCH_CACHE.hits} hits, {SEARCH_CACHE.misses} misses ({SEARCH_CACHE.path})")
+
+def run(args):
+    if args.pipeline:
+        main_pipelined(args.workers, args.dry_run)
+    else:
+        main_sequential(args.dry_run)
+    if POSTPROCESS is not None:
+        optimise_pending(args.budget_kb)
+
+def main_sequential(dry_run=False):
+    log("Starting audio acquisition...")
     
     for sound in SOUNDS:
-        print(f"\nProcessing: {sound['file']} ({sound['desc']})")
+        log(f"\nProcessing: {sound['file']} ({sound['desc']})")
         candidates = get_candidates(sound['search'])
         
         best_candidate = None
@@ -168,13 +602,15 @@ def main():
                 best_candidate = cand
         
         if best_candidate:
-            print(f"Selected: {best_candidate.get('title')} from {best_candidate.get('uploader')} (Score: {best_score})")
+            log(f"Selected: {best_candidate.get('title')} from {best_candidate.get('uploader')} (Score: {best_score})")
+            if dry_run:
+                continue
             try:
-                download_sound(best_candidate.get('webpage_url'), sound['file'])
+                fetch_selected(sound, best_candidate)
             except Exception as e:
-                print(f"Download failed: {e}")
+                log(f"Download failed: {e}")
         else:
-            print(f"No suitable candidate found for {sound['file']}")
+            log(f"No suitable candidate found for {sound['file']}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Gemini Live API Response Audio Analyser
+Playback-buffer sizing for GeminiLiveService audio output
+
+Consumes serverContent audio incrementally, the same way
+GeminiLiveService._handleServerMessage base64-decodes each inlineData part as
+it arrives. Decoded PCM is coalesced in a reused buffer and streamed to a WAV
+file on the fly, so a long response is never held in memory.
+
+Per turn it reports:
+  - ttfb_ms:          turn sent -> first audio chunk
+  - gap_ms:           inter-chunk arrival gap distribution
+  - min_buffer_ms:    smallest jitter-buffer depth that would have kept
+                      playback gapless (start playing at first chunk + depth)
+
+Usage:
+    python3 gemini_live_audio.py <API_KEY> --wav reply.wav
+    python3 gemini_live_audio.py --endpoint ws://127.0.0.1:8765 --turn "Hi" --turn "Tell me more"
+"""
+
+import argparse
+import asyncio
+import binascii
+import os
+import sys
+import time
+import wave
+
+import websockets
+
+import gemini_live_codec as codec
+from gemini_live_spans import (CONNECT, FIRST_AUDIO, FIRST_SERVER_CONTENT, SEND_SETUP, SEND_TURN,
+                               SETUP_COMPLETE, TRACER, TURN_COMPLETE, print_summary)
+from gemini_live_trace import TraceRecorder, TracingWebSocket
+from latency_stats import percentile
+from test_gemini_live_full import WS_ENDPOINT, build_flutter_setup_message, log
+
+OUTPUT_SAMPLE_RATE = 24000
+BYTES_PER_SAMPLE = 2
+
+# Flush decoded audio to disk once this much is pending
+FLUSH_BYTES = 64 * 1024
+
+
+class StreamingWavWriter:
+    """Appends PCM to a WAV file through a reused, growing staging buffer.
+
+    The buffer starts at FLUSH_BYTES and only grows if a single chunk is larger
+    than its capacity; it is drained to disk whenever it passes FLUSH_BYTES.
+    wave patches the RIFF header sizes on close.
+    """
+
+    def __init__(self, path: str, sample_rate: int = OUTPUT_SAMPLE_RATE):
+        self._wav = wave.open(path, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(BYTES_PER_SAMPLE)
+        self._wav.setframerate(sample_rate)
+        self._buf = bytearray(FLUSH_BYTES)
+        self._used = 0
+        self.bytes_written = 0
+
+    def write(self, pcm: bytes):
+        end = self._used + len(pcm)
+        if end > len(self._buf):
+            self._buf.extend(bytes(max(end - len(self._buf), len(self._buf))))
+        self._buf[self._used:end] = pcm
+        self._used = end
+        if self._used >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self._used:
+            with memoryview(self._buf) as view:
+                self._wav.writeframesraw(view[:self._used])
+            self.bytes_written += self._used
+            self._used = 0
+
+    def close(self):
+        self.flush()
+        self._wav.close()
+
+
+class TurnStats:
+    """Arrival timing for one model turn."""
+
+    def __init__(self, sent_at: float, sample_rate: int = OUTPUT_SAMPLE_RATE):
+        self.sent_at = sent_at
+        self.bytes_per_s = sample_rate * BYTES_PER_SAMPLE
+        self.arrivals = []
+        self.durations = []
+        self.interrupted = False
+
+    def add_chunk(self, arrived_at: float, nbytes: int):
+        self.arrivals.append(arrived_at)
+        self.durations.append(nbytes / self.bytes_per_s)
+
+    def min_buffer_s(self) -> float:
+        """Smallest playback delay after the first chunk that avoids underruns.
+
+        Chunk k starts playing at first_arrival + depth + sum(durations[:k]),
+        so depth must cover the worst arrival lateness against that schedule.
+        """
+        if not self.arrivals:
+            return 0.0
+        first = self.arrivals[0]
+        played = 0.0
+        depth = 0.0
+        for arrived, duration in zip(self.arrivals, self.durations):
+            depth = max(depth, arrived - first - played)
+            played += duration
+        return depth
+
+    def summary(self) -> dict:
+        gaps = sorted((b - a) * 1000 for a, b in zip(self.arrivals, self.arrivals[1:]))
+        return {
+            "chunks": len(self.arrivals),
+            "audio_ms": sum(self.durations) * 1000,
+            "ttfb_ms": (self.arrivals[0] - self.sent_at) * 1000 if self.arrivals else None,
+            "gap_ms": {
+                "p50": percentile(gaps, 50),
+                "p95": percentile(gaps, 95),
+                "p99": percentile(gaps, 99),
+                "max": gaps[-1] if gaps else None,
+            },
+            "min_buffer_ms": self.min_buffer_s() * 1000,
+            "interrupted": self.interrupted,
+        }
+
+
+def iter_audio_parts(data: dict):
+    """Yield base64 payloads from a server message, mirroring the Dart key fallbacks."""
+    content = data.get("serverContent") or data.get("server_content") or {}
+    model_turn = content.get("modelTurn") or content.get("model_turn") or {}
+    for part in model_turn.get("parts") or []:
+        inline = part.get("inlineData") or part.get("inline_data")
+        if inline and inline.get("data"):
+            yield inline["data"]
+
+
+async def consume_turn(ws, stats: TurnStats, writer: StreamingWavWriter = None, timeout: float = 15.0):
+    """Read server messages until turnComplete/interrupted, decoding audio as it arrives."""
+    while True:
+        raw = await asyncio.wait_for(ws.recv(), timeout=timeout)
+        arrived = time.monotonic()
+        data = codec.loads(raw)
+        if "error" in data:
+            raise RuntimeError(data["error"].get("message", "server error"))
+        if "serverContent" in data or "server_content" in data:
+            TRACER.event(FIRST_SERVER_CONTENT)
+
+        for b64 in iter_audio_parts(data):
+            TRACER.event(FIRST_AUDIO)
+            pcm = binascii.a2b_base64(b64)
+            stats.add_chunk(arrived, len(pcm))
+            if writer:
+                writer.write(pcm)
+
+        content = data.get("serverContent") or data.get("server_content") or {}
+        if content.get("turnComplete") or content.get("turn_complete"):
+            TRACER.event(TURN_COMPLETE)
+            return stats
+        if content.get("interrupted"):
+            stats.interrupted = True
+            return stats
+
+
+async def analyse_session(url: str, prompts, wav_path: str = None, timeout: float = 15.0,
+                          trace_path: str = None):
+    writer = StreamingWavWriter(wav_path) if wav_path else None
+    recorder = TraceRecorder(trace_path) if trace_path else None
+    results = []
+    try:
+        async with websockets.connect(url, close_timeout=2, max_size=None) as ws:
+            TRACER.event(CONNECT)
+            if recorder:
+                ws = TracingWebSocket(ws, recorder)
+            TRACER.event(SEND_SETUP)
+            await ws.send(codec.dumps(build_flutter_setup_message()))
+            data = codec.loads(await asyncio.wait_for(ws.recv(), timeout=timeout))
+            if "setupComplete" not in data:
+                raise RuntimeError(f"setup failed: {codec.preview(data, 200)}")
+            TRACER.event(SETUP_COMPLETE)
+
+            for prompt in prompts:
+                TRACER.event(SEND_TURN)
+                await ws.send(codec.dumps({
+                    "clientContent": {
+                        "turns": [{"role": "user", "parts": [{"text": prompt}]}],
+                        "turnComplete": True
+                    }
+                }))
+                stats = await consume_turn(ws, TurnStats(time.monotonic()), writer, timeout)
+                results.append(stats.summary())
+    finally:
+        if writer:
+            writer.close()
+        if recorder:
+            recorder.close()
+    return results
+
+
+def fmt_ms(value):
+    return f"{value:.0f}" if value is not None else "-"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gemini Live response audio jitter analyser")
+    parser.add_argument("api_key", nargs="?", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--endpoint", default=WS_ENDPOINT)
+    parser.add_argument("--turn", action="append", dest="turns",
+                        help="user text turn to send (repeatable)")
+    parser.add_argument("--wav", help="write all response audio to this WAV file")
+    parser.add_argument("--trace", help="record every frame to this binary trace (see gemini_live_trace.py)")
+    parser.add_argument("--chrome-trace", help="write Chrome trace-event JSON of the session here")
+    parser.add_argument("--timeout", type=float, default=15.0)
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    api_key = args.api_key
+    if not api_key and args.endpoint != WS_ENDPOINT:
+        api_key = "local-stand-in"  # the stand-in server ignores the key
+
+    if not api_key:
+        print("Usage: python3 gemini_live_audio.py <API_KEY> [--wav out.wav]")
+        sys.exit(1)
+
+    prompts = args.turns or ["Hello, I want to build a habit"]
+    if args.chrome_trace:
+        TRACER.enable()
+    with TRACER.session("analyse"):
+        results = await analyse_session(f"{args.endpoint}?key={api_key}", prompts, args.wav,
+                                        args.timeout, args.trace)
+
+    log(f"\n{'='*60}")
+    log("RESPONSE AUDIO")
+    log(f"{'='*60}")
+    for i, r in enumerate(results, 1):
+        gaps = r["gap_ms"]
+        log(f"  Turn {i}: {r['chunks']} chunks, {r['audio_ms']:.0f}ms audio"
+            f"{' (interrupted)' if r['interrupted'] else ''}")
+        log(f"    TTFB: {fmt_ms(r['ttfb_ms'])}ms")
+        log(f"    Gaps: p50={fmt_ms(gaps['p50'])} p95={fmt_ms(gaps['p95'])} "
+            f"p99={fmt_ms(gaps['p99'])} max={fmt_ms(gaps['max'])}ms")
+        log(f"    Min jitter buffer for gapless playback: {r['min_buffer_ms']:.0f}ms")
+    if args.wav:
+        log(f"\n💾 Audio written to {args.wav}")
+    if args.chrome_trace:
+        TRACER.write(args.chrome_trace)
+        log(f"\n🧭 Chrome trace written to {args.chrome_trace}")
+        print_summary(TRACER.summary(), log)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Gemini Live API Frame Codec
+JSON encode/decode for Live protocol frames, off the logging hot path
+
+Every realtime audio frame is a JSON envelope around a large base64 string.
+This module:
+  - uses orjson or ujson when installed and falls back to the stdlib json
+  - builds realtimeInput envelopes around pre-encoded base64 bytes without
+    re-serialising them
+  - provides preview() for logging, which abbreviates long strings before
+    serialising so a 1 s audio frame costs no more to log than a setup message
+  - is_audio_chunk() spots serverContent frames that carry audio
+
+Usage (micro-benchmark, 20 ms to 1 s frames):
+    python3 gemini_live_codec.py
+    python3 gemini_live_codec.py --backend json --iterations 2000
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import os
+import timeit
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+INPUT_MIME_TYPE = "audio/pcm;rate=16000"
+OUTPUT_MIME_TYPE = "audio/pcm;rate=24000"
+
+ENVELOPE_PREFIX = ('{"realtimeInput":{"mediaChunks":[{"mimeType":"%s","data":"' % INPUT_MIME_TYPE).encode()
+ENVELOPE_SUFFIX = b'"}]}}'
+
+# Strings longer than this are replaced by a length marker in preview()
+PREVIEW_STRING_LIMIT = 64
+PREVIEW_LIMIT = 500
+
+
+def _stdlib_dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _available_backends():
+    backends = {"json": (_stdlib_dumps, json.loads)}
+    if ujson is not None:
+        # ujson escapes "/" as "\/" by default, which hides base64 audio from gemini_live_trace
+        backends["ujson"] = (lambda obj: ujson.dumps(obj, escape_forward_slashes=False), ujson.loads)
+    if orjson is not None:
+        # orjson produces bytes; Live frames go out as text
+        backends["orjson"] = (lambda obj: orjson.dumps(obj).decode(), orjson.loads)
+    return backends
+
+
+BACKENDS = _available_backends()
+BACKEND = next(name for name in ("orjson", "ujson", "json") if name in BACKENDS)
+dumps, loads = BACKENDS[BACKEND]
+
+
+def use_backend(name: str):
+    """Switch the module-level dumps/loads, e.g. to compare against stdlib."""
+    global BACKEND, dumps, loads
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend '{name}' is not installed (available: {', '.join(BACKENDS)})")
+    BACKEND = name
+    dumps, loads = BACKENDS[name]
+
+
+def audio_envelope(b64: bytes) -> bytes:
+    """realtimeInput frame around already base64-encoded PCM."""
+    return b"".join((ENVELOPE_PREFIX, b64, ENVELOPE_SUFFIX))
+
+
+def is_audio_chunk(data: dict) -> bool:
+    """True for a serverContent frame whose model turn carries inlineData audio."""
+    content = data.get("serverContent") or data.get("server_content") or {}
+    parts = (content.get("modelTurn") or content.get("model_turn") or {}).get("parts") or []
+    return any("inlineData" in p or "inline_data" in p for p in parts)
+
+
+def _abbreviate(obj):
+    if isinstance(obj, str):
+        if len(obj) > PREVIEW_STRING_LIMIT:
+            return f"{obj[:16]}…<{len(obj)} chars>"
+        return obj
+    if isinstance(obj, dict):
+        return {k: _abbreviate(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_abbreviate(v) for v in obj]
+    return obj
+
+
+def preview(frame, limit: int = PREVIEW_LIMIT) -> str:
+    """Short, log-safe rendering of a frame (dict, str or bytes)."""
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        frame = bytes(frame[:limit]).decode("utf-8", "replace")
+    if isinstance(frame, str):
+        return frame if len(frame) <= limit else f"{frame[:limit]}…<{len(frame)} chars>"
+    text = dumps(_abbreviate(frame))
+    return text if len(text) <= limit else f"{text[:limit]}…"
+
+
+# ---------------------------------------------------------------------------
+# Micro-benchmark
+# ---------------------------------------------------------------------------
+
+FRAME_MS = [20, 40, 100, 250, 500, 1000]
+
+
+def _input_frame(ms: int):
+    pcm = os.urandom(16000 * 2 * ms // 1000)
+    b64_str = base64.b64encode(pcm).decode("ascii")
+    message = {"realtimeInput": {"mediaChunks": [{"mimeType": INPUT_MIME_TYPE, "data": b64_str}]}}
+    return pcm, message
+
+
+def _output_frame(ms: int) -> str:
+    pcm = os.urandom(24000 * 2 * ms // 1000)
+    return _stdlib_dumps({"serverContent": {"modelTurn": {"parts": [
+        {"inlineData": {"mimeType": OUTPUT_MIME_TYPE, "data": base64.b64encode(pcm).decode("ascii")}}
+    ]}}})
+
+
+def _time_us(fn, iterations: int) -> float:
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def run_benchmark(iterations: int = 500, backends=None):
+    backends = backends or list(BACKENDS)
+    rows = []
+    for ms in FRAME_MS:
+        pcm, message = _input_frame(ms)
+        server_frame = _output_frame(ms)
+        row = {"frame_ms": ms, "frame_bytes": len(_stdlib_dumps(message))}
+
+        b64_bytes = binascii.b2a_base64(pcm, newline=False)
+        row["envelope_us"] = _time_us(lambda: audio_envelope(b64_bytes), iterations)
+        row["pcm_to_envelope_us"] = _time_us(
+            lambda: audio_envelope(binascii.b2a_base64(pcm, newline=False)), iterations)
+        row["stdlib_pretty_log_us"] = _time_us(lambda: json.dumps(message, indent=2)[:500], iterations)
+        row["preview_log_us"] = _time_us(lambda: preview(message), iterations)
+
+        for name in backends:
+            enc, dec = BACKENDS[name]
+            row[f"{name}_dumps_us"] = _time_us(lambda: enc(message), iterations)
+            row[f"{name}_loads_us"] = _time_us(lambda: dec(server_frame), iterations)
+        rows.append(row)
+    return rows
+
+
+def print_benchmark(rows, backends):
+    cols = ["envelope_us", "pcm_to_envelope_us", "stdlib_pretty_log_us", "preview_log_us"]
+    for name in backends:
+        cols += [f"{name}_dumps_us", f"{name}_loads_us"]
+    print(f"{'FRAME':>7} {'BYTES':>9} " + " ".join(f"{c[:-3]:>20}" for c in cols))
+    for row in rows:
+        print(f"{row['frame_ms']:>5}ms {row['frame_bytes']:>9} "
+              + " ".join(f"{row[c]:>18.1f}µs" for c in cols))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Live frame codec micro-benchmark")
+    parser.add_argument("--backend", action="append", dest="backends", choices=list(BACKENDS),
+                        help="restrict to these JSON backends (repeatable)")
+    parser.add_argument("--iterations", type=int, default=500)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    backends = args.backends or list(BACKENDS)
+    print(f"Active backend: {BACKEND} (installed: {', '.join(BACKENDS)})")
+    print_benchmark(run_benchmark(args.iterations, backends), backends)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Gemini Live API Load Generator
+Voice coach rollout: handshake latency under concurrent load
+
+Opens N concurrent sessions with the exact Flutter setup message from
+test_gemini_live_full.py, ramping concurrency from 1 to N. Each session records
+(monotonic clock):
+  - connect_ms:      WebSocket open
+  - setup_ms:        setupComplete received
+  - first_audio_ms:  first serverContent audio chunk after a text turn
+
+Per stage and overall it reports p50/p95/p99 plus a latency histogram, and a
+throughput curve (completed sessions per second at each concurrency level).
+Results are written as JSON so runs can be diffed.
+
+Usage:
+    python3 gemini_live_load.py <API_KEY> --sessions 32 --ramp double --out run.json
+    python3 gemini_live_load.py --endpoint ws://127.0.0.1:8765 --sessions 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import websockets
+
+import gemini_live_codec as codec
+from gemini_live_spans import (CONNECT, FIRST_AUDIO, FIRST_SERVER_CONTENT, SEND_SETUP, SEND_TURN,
+                               SETUP_COMPLETE, TRACER)
+from latency_stats import summarise
+from test_gemini_live_full import MODEL, TURN_MESSAGE, WS_ENDPOINT, build_flutter_setup_message, log
+
+METRICS = ("connect_ms", "setup_ms", "first_audio_ms")
+
+
+async def run_session(url: str, setup_message: dict, timeout: float, want_audio: bool = True):
+    """Run one session and return its timing record."""
+    record = {"ok": False, "error": None}
+    payload = codec.dumps(setup_message)
+    start = time.monotonic()
+
+    def mark(name):
+        record[name] = (time.monotonic() - start) * 1000
+
+    try:
+        async with websockets.connect(url, close_timeout=2, max_size=None) as ws:
+            mark("connect_ms")
+            TRACER.event(CONNECT)
+            TRACER.event(SEND_SETUP)
+            await ws.send(payload)
+            data = codec.loads(await asyncio.wait_for(ws.recv(), timeout=timeout))
+            if "setupComplete" not in data:
+                record["error"] = data.get("error", {}).get("message", "unexpected setup response")
+                return record
+            mark("setup_ms")
+            TRACER.event(SETUP_COMPLETE)
+
+            if want_audio:
+                TRACER.event(SEND_TURN)
+                await ws.send(codec.dumps(TURN_MESSAGE))
+                deadline = time.monotonic() + timeout
+                while True:
+                    remaining = deadline - time.monotonic()
+                    data = codec.loads(await asyncio.wait_for(ws.recv(), timeout=max(remaining, 0)))
+                    if "serverContent" in data:
+                        TRACER.event(FIRST_SERVER_CONTENT)
+                    if codec.is_audio_chunk(data):
+                        mark("first_audio_ms")
+                        TRACER.event(FIRST_AUDIO)
+                        break
+                    if "error" in data:
+                        record["error"] = data["error"].get("message", "error before audio")
+                        return record
+            record["ok"] = True
+    except asyncio.TimeoutError:
+        record["error"] = "TIMEOUT"
+    except websockets.exceptions.ConnectionClosed as e:
+        record["error"] = f"closed {e.code}"
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def ramp_levels(max_sessions: int, mode: str, step: int):
+    if mode == "flat":
+        return [max_sessions]
+    levels = []
+    level = 1
+    while level < max_sessions:
+        levels.append(level)
+        level = level * 2 if mode == "double" else level + step
+    levels.append(max_sessions)
+    return levels
+
+
+async def run_stage(url, setup_message, concurrency, timeout, want_audio):
+    async def traced_session(i):
+        with TRACER.session(f"c={concurrency} #{i}"):
+            return await run_session(url, setup_message, timeout, want_audio)
+
+    start = time.monotonic()
+    records = await asyncio.gather(*(traced_session(i) for i in range(concurrency)))
+    wall_s = time.monotonic() - start
+    ok = [r for r in records if r["ok"]]
+
+    errors = {}
+    for r in records:
+        if r["error"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+
+    return {
+        "concurrency": concurrency,
+        "sessions": len(records),
+        "ok": len(ok),
+        "errors": errors,
+        "wall_s": wall_s,
+        "throughput_sps": len(ok) / wall_s if wall_s else 0.0,
+        "metrics": {m: summarise([r[m] for r in records if m in r]) for m in METRICS},
+        "_records": records,
+    }
+
+
+def fmt_ms(value):
+    return f"{value:7.0f}" if value is not None else "      -"
+
+
+def print_stage(stage):
+    log(f"  c={stage['concurrency']:<4} ok={stage['ok']}/{stage['sessions']}  "
+        f"{stage['throughput_sps']:.2f} sessions/s  wall={stage['wall_s']:.2f}s")
+    for name in METRICS:
+        m = stage["metrics"][name]
+        if m["count"]:
+            log(f"      {name:<15} p50={fmt_ms(m['p50'])} p95={fmt_ms(m['p95'])} p99={fmt_ms(m['p99'])}")
+    for error, count in stage["errors"].items():
+        log(f"      ❌ {count}x {error}")
+
+
+def print_histogram(name, summary, width=40):
+    if not summary["count"]:
+        return
+    log(f"\n{name} histogram (ms):")
+    peak = max(summary["histogram"].values()) or 1
+    for label, count in summary["histogram"].items():
+        bar = "█" * round(width * count / peak)
+        log(f"  {label:>8} | {bar} {count}")
+
+
+async def run_load(url, sessions, ramp="double", step=4, timeout=15.0, want_audio=True,
+                   model=MODEL):
+    setup_message = build_flutter_setup_message(model)
+    stages = []
+    for level in ramp_levels(sessions, ramp, step):
+        stage = await run_stage(url, setup_message, level, timeout, want_audio)
+        print_stage(stage)
+        stages.append(stage)
+
+    all_records = [r for s in stages for r in s.pop("_records")]
+    overall = {m: summarise([r[m] for r in all_records if m in r]) for m in METRICS}
+    return {
+        "model": model,
+        "sessions": sessions,
+        "ramp": ramp,
+        "want_audio": want_audio,
+        "throughput_curve": [[s["concurrency"], s["throughput_sps"]] for s in stages],
+        "stages": stages,
+        "overall": overall,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gemini Live handshake load generator")
+    parser.add_argument("api_key", nargs="?", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--endpoint", default=WS_ENDPOINT)
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--sessions", type=int, default=16, help="peak concurrent sessions (N)")
+    parser.add_argument("--ramp", choices=["double", "linear", "flat"], default="double",
+                        help="concurrency schedule from 1 to N")
+    parser.add_argument("--step", type=int, default=4, help="increment for --ramp linear")
+    parser.add_argument("--timeout", type=float, default=15.0)
+    parser.add_argument("--no-audio", action="store_true",
+                        help="stop after setupComplete instead of waiting for first audio")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--chrome-trace", help="write Chrome trace-event JSON of every session here")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    api_key = args.api_key
+    if not api_key and args.endpoint != WS_ENDPOINT:
+        api_key = "local-stand-in"  # the stand-in server ignores the key
+
+    if not api_key:
+        print("Usage: python3 gemini_live_load.py <API_KEY> [--sessions N]")
+        sys.exit(1)
+
+    log(f"Endpoint: {args.endpoint}")
+    if args.chrome_trace:
+        TRACER.enable()
+    log(f"Ramping 1 → {args.sessions} sessions ({args.ramp})")
+    report = await run_load(f"{args.endpoint}?key={api_key}", args.sessions, args.ramp,
+                            args.step, args.timeout, not args.no_audio, args.model)
+
+    log(f"\n{'='*60}")
+    log("OVERALL")
+    log(f"{'='*60}")
+    for name in METRICS:
+        print_histogram(name, report["overall"][name])
+
+    log("\nThroughput curve (concurrency → sessions/s):")
+    for concurrency, sps in report["throughput_curve"]:
+        log(f"  {concurrency:>4} → {sps:.2f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        log(f"\n💾 Results written to {args.out}")
+
+    if args.chrome_trace:
+        TRACER.write(args.chrome_trace)
+        log(f"\n🧭 Chrome trace written to {args.chrome_trace}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
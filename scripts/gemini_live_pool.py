@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Gemini Live API Pre-warmed Session Pool
+Should the voice coach pre-warm tokens and sessions?
+
+Every new session pays for the TLS handshake, WebSocket upgrade and setup round
+trip (plus a get-gemini-ephemeral-token call in the app) before the first
+useful byte. LiveSessionPool keeps K sessions connected and past setupComplete,
+hands them out on demand, and replaces any that expire or are closed by the
+server. Sessions are single use: a Live session carries conversation state, so
+an acquired session is never returned to the pool.
+
+The CLI compares cold (connect + setup + turn) against warm (acquire + turn)
+time to first audio.
+
+Usage:
+    python3 gemini_live_pool.py <API_KEY> --size 2 --runs 10
+    python3 gemini_live_pool.py --endpoint ws://127.0.0.1:8765 --runs 20
+    python3 gemini_live_pool.py --token-url https://<project>.supabase.co/functions/v1/get-gemini-ephemeral-token
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import time
+import urllib.request
+
+import websockets
+
+import gemini_live_codec as codec
+from latency_stats import percentile
+from test_gemini_live_full import TURN_MESSAGE, WS_ENDPOINT, build_flutter_setup_message, log
+
+# GeminiLiveService treats backend ephemeral tokens as valid for 30 minutes
+DEFAULT_MAX_AGE_S = 25 * 60
+# acquire() gives up once this many session opens in a row have failed with nothing ready
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+def static_key_url(endpoint: str, api_key: str):
+    async def factory():
+        return f"{endpoint}?key={api_key}"
+    return factory
+
+
+def ephemeral_token_url(endpoint: str, token_url: str, bearer: str = None):
+    """URL factory that fetches a fresh token per session, like the app does."""
+    def fetch():
+        request = urllib.request.Request(token_url, data=b"{}", method="POST",
+                                         headers={"Content-Type": "application/json"})
+        if bearer:
+            request.add_header("Authorization", f"Bearer {bearer}")
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.load(response)["token"]
+
+    async def factory():
+        token = await asyncio.get_running_loop().run_in_executor(None, fetch)
+        return f"{endpoint}?access_token={token}"
+    return factory
+
+
+def _is_open(ws) -> bool:
+    # websockets < 14 exposes `.open`; newer releases expose `.state`
+    if hasattr(ws, "open"):
+        return ws.open
+    return ws.state.name == "OPEN"
+
+
+class PooledSession:
+    def __init__(self, ws, created_at: float, setup_ms: float):
+        self.ws = ws
+        self.created_at = created_at
+        self.setup_ms = setup_ms
+
+    def age_s(self) -> float:
+        return time.monotonic() - self.created_at
+
+    async def close(self):
+        await self.ws.close()
+
+
+class LiveSessionPool:
+    """Keeps `size` Live sessions connected and set up."""
+
+    def __init__(self, url_factory, setup_message: dict, size: int = 2,
+                 max_age_s: float = DEFAULT_MAX_AGE_S, timeout: float = 15.0):
+        self.url_factory = url_factory
+        self.setup_payload = codec.dumps(setup_message)
+        self.size = size
+        self.max_age_s = max_age_s
+        self.timeout = timeout
+
+        self._ready = collections.deque()
+        self._available = asyncio.Condition()
+        self._pending = set()
+        self._monitor = None
+        self._closed = False
+
+        self.opened = 0
+        self.replaced = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+
+    async def _open_session(self) -> PooledSession:
+        start = time.monotonic()
+        url = await self.url_factory()
+        ws = await websockets.connect(url, close_timeout=2, max_size=None)
+        try:
+            await ws.send(self.setup_payload)
+            data = codec.loads(await asyncio.wait_for(ws.recv(), timeout=self.timeout))
+            if "setupComplete" not in data:
+                raise RuntimeError(f"setup failed: {codec.preview(data, 200)}")
+        except BaseException:
+            await ws.close()
+            raise
+        self.opened += 1
+        return PooledSession(ws, time.monotonic(), (time.monotonic() - start) * 1000)
+
+    async def _fill_one(self):
+        try:
+            session = await self._open_session()
+        except Exception as e:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            log(f"⚠️ Pool: failed to open session: {self.last_error}")
+            # Wake waiters so acquire() can give up instead of waiting on a pool that can't fill
+            async with self._available:
+                self._available.notify_all()
+            await asyncio.sleep(1)  # back off before the monitor retries
+            return
+        self.consecutive_failures = 0
+        if self._closed:
+            await session.close()
+            return
+        async with self._available:
+            self._ready.append(session)
+            self._available.notify()
+
+    def _replenish(self):
+        missing = self.size - len(self._ready) - len(self._pending)
+        for _ in range(max(0, missing)):
+            task = asyncio.create_task(self._fill_one())
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def _is_usable(self, session: PooledSession) -> bool:
+        return _is_open(session.ws) and session.age_s() < self.max_age_s
+
+    async def _evict_stale(self):
+        async with self._available:
+            stale = [s for s in self._ready if not self._is_usable(s)]
+            for session in stale:
+                self._ready.remove(session)
+                self.replaced += 1
+                await session.close()
+
+    async def _maintain(self, interval: float):
+        while not self._closed:
+            await self._evict_stale()
+            self._replenish()
+            await asyncio.sleep(interval)
+
+    async def start(self, check_interval: float = 1.0, wait: bool = True):
+        self._replenish()
+        self._monitor = asyncio.create_task(self._maintain(check_interval))
+        if wait and self._pending:
+            await asyncio.wait(list(self._pending))
+        return self
+
+    async def acquire(self, timeout: float = None) -> PooledSession:
+        """Take a warm session, waiting up to `timeout` (default: the pool's) if the pool is empty.
+
+        Raises TimeoutError when no session becomes ready in time, and RuntimeError
+        once MAX_CONSECUTIVE_FAILURES opens in a row have failed with none ready.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        async with self._available:
+            while True:
+                while self._ready:
+                    session = self._ready.popleft()
+                    if self._is_usable(session):
+                        self._replenish()
+                        return session
+                    self.replaced += 1
+                    await session.close()
+                if self.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                    raise RuntimeError(f"Pool: {self.consecutive_failures} session opens failed in a row "
+                                       f"(last: {self.last_error})")
+                self._replenish()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Pool: no warm session within {timeout:g}s")
+                try:
+                    await asyncio.wait_for(self._available.wait(), remaining)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Pool: no warm session within {timeout:g}s") from None
+
+    async def close(self):
+        self._closed = True
+        if self._monitor:
+            self._monitor.cancel()
+        for task in list(self._pending):
+            task.cancel()
+        while self._ready:
+            await self._ready.popleft().close()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+async def first_audio_after_turn(ws, timeout: float) -> float:
+    """Send a text turn and return ms until the first audio chunk."""
+    start = time.monotonic()
+    await ws.send(codec.dumps(TURN_MESSAGE))
+    while True:
+        data = codec.loads(await asyncio.wait_for(ws.recv(), timeout=timeout))
+        if codec.is_audio_chunk(data):
+            return (time.monotonic() - start) * 1000
+        if "error" in data:
+            raise RuntimeError(data["error"].get("message", "error before audio"))
+
+
+def run_error(e: BaseException) -> str:
+    """Failure label for one run, as gemini_live_load.run_session records it."""
+    if isinstance(e, asyncio.TimeoutError):
+        return "TIMEOUT"
+    if isinstance(e, websockets.exceptions.ConnectionClosed):
+        return f"closed {e.code}"
+    return f"{type(e).__name__}: {e}"
+
+
+async def cold_run(url_factory, setup_message, timeout):
+    """(ms to first audio on a fresh connection, None), or (None, error)."""
+    start = time.monotonic()
+    try:
+        url = await url_factory()
+        async with websockets.connect(url, close_timeout=2, max_size=None) as ws:
+            await ws.send(codec.dumps(setup_message))
+            data = codec.loads(await asyncio.wait_for(ws.recv(), timeout=timeout))
+            if "setupComplete" not in data:
+                return None, data.get("error", {}).get("message", "unexpected setup response")
+            await first_audio_after_turn(ws, timeout)
+    except Exception as e:
+        return None, run_error(e)
+    return (time.monotonic() - start) * 1000, None
+
+
+async def warm_run(pool: LiveSessionPool, timeout):
+    """(ms to first audio on a pooled session, None), or (None, error)."""
+    start = time.monotonic()
+    try:
+        session = await pool.acquire()
+        try:
+            await first_audio_after_turn(session.ws, timeout)
+        finally:
+            await session.close()
+    except Exception as e:
+        return None, run_error(e)
+    return (time.monotonic() - start) * 1000, None
+
+
+async def compare(url_factory, runs=10, size=2, max_age_s=DEFAULT_MAX_AGE_S, timeout=15.0,
+                  think_time=1.0):
+    """Measure cold vs warm time to first audio.
+
+    Warm runs are spaced by `think_time` so the pool can replace the session
+    that was just taken, as it would between real voice-coach opens. Failed
+    runs are counted by error and left out of the percentiles.
+    """
+    setup_message = build_flutter_setup_message()
+
+    cold = []
+    for _ in range(runs):
+        cold.append(await cold_run(url_factory, setup_message, timeout))
+
+    warm = []
+    async with LiveSessionPool(url_factory, setup_message, size, max_age_s, timeout) as pool:
+        for _ in range(runs):
+            warm.append(await warm_run(pool, timeout))
+            await asyncio.sleep(think_time)
+        stats = {"opened": pool.opened, "replaced": pool.replaced, "failures": pool.failures}
+
+    def describe(results):
+        ordered = sorted(ms for ms, _ in results if ms is not None)
+        return {"ok": len(ordered),
+                "p50": percentile(ordered, 50), "p95": percentile(ordered, 95),
+                "mean": sum(ordered) / len(ordered) if ordered else None,
+                "errors": dict(collections.Counter(error for _, error in results if error))}
+
+    return {"cold_ms": describe(cold), "warm_ms": describe(warm), "pool": stats}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gemini Live pre-warmed session pool benchmark")
+    parser.add_argument("api_key", nargs="?", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--endpoint", default=WS_ENDPOINT)
+    parser.add_argument("--token-url", help="get-gemini-ephemeral-token function URL (uses access_token=)")
+    parser.add_argument("--bearer", default=os.environ.get("SUPABASE_ANON_KEY"),
+                        help="Authorization bearer for --token-url (default: $SUPABASE_ANON_KEY)")
+    parser.add_argument("--size", type=int, default=2, help="warm sessions to keep (K)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE_S,
+                        help="seconds before a pooled session is replaced")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="seconds between warm acquisitions")
+    parser.add_argument("--timeout", type=float, default=15.0)
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    if args.token_url:
+        url_factory = ephemeral_token_url(args.endpoint, args.token_url, args.bearer)
+    else:
+        api_key = args.api_key
+        if not api_key and args.endpoint != WS_ENDPOINT:
+            api_key = "local-stand-in"  # the stand-in server ignores the key
+        if not api_key:
+            print("Usage: python3 gemini_live_pool.py <API_KEY> [--size K] [--runs N]")
+            sys.exit(1)
+        url_factory = static_key_url(args.endpoint, api_key)
+
+    log(f"Endpoint: {args.endpoint}")
+    log(f"Comparing {args.runs} cold vs warm sessions (pool size {args.size})...")
+    report = await compare(url_factory, args.runs, args.size, args.max_age, args.timeout,
+                           args.think_time)
+
+    cold, warm = report["cold_ms"], report["warm_ms"]
+    log(f"\n{'='*60}")
+    log("TIME TO FIRST AUDIO")
+    log(f"{'='*60}")
+    for name, result in (("Cold", cold), ("Warm", warm)):
+        if result["ok"]:
+            line = f"p50={result['p50']:.0f}ms p95={result['p95']:.0f}ms mean={result['mean']:.0f}ms"
+        else:
+            line = "no successful runs"
+        log(f"  {name}: {line} ({result['ok']}/{args.runs} ok)")
+        for error, count in result["errors"].items():
+            log(f"    ❌ {count}× {error}")
+    if cold["ok"] and warm["ok"]:
+        log(f"  Saved by pre-warming: {cold['p50'] - warm['p50']:.0f}ms at p50")
+    log(f"  Pool: {report['pool']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Gemini Live API Span Tracing
+Where does the time go between connect, setup, first token and first audio?
+
+A small span/event API used by the Live probe scripts. Output is Chrome
+trace-event JSON (load it in chrome://tracing or https://ui.perfetto.dev) with
+one track per session, plus a per-session critical-path summary. Critical-path
+phases (connect, setup, first content, ...) are derived from milestone events
+and drawn as spans on each session's track.
+
+Tracing is off by default. While disabled, span() returns a shared no-op
+context manager and event() returns immediately, so instrumented code pays a
+single attribute check per call.
+
+    from gemini_live_spans import TRACER
+    TRACER.enable()
+    with TRACER.session("kore/audio"):
+        ws = await websockets.connect(url)
+        TRACER.event(CONNECT)
+        with TRACER.span("encode_audio"):
+            ...
+        TRACER.event(SETUP_COMPLETE)
+    TRACER.write("trace.json")
+
+Usage (summarise an existing trace file):
+    python3 gemini_live_spans.py trace.json
+"""
+
+import contextvars
+import json
+import sys
+import threading
+import time
+
+# Milestone names shared by all probes
+CONNECT = "connect"
+SEND_SETUP = "send_setup"
+SETUP_COMPLETE = "setup_complete"
+SEND_TURN = "send_turn"
+FIRST_SERVER_CONTENT = "first_server_content"
+FIRST_AUDIO = "first_audio"
+TURN_COMPLETE = "turn_complete"
+
+# (label, from milestone, to milestone) making up the critical path
+CRITICAL_PATH = [
+    ("connect", "session_start", CONNECT),
+    ("setup", SEND_SETUP, SETUP_COMPLETE),
+    ("first_content", SEND_TURN, FIRST_SERVER_CONTENT),
+    ("first_audio", SEND_TURN, FIRST_AUDIO),
+    ("turn", SEND_TURN, TURN_COMPLETE),
+]
+
+_session = contextvars.ContextVar("gemini_live_span_session", default=0)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = self.tracer._now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = self.tracer._now_us()
+        args = self.args
+        if exc_type is not None:
+            args = dict(args or {}, error=exc_type.__name__)
+        self.tracer._emit({"name": self.name, "ph": "X", "ts": self.start,
+                           "dur": end - self.start, "args": args or {}})
+        return False
+
+
+class _SessionScope:
+    def __init__(self, tracer, label):
+        self.tracer = tracer
+        self.label = label
+
+    def __enter__(self):
+        tracer = self.tracer
+        with tracer._lock:
+            tracer._next_tid += 1
+            tid = tracer._next_tid
+        self._token = _session.set(tid)
+        tracer._emit({"name": "thread_name", "ph": "M", "args": {"name": self.label}})
+        tracer._milestone("session_start", tracer._now_us())
+        return self
+
+    def __exit__(self, *exc):
+        _session.reset(self._token)
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._origin_ns = time.perf_counter_ns()
+        self._events = []
+        self._milestones = {}
+        self._labels = {}
+        self._next_tid = 0
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        return self
+
+    def _now_us(self) -> float:
+        return (time.perf_counter_ns() - self._origin_ns) / 1000
+
+    def _emit(self, event: dict):
+        tid = _session.get()
+        event["pid"] = 1
+        event["tid"] = tid
+        if event["ph"] == "M":
+            self._labels[tid] = event["args"]["name"]
+        self._events.append(event)
+
+    def _milestone(self, name: str, ts: float):
+        # Only the first occurrence per session counts (e.g. first serverContent)
+        self._milestones.setdefault(_session.get(), {}).setdefault(name, ts)
+
+    def session(self, label: str):
+        """Scope subsequent spans/events in this task to their own timeline track."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _SessionScope(self, label)
+
+    def span(self, name: str, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def event(self, name: str, **args):
+        """Instant event; also recorded as a critical-path milestone."""
+        if not self.enabled:
+            return
+        ts = self._now_us()
+        self._emit({"name": name, "ph": "i", "s": "t", "ts": ts, "args": args})
+        self._milestone(name, ts)
+
+    def summary(self) -> dict:
+        """Critical-path durations in ms for each session."""
+        result = {}
+        for tid, marks in self._milestones.items():
+            label = self._labels.get(tid, f"session-{tid}")
+            row = {}
+            for name, start, end in CRITICAL_PATH:
+                if start in marks and end in marks:
+                    row[name] = (marks[end] - marks[start]) / 1000
+            if row:
+                result[label if label not in result else f"{label} #{tid}"] = row
+        return result
+
+    def _phase_spans(self):
+        for tid, marks in self._milestones.items():
+            for name, start, end in CRITICAL_PATH:
+                if start in marks and end in marks:
+                    yield {"name": name, "cat": "critical_path", "ph": "X", "pid": 1, "tid": tid,
+                           "ts": marks[start], "dur": marks[end] - marks[start], "args": {}}
+
+    def to_chrome(self) -> dict:
+        return {"traceEvents": self._events + list(self._phase_spans()), "displayTimeUnit": "ms",
+                "otherData": {"critical_path_ms": self.summary()}}
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_chrome(), f)
+
+
+TRACER = Tracer()
+
+
+def print_summary(summary: dict, out=print):
+    if not summary:
+        return
+    columns = [name for name, _, _ in CRITICAL_PATH]
+    width = max(len(label) for label in summary)
+    out(f"  {'SESSION':<{width}}  " + " ".join(f"{c:>13}" for c in columns))
+    for label, row in summary.items():
+        cells = [f"{row[c]:>11.1f}ms" if c in row else f"{'-':>13}" for c in columns]
+        out(f"  {label:<{width}}  " + " ".join(cells))
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 gemini_live_spans.py <trace.json>")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        trace = json.load(f)
+    print_summary(trace.get("otherData", {}).get("critical_path_ms", {}))
+
+
+if __name__ == "__main__":
+    main()
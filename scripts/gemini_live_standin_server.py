@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Local Gemini Live (BidiGenerateContent) stand-in server
+Offline latency testing for the Live API tooling
+
+Speaks the subset of the Live protocol that GeminiLiveService._handleServerMessage
+understands:
+  - {"setup": ...}                      -> {"setupComplete": {}}
+  - {"clientContent": {turnComplete}}   -> serverContent.modelTurn audio chunks,
+                                           then serverContent.turnComplete
+  - {"realtimeInput": {mediaChunks}}    -> buffered; an empty mediaChunks list
+                                           interrupts the current response
+                                           (serverContent.interrupted)
+
+Latency, jitter, audio chunk size and error injection are configurable so the
+client-side timing of the probe scripts can be measured without network access
+or an API key.
+
+Usage:
+    python3 gemini_live_standin_server.py --port 8765 --setup-latency 120 --jitter 30
+    python3 test_gemini_live.py dummy --endpoint ws://127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import base64
+import math
+import random
+import struct
+from datetime import datetime
+
+import websockets
+
+import gemini_live_codec as codec
+
+# Gemini Live replies with 24 kHz 16-bit mono PCM (codec.OUTPUT_MIME_TYPE)
+OUTPUT_SAMPLE_RATE = 24000
+
+
+def log(msg):
+    timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+    print(f"[{timestamp}] {msg}")
+
+
+class StandInConfig:
+    """Knobs for the stand-in server. All times are in milliseconds."""
+
+    def __init__(self, setup_latency=150.0, first_audio_latency=300.0, jitter=25.0,
+                 chunk_ms=40, turn_audio_ms=2000, realtime=True,
+                 error_rate=0.0, close_rate=0.0, hang_rate=0.0, seed=None,
+                 setup_latency_per_kb=0.0):
+        self.setup_latency = setup_latency
+        # Extra setup latency per KB of setup message, to model prompt processing
+        self.setup_latency_per_kb = setup_latency_per_kb
+        self.first_audio_latency = first_audio_latency
+        self.jitter = jitter
+        self.chunk_ms = chunk_ms
+        self.turn_audio_ms = turn_audio_ms
+        # When True, audio chunks are paced at playback speed like the real API
+        self.realtime = realtime
+        # Probabilities applied per setup message
+        self.error_rate = error_rate
+        self.close_rate = close_rate
+        self.hang_rate = hang_rate
+        self.rng = random.Random(seed)
+
+    def delay(self, base_ms: float) -> float:
+        """Base latency plus uniform +/- jitter, in seconds."""
+        jittered = base_ms + self.rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, jittered) / 1000
+
+
+def synth_pcm(duration_ms: int, sample_rate: int = OUTPUT_SAMPLE_RATE, freq: float = 220.0) -> bytes:
+    """Generate a 16-bit little-endian sine tone to stand in for model speech."""
+    n = int(sample_rate * duration_ms / 1000)
+    samples = (int(8000 * math.sin(2 * math.pi * freq * i / sample_rate)) for i in range(n))
+    return struct.pack(f"<{n}h", *samples)
+
+
+class StandInSession:
+    """Per-connection protocol state."""
+
+    def __init__(self, ws, config: StandInConfig, session_id: int):
+        self.ws = ws
+        self.config = config
+        self.session_id = session_id
+        self.setup_done = False
+        self.audio_bytes_in = 0
+        self.response_task = None
+        # One pre-built tone chunk; every response reuses it
+        self.chunk_b64 = base64.b64encode(synth_pcm(config.chunk_ms)).decode("ascii")
+
+    async def send(self, payload: dict):
+        await self.ws.send(codec.dumps(payload))
+
+    async def handle_setup(self, message: dict, size: int):
+        cfg = self.config
+        model = message["setup"].get("model", "?")
+        roll = cfg.rng.random()
+
+        await asyncio.sleep(cfg.delay(cfg.setup_latency + cfg.setup_latency_per_kb * size / 1024))
+
+        if roll < cfg.error_rate:
+            log(f"  #{self.session_id} injecting setup error")
+            await self.send({"error": {"code": 400, "message": f"Injected error for {model}"}})
+            return
+        roll -= cfg.error_rate
+        if roll < cfg.close_rate:
+            log(f"  #{self.session_id} injecting close 1011")
+            await self.ws.close(code=1011, reason="Injected internal error")
+            return
+        roll -= cfg.close_rate
+        if roll < cfg.hang_rate:
+            log(f"  #{self.session_id} injecting setup hang")
+            return
+
+        self.setup_done = True
+        await self.send({"setupComplete": {}})
+
+    async def stream_response(self):
+        """Send one model turn of audio chunks followed by turnComplete."""
+        cfg = self.config
+        await asyncio.sleep(cfg.delay(cfg.first_audio_latency))
+        chunks = max(1, cfg.turn_audio_ms // cfg.chunk_ms)
+        for _ in range(chunks):
+            await self.send({
+                "serverContent": {
+                    "modelTurn": {
+                        "parts": [{"inlineData": {"mimeType": codec.OUTPUT_MIME_TYPE, "data": self.chunk_b64}}]
+                    }
+                }
+            })
+            if cfg.realtime:
+                await asyncio.sleep(cfg.delay(cfg.chunk_ms))
+        await self.send({"serverContent": {"turnComplete": True}})
+
+    async def start_response(self):
+        await self.interrupt()
+        self.response_task = asyncio.create_task(self.stream_response())
+
+    async def interrupt(self):
+        """Cancel an in-flight response and tell the client, like barge-in does."""
+        if self.response_task and not self.response_task.done():
+            self.response_task.cancel()
+            try:
+                await self.response_task
+            except asyncio.CancelledError:
+                pass
+            await self.send({"serverContent": {"interrupted": True}})
+        self.response_task = None
+
+    async def handle(self, message: dict, size: int = 0):
+        if "setup" in message:
+            await self.handle_setup(message, size)
+            return
+
+        if not self.setup_done:
+            await self.ws.close(code=1007, reason="Setup must be the first message")
+            return
+
+        if "clientContent" in message:
+            if message["clientContent"].get("turnComplete"):
+                await self.start_response()
+        elif "realtimeInput" in message:
+            chunks = message["realtimeInput"].get("mediaChunks")
+            if chunks == []:
+                await self.interrupt()
+            for chunk in chunks or []:
+                self.audio_bytes_in += len(chunk.get("data", "")) * 3 // 4
+        else:
+            await self.ws.close(code=1007, reason=f"Unknown message: {list(message)}")
+
+    async def run(self):
+        try:
+            async for raw in self.ws:
+                try:
+                    message = codec.loads(raw)
+                except ValueError:
+                    await self.ws.close(code=1007, reason="Invalid JSON payload")
+                    return
+                await self.handle(message, len(raw))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if self.response_task:
+                self.response_task.cancel()
+
+
+class StandInServer:
+    def __init__(self, config: StandInConfig, host: str = "127.0.0.1", port: int = 8765):
+        self.config = config
+        self.host = host
+        self.port = port
+        self.sessions = 0
+        self._server = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws, path=None):
+        # `path` is only passed by older websockets releases
+        self.sessions += 1
+        session_id = self.sessions
+        log(f"🔌 Session #{session_id} opened")
+        await StandInSession(ws, self.config, session_id).run()
+        log(f"🔌 Session #{session_id} closed")
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port, max_size=None)
+        if not self.port:
+            # Port 0 asks the OS for a free port
+            self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local Gemini Live stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--setup-latency", type=float, default=150.0, help="ms before setupComplete")
+    parser.add_argument("--setup-latency-per-kb", type=float, default=0.0,
+                        help="extra ms before setupComplete per KB of setup message")
+    parser.add_argument("--first-audio-latency", type=float, default=300.0,
+                        help="ms from turnComplete to first audio chunk")
+    parser.add_argument("--jitter", type=float, default=25.0, help="+/- ms applied to every delay")
+    parser.add_argument("--chunk-ms", type=int, default=40, help="audio per serverContent chunk")
+    parser.add_argument("--turn-audio-ms", type=int, default=2000, help="audio per model turn")
+    parser.add_argument("--burst", action="store_true", help="send audio as fast as possible")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a setup error")
+    parser.add_argument("--close-rate", type=float, default=0.0, help="probability of close 1011")
+    parser.add_argument("--hang-rate", type=float, default=0.0,
+                        help="probability of never sending setupComplete")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    config = StandInConfig(
+        setup_latency=args.setup_latency,
+        first_audio_latency=args.first_audio_latency,
+        jitter=args.jitter,
+        chunk_ms=args.chunk_ms,
+        turn_audio_ms=args.turn_audio_ms,
+        realtime=not args.burst,
+        error_rate=args.error_rate,
+        close_rate=args.close_rate,
+        hang_rate=args.hang_rate,
+        seed=args.seed,
+        setup_latency_per_kb=args.setup_latency_per_kb,
+    )
+    async with StandInServer(config, args.host, args.port) as server:
+        log(f"🎙️ Stand-in Live server listening on {server.endpoint}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
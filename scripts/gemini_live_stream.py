@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Gemini Live API Realtime Audio Pump
+Exercises the realtimeInput path used by GeminiLiveService.sendAudio()
+
+Replays a WAV (16-bit mono 16 kHz) or raw s16le PCM file as base64
+`audio/pcm;rate=16000` realtimeInput chunks, paced at real time or N x real
+time, then sends the same end-of-turn signal as GeminiLiveService.sendEndTurn().
+
+The file is memory-mapped and sliced into fixed-duration frames with memoryview
+(no per-frame copies of the PCM), and each frame is base64-encoded into a
+reused JSON envelope buffer. Reports send-side CPU per second of audio,
+backpressure stalls and time to first response audio, so chunk duration can be
+sized for the lowest latency.
+
+Usage:
+    python3 gemini_live_stream.py <API_KEY> speech.wav
+    python3 gemini_live_stream.py speech.wav --endpoint ws://127.0.0.1:8765 --chunk-ms 20,40,100 --speed 4
+"""
+
+import argparse
+import asyncio
+import binascii
+import inspect
+import mmap
+import os
+import struct
+import sys
+import time
+
+import websockets
+
+import gemini_live_codec as codec
+from test_gemini_live_full import WS_ENDPOINT, build_flutter_setup_message, log
+
+INPUT_SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+
+# A send that takes longer than this is counted as a backpressure stall
+STALL_THRESHOLD_MS = 5.0
+
+END_TURN_MESSAGE = codec.dumps({
+    "clientContent": {
+        "turns": [],  # API requires 'turns' even if empty (see sendEndTurn)
+        "turnComplete": True,
+    }
+})
+
+
+class PcmSource:
+    """Memory-mapped view over the PCM samples of a WAV or raw .pcm file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        start, length = self._locate_samples()
+        self.pcm = memoryview(self._map)[start:start + length]
+
+    def _locate_samples(self):
+        """Walk the RIFF chunks to find the data region; raw files are all samples."""
+        buf = self._map
+        if buf[:4] != b"RIFF" or buf[8:12] != b"WAVE":
+            return 0, len(buf)
+
+        offset = 12
+        fmt_seen = False
+        while offset + 8 <= len(buf):
+            chunk_id = buf[offset:offset + 4]
+            (chunk_len,) = struct.unpack_from("<I", buf, offset + 4)
+            body = offset + 8
+            if chunk_id == b"fmt ":
+                audio_format, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", buf, body)
+                if audio_format != 1 or channels != 1 or rate != INPUT_SAMPLE_RATE or bits != 16:
+                    raise ValueError(
+                        f"{self.path}: need 16-bit mono PCM at {INPUT_SAMPLE_RATE} Hz, got "
+                        f"format={audio_format} channels={channels} rate={rate} bits={bits}")
+                fmt_seen = True
+            elif chunk_id == b"data":
+                if not fmt_seen:
+                    raise ValueError(f"{self.path}: data chunk before fmt chunk")
+                return body, min(chunk_len, len(buf) - body)
+            offset = body + chunk_len + (chunk_len & 1)
+        raise ValueError(f"{self.path}: no data chunk")
+
+    @property
+    def duration_s(self) -> float:
+        return len(self.pcm) / (INPUT_SAMPLE_RATE * BYTES_PER_SAMPLE)
+
+    def frames(self, chunk_ms: int):
+        """Yield zero-copy memoryview slices of chunk_ms each."""
+        step = INPUT_SAMPLE_RATE * BYTES_PER_SAMPLE * chunk_ms // 1000
+        for offset in range(0, len(self.pcm), step):
+            yield self.pcm[offset:offset + step]
+
+    def close(self):
+        self.pcm.release()
+        self._map.close()
+        self._file.close()
+
+
+class EnvelopeEncoder:
+    """Builds realtimeInput JSON envelopes in a reused buffer.
+
+    The envelope for a full frame always has the same length, so one bytearray
+    is allocated per frame size and only the base64 region is overwritten.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def encode(self, frame: memoryview) -> memoryview:
+        b64_len = 4 * ((len(frame) + 2) // 3)
+        buf = self._buffers.get(b64_len)
+        if buf is None:
+            buf = bytearray(codec.ENVELOPE_PREFIX) + bytearray(b64_len) + bytearray(codec.ENVELOPE_SUFFIX)
+            self._buffers[b64_len] = buf
+        start = len(codec.ENVELOPE_PREFIX)
+        buf[start:start + b64_len] = binascii.b2a_base64(frame, newline=False)
+        return memoryview(buf)
+
+
+def _supports_text_flag(ws) -> bool:
+    # websockets >= 14 can send bytes as a text frame; older releases need str
+    return "text" in inspect.signature(ws.send).parameters
+
+
+async def pump_audio(ws, source: PcmSource, chunk_ms: int, speed: float = 1.0):
+    """Stream the source as paced realtimeInput chunks and return send stats."""
+    encoder = EnvelopeEncoder()
+    text_flag = _supports_text_flag(ws)
+    interval = chunk_ms / 1000 / speed if speed > 0 else 0.0
+
+    stalls = 0
+    stall_ms = 0.0
+    max_late_ms = 0.0
+    frames = 0
+    bytes_sent = 0
+
+    cpu_start = time.process_time()
+    start = time.monotonic()
+    for i, frame in enumerate(source.frames(chunk_ms)):
+        if interval:
+            target = start + i * interval
+            delay = target - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_late_ms = max(max_late_ms, -delay * 1000)
+
+        envelope = encoder.encode(frame)
+        send_start = time.monotonic()
+        if text_flag:
+            await ws.send(envelope, text=True)
+        else:
+            await ws.send(envelope.tobytes().decode("ascii"))
+        send_ms = (time.monotonic() - send_start) * 1000
+        if send_ms > STALL_THRESHOLD_MS:
+            stalls += 1
+            stall_ms += send_ms
+
+        frames += 1
+        bytes_sent += len(envelope)
+    wall_s = time.monotonic() - start
+    cpu_s = time.process_time() - cpu_start
+
+    audio_s = source.duration_s
+    return {
+        "chunk_ms": chunk_ms,
+        "speed": speed,
+        "frames": frames,
+        "audio_s": audio_s,
+        "wall_s": wall_s,
+        "bytes_sent": bytes_sent,
+        "cpu_ms_per_audio_s": cpu_s * 1000 / audio_s if audio_s else 0.0,
+        "stalls": stalls,
+        "stall_ms": stall_ms,
+        "max_late_ms": max_late_ms,
+    }
+
+
+async def stream_file(url: str, path: str, chunk_ms: int, speed: float, timeout: float = 15.0):
+    """Open a session, pump the file, end the turn and time the first reply audio."""
+    source = PcmSource(path)
+    try:
+        async with websockets.connect(url, close_timeout=2, max_size=None) as ws:
+            await ws.send(codec.dumps(build_flutter_setup_message()))
+            data = codec.loads(await asyncio.wait_for(ws.recv(), timeout=timeout))
+            if "setupComplete" not in data:
+                raise RuntimeError(f"setup failed: {codec.preview(data, 200)}")
+
+            stats = await pump_audio(ws, source, chunk_ms, speed)
+
+            await ws.send(END_TURN_MESSAGE)
+            end_of_audio = time.monotonic()
+            stats["first_reply_ms"] = None
+            try:
+                while True:
+                    data = codec.loads(await asyncio.wait_for(ws.recv(), timeout=timeout))
+                    content = data.get("serverContent") or {}
+                    if "modelTurn" in content or content.get("turnComplete"):
+                        stats["first_reply_ms"] = (time.monotonic() - end_of_audio) * 1000
+                        break
+            except asyncio.TimeoutError:
+                pass
+            return stats
+    finally:
+        source.close()
+
+
+def print_stats_table(rows):
+    log(f"\n{'='*60}")
+    log("SEND-SIDE RESULTS")
+    log(f"{'='*60}")
+    log(f"  {'CHUNK':>6} {'FRAMES':>7} {'CPU ms/s':>9} {'STALLS':>7} {'STALL ms':>9} "
+        f"{'LATE ms':>8} {'REPLY ms':>9}")
+    for r in rows:
+        reply = f"{r['first_reply_ms']:.0f}" if r.get("first_reply_ms") is not None else "-"
+        log(f"  {r['chunk_ms']:>4}ms {r['frames']:>7} {r['cpu_ms_per_audio_s']:>9.2f} "
+            f"{r['stalls']:>7} {r['stall_ms']:>9.1f} {r['max_late_ms']:>8.1f} {reply:>9}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream PCM/WAV audio as Gemini Live realtimeInput")
+    parser.add_argument("args", nargs="+", metavar="[API_KEY] FILE",
+                        help="optional API key (default: $GEMINI_API_KEY) followed by the audio file")
+    parser.add_argument("--endpoint", default=WS_ENDPOINT)
+    parser.add_argument("--chunk-ms", default="40",
+                        help="frame duration(s) in ms, comma separated to compare several")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="pacing as a multiple of real time (0 = as fast as possible)")
+    parser.add_argument("--timeout", type=float, default=15.0)
+    args = parser.parse_args()
+    if len(args.args) > 2:
+        parser.error("expected [API_KEY] FILE")
+    args.path = args.args[-1]
+    args.api_key = args.args[0] if len(args.args) == 2 else os.environ.get("GEMINI_API_KEY")
+    return args
+
+
+async def main():
+    args = parse_args()
+    api_key = args.api_key
+    if not api_key and args.endpoint != WS_ENDPOINT:
+        api_key = "local-stand-in"  # the stand-in server ignores the key
+
+    if not api_key:
+        print("Usage: python3 gemini_live_stream.py <API_KEY> <FILE>")
+        sys.exit(1)
+
+    url = f"{args.endpoint}?key={api_key}"
+    rows = []
+    for chunk_ms in (int(c) for c in args.chunk_ms.split(",")):
+        log(f"Streaming {args.path} in {chunk_ms}ms frames at {args.speed:g}x...")
+        rows.append(await stream_file(url, args.path, chunk_ms, args.speed, args.timeout))
+    print_stats_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
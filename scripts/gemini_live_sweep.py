@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Gemini Live API Setup-Latency Sensitivity Sweep
+Does setup latency grow with systemInstruction size?
+
+test_gemini_live_full.py only sends the short SYSTEM_INSTRUCTION, but the app
+sends the much larger prompts from lib/config/ai_prompts.dart, assembled per
+persona. This sweep builds setup messages with instructions from 1 KB up to the
+largest real prompt (tiled from real prompt text), across responseModalities
+and voices, runs them concurrently, and fits setup latency against payload
+size so we know what prompt trimming or caching would save.
+
+Usage:
+    python3 gemini_live_sweep.py <API_KEY> --repeats 3 --out sweep.json
+    python3 gemini_live_sweep.py --endpoint ws://127.0.0.1:8765 --max-concurrency 16
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import websockets
+
+import gemini_live_codec as codec
+from test_gemini_live import CONFIGS_TO_TEST, VOICES_TO_TEST, HostRateLimiter, build_setup_message
+from test_gemini_live_full import MODEL, WS_ENDPOINT, log
+
+PROMPTS_FILE = Path(__file__).resolve().parent.parent / "lib" / "config" / "ai_prompts.dart"
+
+_CONST_PROMPT = re.compile(r"static const String (\w+) = '''(.*?)''';", re.S)
+_PERSONA_MODIFIER = re.compile(r"case CoachPersona\.(\w+):\s*return '''(.*?)''';", re.S)
+_VOICE_TEMPLATE = re.compile(r"static String voiceSession\(.*?return '''(.*?)''';", re.S)
+
+
+def load_real_prompts(path: Path = PROMPTS_FILE) -> dict:
+    """Extract the app's system prompts, including voiceSession assembled per persona."""
+    source = path.read_text()
+    prompts = {name: text for name, text in _CONST_PROMPT.findall(source)}
+    template = _VOICE_TEMPLATE.search(source)
+    if template:
+        for persona, modifier in _PERSONA_MODIFIER.findall(source):
+            prompts[f"voiceSession.{persona}"] = (template.group(1)
+                                                  .replace("$personaModifier", modifier)
+                                                  .replace("$context", ""))
+    return prompts
+
+
+def instruction_of_size(corpus: str, size: int) -> str:
+    """Tile real prompt text up to `size` UTF-8 bytes."""
+    repeats = size // max(1, len(corpus.encode("utf-8"))) + 1
+    text = (corpus * repeats).encode("utf-8")[:size]
+    return text.decode("utf-8", "ignore")
+
+
+def size_steps(largest: int, smallest: int = 1024):
+    sizes = []
+    size = smallest
+    while size < largest:
+        sizes.append(size)
+        size *= 2
+    sizes.append(largest)
+    return sizes
+
+
+async def probe_setup(url: str, setup_payload: str, timeout: float):
+    """Return (setup_ms, error): send setup -> setupComplete on a fresh socket."""
+    try:
+        async with websockets.connect(url, close_timeout=2, max_size=None) as ws:
+            start = time.perf_counter()
+            await ws.send(setup_payload)
+            data = codec.loads(await asyncio.wait_for(ws.recv(), timeout=timeout))
+            elapsed = (time.perf_counter() - start) * 1000
+            if "setupComplete" in data:
+                return elapsed, None
+            return None, data.get("error", {}).get("message", "unexpected setup response")
+    except asyncio.TimeoutError:
+        return None, "TIMEOUT"
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def linear_fit(xs, ys):
+    """Least-squares y = intercept + slope * x, with r^2."""
+    n = len(xs)
+    if n < 2:
+        return None
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    if not sxx:
+        return None
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+    ss_res = sum((y - intercept - slope * x) ** 2 for x, y in zip(xs, ys))
+    ss_tot = sum((y - mean_y) ** 2 for y in ys)
+    return {"intercept_ms": intercept, "slope_ms_per_kb": slope * 1024,
+            "r2": 1 - ss_res / ss_tot if ss_tot else 1.0}
+
+
+async def run_sweep(url, sizes, corpus, voices, configs, repeats=3, max_concurrency=8,
+                    rate=4.0, timeout=15.0, model=MODEL):
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = HostRateLimiter(rate)
+    instructions = {size: instruction_of_size(corpus, size) for size in sizes}
+
+    async def probe(size, voice, config_name, attempt):
+        setup = build_setup_message(model, voice, configs[config_name])
+        setup["setup"]["systemInstruction"] = {"parts": [{"text": instructions[size]}]}
+        payload = codec.dumps(setup)
+        async with semaphore:
+            await limiter.wait(url)
+            setup_ms, error = await probe_setup(url, payload, timeout)
+        return {"instruction_bytes": size, "payload_bytes": len(payload.encode("utf-8")),
+                "voice": voice, "config": config_name, "attempt": attempt,
+                "setup_ms": setup_ms, "error": error}
+
+    combos = list(itertools.product(sizes, voices, configs, range(repeats)))
+    log(f"Running {len(combos)} setup probes "
+        f"({len(sizes)} sizes x {len(voices)} voices x {len(configs)} configs x {repeats})...")
+    return await asyncio.gather(*(probe(*combo) for combo in combos))
+
+
+def analyse(rows, configs):
+    report = {}
+    for config_name in configs:
+        ok = [r for r in rows if r["config"] == config_name and r["setup_ms"] is not None]
+        by_size = {}
+        for r in ok:
+            by_size.setdefault(r["instruction_bytes"], []).append(r["setup_ms"])
+        fit = linear_fit([r["payload_bytes"] for r in ok], [r["setup_ms"] for r in ok])
+        report[config_name] = {
+            "median_ms_by_size": {size: sorted(v)[len(v) // 2] for size, v in sorted(by_size.items())},
+            "fit": fit,
+        }
+    return report
+
+
+def print_report(report, sizes, prompts):
+    log(f"\n{'='*60}")
+    log("SETUP LATENCY vs INSTRUCTION SIZE")
+    log(f"{'='*60}")
+    largest_name = max(prompts, key=lambda k: len(prompts[k].encode("utf-8")))
+    log(f"Largest real prompt: {largest_name} ({len(prompts[largest_name].encode('utf-8'))} bytes)")
+    for config_name, data in report.items():
+        log(f"\n  [{config_name}]")
+        for size, median in data["median_ms_by_size"].items():
+            log(f"    {size:>7} B  median {median:7.1f}ms")
+        fit = data["fit"]
+        if fit:
+            saved = fit["slope_ms_per_kb"] * (sizes[-1] - sizes[0]) / 1024
+            log(f"    fit: {fit['intercept_ms']:.1f}ms + {fit['slope_ms_per_kb']:.2f}ms/KB "
+                f"(r²={fit['r2']:.2f})")
+            log(f"    trimming the largest prompt to {sizes[0]} B would save ~{saved:.0f}ms per setup")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Setup latency vs systemInstruction size sweep")
+    parser.add_argument("api_key", nargs="?", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--endpoint", default=WS_ENDPOINT)
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--repeats", type=int, default=3, help="probes per size/voice/config")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=4.0,
+                        help="maximum new connections per second per host (0 = unlimited)")
+    parser.add_argument("--voices", default=",".join(VOICES_TO_TEST))
+    parser.add_argument("--max-bytes", type=int,
+                        help="largest instruction to try (default: largest real prompt)")
+    parser.add_argument("--timeout", type=float, default=15.0)
+    parser.add_argument("--out", help="write raw rows and fits as JSON here")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    api_key = args.api_key
+    if not api_key and args.endpoint != WS_ENDPOINT:
+        api_key = "local-stand-in"  # the stand-in server ignores the key
+
+    if not api_key:
+        print("Usage: python3 gemini_live_sweep.py <API_KEY> [--repeats N]")
+        sys.exit(1)
+
+    prompts = load_real_prompts()
+    corpus = "\n".join(prompts.values())
+    largest = args.max_bytes or max(len(text.encode("utf-8")) for text in prompts.values())
+    sizes = size_steps(largest)
+    voices = args.voices.split(",")
+
+    log(f"Endpoint: {args.endpoint}")
+    log(f"Loaded {len(prompts)} prompts from {PROMPTS_FILE.name}; sizes: {sizes}")
+
+    start = time.perf_counter()
+    rows = await run_sweep(f"{args.endpoint}?key={api_key}", sizes, corpus, voices, CONFIGS_TO_TEST,
+                           args.repeats, args.max_concurrency, args.rate, args.timeout, args.model)
+    log(f"Sweep finished in {time.perf_counter() - start:.1f}s")
+
+    failures = [r for r in rows if r["error"]]
+    if failures:
+        log(f"⚠️ {len(failures)} probes failed, e.g. {failures[0]['error']}")
+
+    report = analyse(rows, CONFIGS_TO_TEST)
+    print_report(report, sizes, prompts)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"sizes": sizes, "rows": rows, "report": report}, f, indent=2)
+        log(f"\n💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Gemini Live API Session Trace Recorder / Replayer
+Reproduce misbehaving sessions and performance regressions deterministically
+
+Trace format (.gltr, little-endian):
+    header:  b"GLTR" | u8 version | 3 reserved bytes
+    record:  u32 payload_len | f64 t (s since trace start, monotonic)
+             | u8 direction (0 = client->server, 1 = server->client)
+             | u8 kind | payload
+
+    kind 0 (TEXT):   the frame exactly as sent on the wire
+    kind 1 (AUDIO):  the frame with every base64 audio payload cut out and
+                     stored as raw PCM: alternating [u32 len][bytes] items,
+                     text, pcm, text, ..., text. Rebuilding re-encodes the PCM,
+                     so frames round-trip byte-for-byte.
+    kind 2 (BINARY): a binary WebSocket frame
+
+Storing audio as PCM rather than base64 makes audio-heavy traces about 25%
+smaller than the JSON they came from.
+
+Replay memory-maps the trace and plays one side of the conversation: before
+each of its own frames it waits for every earlier frame from the peer, so the
+frame order is identical on every run. With --timing original the original
+gap since the last peer frame is reproduced; with --timing fast it is skipped.
+
+Usage:
+    python3 test_gemini_live_full.py <API_KEY> --trace session.gltr
+    python3 gemini_live_trace.py info session.gltr
+    python3 gemini_live_trace.py client session.gltr --endpoint ws://127.0.0.1:8765
+    python3 gemini_live_trace.py server session.gltr --port 8765 --timing fast
+"""
+
+import argparse
+import asyncio
+import binascii
+import mmap
+import re
+import struct
+import sys
+import time
+
+import websockets
+
+from test_gemini_live_full import WS_ENDPOINT, log
+
+MAGIC = b"GLTR"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sB3x")
+RECORD_HEADER = struct.Struct("<IdBB")
+ITEM_LEN = struct.Struct("<I")
+
+SENT = 0
+RECEIVED = 1
+
+KIND_TEXT = 0
+KIND_AUDIO = 1
+KIND_BINARY = 2
+
+# "data" values of inlineData / mediaChunks entries; only long values are worth splitting out
+_AUDIO_DATA = re.compile(rb'"data"\s*:\s*"([A-Za-z0-9+/]{64,}={0,2})"')
+
+
+def split_audio(frame: bytes):
+    """Split a JSON frame into text segments and raw PCM, or None if there is no audio.
+
+    Only canonical base64 is split out, so rebuild() reproduces the input exactly.
+    """
+    items = []
+    last = 0
+    for match in _AUDIO_DATA.finditer(frame):
+        b64 = match.group(1)
+        try:
+            pcm = binascii.a2b_base64(b64)
+        except binascii.Error:
+            continue
+        if binascii.b2a_base64(pcm, newline=False) != b64:
+            continue
+        items.append(frame[last:match.start(1)])
+        items.append(pcm)
+        last = match.end(1)
+    if not items:
+        return None
+    items.append(frame[last:])
+    return items
+
+
+def rebuild(payload: memoryview) -> bytes:
+    """Inverse of split_audio() for a stored KIND_AUDIO payload."""
+    parts = []
+    offset = 0
+    index = 0
+    while offset < len(payload):
+        (n,) = ITEM_LEN.unpack_from(payload, offset)
+        offset += ITEM_LEN.size
+        chunk = payload[offset:offset + n]
+        parts.append(binascii.b2a_base64(chunk, newline=False) if index % 2 else bytes(chunk))
+        offset += n
+        index += 1
+    return b"".join(parts)
+
+
+class TraceRecorder:
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self._start = time.monotonic()
+        self.records = 0
+        self.wire_bytes = 0
+
+    def record(self, direction: int, frame):
+        t = time.monotonic() - self._start
+        if isinstance(frame, str):
+            raw = frame.encode("utf-8")
+            kind = KIND_TEXT
+        else:
+            raw = bytes(frame)
+            kind = KIND_BINARY
+        self.wire_bytes += len(raw)
+
+        items = split_audio(raw) if kind == KIND_TEXT else None
+        if items:
+            kind = KIND_AUDIO
+            payload = b"".join(ITEM_LEN.pack(len(item)) + item for item in items)
+        else:
+            payload = raw
+        self._file.write(RECORD_HEADER.pack(len(payload), t, direction, kind))
+        self._file.write(payload)
+        self.records += 1
+
+    def close(self):
+        self._file.close()
+
+
+class TracingWebSocket:
+    """Wraps a websockets connection and records every frame it sends or receives."""
+
+    def __init__(self, ws, recorder: TraceRecorder):
+        self._ws = ws
+        self.recorder = recorder
+
+    async def send(self, message, **kwargs):
+        if isinstance(message, (bytearray, memoryview)) and kwargs.get("text"):
+            self.recorder.record(SENT, bytes(message).decode("utf-8"))
+        else:
+            self.recorder.record(SENT, message)
+        await self._ws.send(message, **kwargs)
+
+    async def recv(self):
+        message = await self._ws.recv()
+        self.recorder.record(RECEIVED, message)
+        return message
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.recv()
+        except websockets.exceptions.ConnectionClosedOK:
+            raise StopAsyncIteration
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+
+class TraceRecord:
+    __slots__ = ("t", "direction", "kind", "payload")
+
+    def __init__(self, t, direction, kind, payload):
+        self.t = t
+        self.direction = direction
+        self.kind = kind
+        self.payload = payload
+
+    def frame(self):
+        """The frame as it appeared on the wire (str for text, bytes for binary)."""
+        if self.kind == KIND_BINARY:
+            return bytes(self.payload)
+        if self.kind == KIND_AUDIO:
+            return rebuild(self.payload).decode("utf-8")
+        return str(self.payload, "utf-8")
+
+
+class TraceReader:
+    """Memory-mapped, zero-copy iteration over a trace file."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        magic, version = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a v{VERSION} Gemini Live trace")
+
+    def __iter__(self):
+        offset = FILE_HEADER.size
+        end = len(self._map)
+        while offset + RECORD_HEADER.size <= end:
+            length, t, direction, kind = RECORD_HEADER.unpack_from(self._map, offset)
+            offset += RECORD_HEADER.size
+            yield TraceRecord(t, direction, kind, self._view[offset:offset + length])
+            offset += length
+
+    @property
+    def file_bytes(self) -> int:
+        return len(self._map)
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+
+def trace_info(reader: TraceReader) -> dict:
+    counts = {SENT: 0, RECEIVED: 0}
+    audio_frames = 0
+    json_bytes = 0
+    duration = 0.0
+    for rec in reader:
+        counts[rec.direction] += 1
+        audio_frames += rec.kind == KIND_AUDIO
+        frame = rec.frame()
+        json_bytes += len(frame.encode("utf-8") if isinstance(frame, str) else frame)
+        duration = rec.t
+    return {
+        "sent": counts[SENT],
+        "received": counts[RECEIVED],
+        "audio_frames": audio_frames,
+        "duration_s": duration,
+        "trace_bytes": reader.file_bytes,
+        "json_bytes": json_bytes,
+    }
+
+
+async def replay_side(ws, reader: TraceReader, own: int, timing: str = "original", timeout: float = 15.0):
+    """Play the `own` direction of a trace over ws.
+
+    Each peer frame in the trace is awaited (for up to `timeout` seconds) before
+    continuing, which keeps the order deterministic; own frames are sent at
+    their original offset from the last peer frame (timing="original") or
+    immediately (timing="fast"). If the peer goes quiet or closes, the replay
+    stops and every peer frame it never sent is counted as missing.
+    """
+    anchor_wall = time.monotonic()
+    anchor_t = None
+    sent = received = mismatched = missing = 0
+    error = None
+    lag_ms = []
+
+    for rec in reader:
+        if error is not None:
+            missing += rec.direction != own
+            continue
+        if anchor_t is None:
+            anchor_t = rec.t
+        try:
+            if rec.direction == own:
+                if timing == "original":
+                    delay = anchor_wall + (rec.t - anchor_t) - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await ws.send(rec.frame())
+                sent += 1
+                continue
+            message = await asyncio.wait_for(ws.recv(), timeout)
+        except asyncio.TimeoutError:
+            error = f"no frame within {timeout:g}s"
+        except websockets.exceptions.ConnectionClosed as e:
+            error = f"closed {e.code}"
+        if error is not None:
+            missing += rec.direction != own
+            continue
+        now = time.monotonic()
+        expected = rec.frame()
+        if len(message) != len(expected):
+            mismatched += 1
+        lag_ms.append((now - (anchor_wall + rec.t - anchor_t)) * 1000)
+        anchor_wall, anchor_t = now, rec.t
+        received += 1
+
+    return {"sent": sent, "received": received, "length_mismatches": mismatched, "missing": missing,
+            "error": error, "max_lag_ms": max(lag_ms) if lag_ms else 0.0}
+
+
+async def replay_client(path: str, url: str, timing: str, timeout: float = 15.0):
+    reader = TraceReader(path)
+    try:
+        start = time.monotonic()
+        async with websockets.connect(url, close_timeout=2, max_size=None) as ws:
+            result = await replay_side(ws, reader, SENT, timing, timeout)
+        result["wall_s"] = time.monotonic() - start
+        return result
+    finally:
+        reader.close()
+
+
+async def replay_server(path: str, host: str, port: int, timing: str, timeout: float = 15.0):
+    async def handler(ws, _path=None):
+        reader = TraceReader(path)
+        try:
+            result = await replay_side(ws, reader, RECEIVED, timing, timeout)
+            log(f"Replayed session: {result}")
+        finally:
+            reader.close()
+
+    async with websockets.serve(handler, host, port, max_size=None):
+        log(f"🎞️ Replaying {path} as the server on ws://{host}:{port} ({timing} timing)")
+        await asyncio.Future()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gemini Live binary trace tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    info = sub.add_parser("info", help="summarise a trace and its size vs JSON")
+    info.add_argument("trace")
+
+    client = sub.add_parser("client", help="replay the client side against an endpoint")
+    client.add_argument("trace")
+    client.add_argument("api_key", nargs="?", default="local-stand-in")
+    client.add_argument("--endpoint", default=WS_ENDPOINT)
+    client.add_argument("--timing", choices=["original", "fast"], default="original")
+    client.add_argument("--timeout", type=float, default=15.0, help="seconds to wait for each server frame")
+
+    server = sub.add_parser("server", help="replay the server side to connecting clients")
+    server.add_argument("trace")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8765)
+    server.add_argument("--timing", choices=["original", "fast"], default="original")
+    server.add_argument("--timeout", type=float, default=15.0, help="seconds to wait for each client frame")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "info":
+        reader = TraceReader(args.trace)
+        try:
+            info = trace_info(reader)
+        finally:
+            reader.close()
+        saving = 1 - info["trace_bytes"] / info["json_bytes"] if info["json_bytes"] else 0.0
+        log(f"Frames: {info['sent']} sent, {info['received']} received "
+            f"({info['audio_frames']} with audio) over {info['duration_s']:.2f}s")
+        log(f"Size: {info['trace_bytes']} bytes trace vs {info['json_bytes']} bytes JSON "
+            f"({saving:.0%} smaller)")
+    elif args.command == "client":
+        result = asyncio.run(replay_client(args.trace, f"{args.endpoint}?key={args.api_key}", args.timing,
+                                           args.timeout))
+        log(f"Replay finished: {result}")
+        if result["length_mismatches"] or result["missing"]:
+            sys.exit(1)
+    else:
+        try:
+            asyncio.run(replay_server(args.trace, args.host, args.port, args.timing, args.timeout))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,74 +3,238 @@
 Generate IA template from existing task in Master Tracker.
 Extracts context from reconciliation docs and creates structured markdown.
 
+The Master Tracker tables are parsed once into a TrackerIndex, cached in
+.cache/ia_tracker_index.json and reused until the tracker's mtime changes
+(and its content hash with it). The module can be imported; lookups raise
+TrackerError instead of exiting.
+
+    from generate_ia_template import TrackerIndex
+    index = TrackerIndex.load()
+    index.get("A-06")
+    index.filter(priority="CRITICAL", status="NOT STARTED", component="Database")
+
+Batch mode (--all, or filters without --list) parses the tracker and the doc
+reference index once and renders through a thread pool. A file is only written
+when its content hash changes; files edited by hand since they were generated
+(hashes kept in .cache/ia_generated.json) are left alone unless --force.
+When a task's description changes, its IA file is renamed to match instead of
+a second file being created.
+
+Watch mode (--watch) polls docs/ and keeps a dependency graph from each
+referenced RQ/CD/PD ID to the tasks whose IA files quote it. After an edit
+settles (--debounce), only tasks whose tracker row changed, or whose
+referenced IDs appear in a section whose content changed, are re-rendered,
+and the edit-to-file latency is reported.
+
 Usage: python scripts/generate_ia_template.py <task-id>
+       python scripts/generate_ia_template.py --list [--priority P] [--status S] [--component C]
+       python scripts/generate_ia_template.py --all | [--priority P] [--status S] [--component C] [--force]
+       python scripts/generate_ia_template.py --watch [--priority P] [--status S] [--component C]
 Example: python scripts/generate_ia_template.py A-06
+         python scripts/generate_ia_template.py --priority critical --status "not started"
 """
+import argparse
+import hashlib
+import json
+import os
 import sys
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from doc_refs import DocRefIndex, changed_refs, find_refs
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CORE_DIR = REPO_ROOT / "docs" / "CORE"
+TRACKER_PATH = CORE_DIR / "RESEARCH_QUESTIONS.md"
+OUTPUT_DIR = CORE_DIR / "implementation_actions"
+CACHE_DIR = REPO_ROOT / ".cache"
+MANIFEST_PATH = CACHE_DIR / "ia_generated.json"
+INDEX_VERSION = 1
+
+# Master Tracker column headers -> task record keys
+TRACKER_COLUMNS = {
+    "#": "id",
+    "task": "description",
+    "priority": "priority",
+    "status": "status",
+    "source": "source",
+    "component": "component",
+    "ai model": "ai_model",
+}
+PRIORITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+
+
+class TrackerError(Exception):
+    """Master Tracker missing, or a task not in it."""
+
+
+def _cells(line):
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _status_key(status):
+    # "🔴 NOT STARTED" -> "NOT STARTED"
+    return re.sub(r"^[^A-Za-z]+", "", status).upper()
+
+
+def parse_tracker(text):
+    """Parse every Master Tracker task table (header starting "| # | Task |") into task records.
+
+    Column order is taken from each table's header, so tables with extra or
+    reordered columns parse too; unknown columns are kept under their
+    lower-cased header.
+    """
+    tasks = {}
+    phase = None
+    columns = None
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if line.startswith("### "):
+            phase = line[4:].strip()
+            columns = None
+        elif not line.startswith("|"):
+            columns = None
+        elif columns is None:
+            header = _cells(line)
+            if header[:2] == ["#", "Task"]:
+                columns = [TRACKER_COLUMNS.get(h.lower(), h.lower()) for h in header]
+        elif not set(line) <= set("|-: "):
+            row = dict(zip(columns, _cells(line)))
+            if not row.get("id"):
+                continue
+            row["priority"] = row.get("priority", "").strip("*").strip()
+            row["status_key"] = _status_key(row.get("status", ""))
+            row["phase"] = phase
+            row["line"] = lineno
+            tasks[row["id"]] = row
+    return tasks
+
+
+class TrackerIndex:
+    """Task records keyed by ID, with secondary indexes by priority, status and component."""
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.by_priority = {}
+        self.by_status = {}
+        self.by_component = {}
+        for task_id, task in tasks.items():
+            self.by_priority.setdefault(task["priority"].upper(), []).append(task_id)
+            self.by_status.setdefault(task["status_key"], []).append(task_id)
+            self.by_component.setdefault(task.get("component", "").lower(), []).append(task_id)
+
+    @classmethod
+    def load(cls, path=TRACKER_PATH, cache_path=None):
+        """Parse the tracker, or reuse the cached parse if its mtime (or failing that, hash) is unchanged."""
+        path = Path(path)
+        cache_path = Path(cache_path or CACHE_DIR / "ia_tracker_index.json")
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise TrackerError(f"Master Tracker not found at {path}") from None
 
-def extract_task_from_tracker(task_id):
-    """Parse RESEARCH_QUESTIONS.md Master Tracker for task details."""
-    tracker_path = Path("docs/CORE/RESEARCH_QUESTIONS.md")
-    if not tracker_path.exists():
-        print(f"❌ Master Tracker not found at {tracker_path}")
-        sys.exit(1)
-
-    tracker = tracker_path.read_text()
-
-    # Match task line in Master Tracker table
-    pattern = rf"\| {task_id} \| (.*?) \| (CRITICAL|HIGH|MEDIUM|LOW) \| (.*?) \| (.*?) \| (.*?) \| (.*?) \|"
-    match = re.search(pattern, tracker)
-
-    if not match:
-        print(f"❌ Task {task_id} not found in Master Tracker")
-        sys.exit(1)
-
-    return {
-        "id": task_id,
-        "description": match.group(1).strip(),
-        "priority": match.group(2).strip(),
-        "status": match.group(3).strip(),
-        "source": match.group(4).strip(),
-        "component": match.group(5).strip(),
-        "ai_model": match.group(6).strip(),
-    }
-
-
-def extract_context_from_reconciliation(source_rqs):
-    """Find relevant reconciliation docs and extract context."""
-    # Parse source RQs (e.g., "RQ-048a/b, RQ-014")
-    rq_ids = re.findall(r"RQ-\d+[a-z]?", source_rqs)
-
-    if not rq_ids:
+        cached = None
+        try:
+            cached = json.loads(cache_path.read_text())
+        except (OSError, ValueError):
+            pass
+        if (cached and cached.get("version") == INDEX_VERSION and cached.get("path") == str(path)
+                and cached.get("mtime_ns") == stat.st_mtime_ns and cached.get("size") == stat.st_size):
+            return cls(cached["tasks"])
+
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached and cached.get("version") == INDEX_VERSION and cached.get("sha256") == digest:
+            tasks = cached["tasks"]  # touched but not edited
+        else:
+            tasks = parse_tracker(raw.decode("utf-8"))
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({
+            "version": INDEX_VERSION, "path": str(path), "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size, "sha256": digest, "tasks": tasks,
+        }))
+        os.replace(tmp_path, cache_path)
+        return cls(tasks)
+
+    def __contains__(self, task_id):
+        return task_id in self.tasks
+
+    def __iter__(self):
+        return iter(self.tasks.values())
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def get(self, task_id):
+        try:
+            return self.tasks[task_id.upper()]
+        except KeyError:
+            raise TrackerError(f"Task {task_id} not found in Master Tracker") from None
+
+    def filter(self, priority=None, status=None, component=None):
+        """Tasks matching every given filter, in tracker order.
+
+        priority and component match exactly (case-insensitive); status matches
+        any status containing it, e.g. "NOT STARTED" or "blocked".
+        """
+        selected = None
+        if priority:
+            selected = set(self.by_priority.get(priority.upper(), ()))
+        if status:
+            key = status.upper()
+            ids = {i for s, ids in self.by_status.items() if key in s for i in ids}
+            selected = ids if selected is None else selected & ids
+        if component:
+            ids = set(self.by_component.get(component.lower(), ()))
+            selected = ids if selected is None else selected & ids
+        if selected is None:
+            return list(self.tasks.values())
+        return [task for task_id, task in self.tasks.items() if task_id in selected]
+
+
+def extract_task_from_tracker(task_id, index=None):
+    """Look up a task in the RESEARCH_QUESTIONS.md Master Tracker; raises TrackerError."""
+    task = (index or TrackerIndex.load()).get(task_id)
+    return {key: task.get(key, "") for key in
+            ("id", "description", "priority", "status", "source", "component", "ai_model")}
+
+
+def extract_context_from_reconciliation(source_rqs, index=None):
+    """Pull heading-scoped context for a task's source RQ/CD/PD IDs from docs/.
+
+    Uses the DocRefIndex, so reconciliation docs rank first, then impact
+    analyses, decisions and the rest; at most one snippet per file.
+    """
+    # Parse source IDs (e.g., "RQ-048a/b, RQ-014, CD-015")
+    ref_ids = find_refs(source_rqs)
+
+    if not ref_ids:
         return "[TODO: Add context from research - no source RQs found]"
 
-    # Search for reconciliation docs mentioning these RQs
-    reconciliation_docs = list(Path("docs/CORE").glob("RECONCILIATION_*.md"))
+    index = index or DocRefIndex.load()
+    refs = sorted((ref for ref_id in ref_ids for ref in index.lookup(ref_id)),
+                  key=lambda r: (r.rank, r.path, r.offset))
     context = []
+    seen = set()
+    for ref in refs:
+        if ref.path in seen:
+            continue  # Only one snippet per doc
+        seen.add(ref.path)
+        snippet = index.context(ref, 500).replace("\n", " ")
+        heading = f" › {ref.heading}" if ref.heading else ""
+        context.append(f"From {ref.path}{heading}: {snippet}...")
+        if len(context) == 3:
+            break
 
-    for doc in reconciliation_docs:
-        try:
-            content = doc.read_text()
-            if any(rq in content for rq in rq_ids):
-                # Extract relevant sections (heuristic: first 500 chars after RQ mention)
-                for rq in rq_ids:
-                    idx = content.find(rq)
-                    if idx != -1:
-                        snippet = content[idx:idx+500].replace("\n", " ")
-                        context.append(f"From {doc.name}: {snippet}...")
-                        break  # Only one snippet per doc
-        except Exception as e:
-            continue
-
-    return "\n\n".join(context[:3]) if context else "[TODO: Add context from research]"
-
-
-def generate_ia_markdown(task):
+    return "\n\n".join(context) if context else "[TODO: Add context from research]"
+
+
+def generate_ia_markdown(task, index=None):
     """Create structured IA markdown from task metadata."""
-    context = extract_context_from_reconciliation(task['source'])
+    context = extract_context_from_reconciliation(task['source'], index)
 
     # Clean description for filename
     filename_desc = task['description'].lower().replace(' ', '_').replace('`', '').replace('/', '_')
@@ -207,28 +371,310 @@ def generate_ia_markdown(task):
     return template, filename_desc
 
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python scripts/generate_ia_template.py <task-id>")
-        print("Example: python scripts/generate_ia_template.py A-06")
+def output_path(task, filename_desc, output_dir=OUTPUT_DIR):
+    return Path(output_dir) / f"{task['id']}_{filename_desc}.md"
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class Manifest:
+    """Content hash of every IA file as last generated, to tell stale output from hand edits.
+
+    Also records each task's current IA file. File names include the task
+    description, so when a tracker row is reworded the old file is renamed to
+    the new name rather than left behind.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        try:
+            state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            state = {}
+        if "hashes" in state:
+            self.hashes, self.tasks = state["hashes"], state.get("tasks", {})
+        else:
+            # Manifests written before task paths were recorded are a bare {path: hash}
+            self.hashes, self.tasks = state, {}
+
+    def _key(self, path):
+        return str(Path(path).resolve().relative_to(REPO_ROOT))
+
+    def _move(self, task_id, path):
+        """Rename task_id's previous IA file to path; returns True if it was moved."""
+        previous = self.tasks.get(task_id)
+        key = self._key(path)
+        self.tasks[task_id] = key
+        if previous is None or previous == key:
+            return False
+        old_path = REPO_ROOT / previous
+        if not old_path.exists():
+            self.hashes.pop(previous, None)
+            return False
+        if path.exists():
+            # Something already has the new name; only drop the old file if it is untouched output
+            if _sha256(old_path.read_bytes()) == self.hashes.get(previous):
+                old_path.unlink()
+                self.hashes.pop(previous, None)
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(old_path, path)
+        if previous in self.hashes:
+            self.hashes[key] = self.hashes.pop(previous)
+        return True
+
+    def write(self, path, content, force=False, task_id=None):
+        """Write content to path unless unchanged or edited by hand; returns the outcome.
+
+        Outcomes: "created", "updated", "unchanged", "renamed" (task_id's
+        previous file was moved to path, then brought up to date), or "edited"
+        (skipped, the file no longer matches what was last generated; a
+        renamed file keeps its hand edits under the new name).
+        """
+        path = Path(path)
+        moved = task_id is not None and self._move(task_id, path)
+        data = content.encode("utf-8")
+        digest = _sha256(data)
+        key = self._key(path)
+        try:
+            existing = _sha256(path.read_bytes())
+        except FileNotFoundError:
+            existing = None
+
+        if existing == digest:
+            self.hashes[key] = digest
+            return "renamed" if moved else "unchanged"
+        if existing is not None and not force and self.hashes.get(key) != existing:
+            return "edited"
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        self.hashes[key] = digest
+        if moved:
+            return "renamed"
+        return "created" if existing is None else "updated"
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"hashes": self.hashes, "tasks": self.tasks}, indent=1, sort_keys=True))
+        os.replace(tmp_path, self.path)
+
+
+def generate_batch(tasks, doc_index, output_dir=OUTPUT_DIR, force=False, workers=None):
+    """Render and write IA files for tasks; returns ([(task_id, path, outcome)], timings)."""
+    manifest = Manifest()
+    timings = {}
+
+    def render(task):
+        content, filename_desc = generate_ia_markdown(task, doc_index)
+        return output_path(task, filename_desc, output_dir), content
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        rendered = list(pool.map(render, tasks))
+    timings["render"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [(task["id"], path, manifest.write(path, content, force, task["id"]))
+               for task, (path, content) in zip(tasks, rendered)]
+    manifest.save()
+    timings["write"] = time.perf_counter() - start
+    return results, timings
+
+
+def build_dependency_graph(tasks):
+    """Referenced RQ/CD/PD ID -> IDs of the tasks whose IA files quote it."""
+    graph = {}
+    for task in tasks:
+        for ref_id in find_refs(task.get("source", "")):
+            graph.setdefault(ref_id, set()).add(task["id"])
+    return graph
+
+
+def _row(task):
+    # Line numbers move with every edit above the row; they aren't rendered
+    return {k: v for k, v in task.items() if k != "line"} if task else None
+
+
+def _stamp():
+    return time.strftime("%H:%M:%S")
+
+
+def watch(args):
+    """Regenerate the IA files whose inputs change, until interrupted."""
+    try:
+        tracker = TrackerIndex.load()
+    except TrackerError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    doc_index = DocRefIndex.load()
+    tracker_rel = TRACKER_PATH.relative_to(doc_index.root).as_posix()
+
+    def select():
+        return {task["id"]: task for task in tracker.filter(args.priority, args.status, args.component)}
+
+    tasks = select()
+    graph = build_dependency_graph(tasks.values())
+    results, _ = generate_batch(list(tasks.values()), doc_index, force=args.force)
+    written = sum(outcome in ("created", "updated", "renamed") for _, _, outcome in results)
+    print(f"[{_stamp()}] {len(tasks)} tasks up to date ({written} written); "
+          f"watching {len(doc_index.files)} docs for {len(graph)} referenced IDs. Ctrl-C to stop")
+
+    try:
+        while True:
+            time.sleep(args.interval)
+            before = dict(doc_index.files)
+            changed = set(doc_index.update())
+            if not changed:
+                continue
+            # Editors and scripts save in bursts; wait until a poll finds nothing new
+            while True:
+                time.sleep(args.debounce)
+                more = doc_index.update()
+                if not more:
+                    break
+                changed.update(more)
+            mtimes = [doc_index.files[rel]["mtime_ns"] for rel in changed if rel in doc_index.files]
+            edited_ns = max(mtimes) if mtimes else time.time_ns()
+
+            affected = set()
+            for rel in changed:
+                for ref_id in changed_refs(before.get(rel), doc_index.files.get(rel)):
+                    affected |= graph.get(ref_id, set())
+            if tracker_rel in changed:
+                old_tasks = tasks
+                tracker = TrackerIndex.load()
+                tasks = select()
+                affected |= {task_id for task_id, task in tasks.items() if _row(task) != _row(old_tasks.get(task_id))}
+                for task_id in old_tasks.keys() - tasks.keys():
+                    print(f"[{_stamp()}] ⚠️ {task_id} is no longer selected from the tracker; its IA file is left in place")
+                graph = build_dependency_graph(tasks.values())
+
+            names = ", ".join(sorted(changed)[:3]) + (f" (+{len(changed) - 3} more)" if len(changed) > 3 else "")
+            affected &= tasks.keys()
+            if not affected:
+                print(f"[{_stamp()}] {names} changed; no IA inputs affected")
+                continue
+
+            results, _ = generate_batch([task for task_id, task in tasks.items() if task_id in affected],
+                                        doc_index, force=args.force)
+            latency_ms = (time.time_ns() - edited_ns) / 1e6
+            for task_id, path, outcome in results:
+                if outcome == "edited":
+                    print(f"[{_stamp()}] ⚠️ {task_id}: {path.relative_to(REPO_ROOT)} edited by hand, skipped")
+                elif outcome != "unchanged":
+                    print(f"[{_stamp()}] ✅ {outcome.capitalize()}: {path.relative_to(REPO_ROOT)}")
+            written = sum(outcome in ("created", "updated", "renamed") for _, _, outcome in results)
+            print(f"[{_stamp()}] {names} changed -> {len(affected)} tasks re-rendered, {written} written, "
+                  f"{latency_ms:.0f}ms after the edit")
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate IA templates from the Master Tracker")
+    parser.add_argument("task_id", nargs="?", help="e.g. A-06")
+    parser.add_argument("--list", action="store_true", help="list tracker tasks matching the filters")
+    parser.add_argument("--priority", choices=[p.lower() for p in PRIORITIES], type=str.lower)
+    parser.add_argument("--status", help='substring of the status, e.g. "not started" or "blocked"')
+    parser.add_argument("--component", help="e.g. Database, Service, Widget")
+    parser.add_argument("--all", action="store_true", help="generate every task in the tracker")
+    parser.add_argument("--force", action="store_true", help="overwrite IA files edited since generation")
+    parser.add_argument("--workers", type=int, default=None, help="render threads (default: CPU count + 4)")
+    parser.add_argument("--watch", action="store_true", help="regenerate IA files as docs/ changes")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls in --watch")
+    parser.add_argument("--debounce", type=float, default=0.3,
+                        help="seconds without further changes before regenerating in --watch")
+    args = parser.parse_args()
+    args.batch = not args.task_id and not args.list and not args.watch and (
+        args.all or args.priority or args.status or args.component)
+    if not args.task_id and not args.list and not args.batch and not args.watch:
+        parser.error("give a task ID, --list, --all, --watch or a filter")
+    return args
+
+
+def list_tasks(args):
+    try:
+        index = TrackerIndex.load()
+    except TrackerError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    tasks = index.filter(args.priority, args.status, args.component)
+    for task in tasks:
+        print(f"{task['id']:<6} {task['priority']:<9} {task['status']:<16} {task.get('component', ''):<14} "
+              f"{task['description']}")
+    print(f"{len(tasks)} of {len(index)} tasks")
+
+
+def generate_tasks(args):
+    start = time.perf_counter()
+    try:
+        index = TrackerIndex.load()
+    except TrackerError as e:
+        print(f"❌ {e}")
         sys.exit(1)
+    doc_index = DocRefIndex.load()
+    parse_s = time.perf_counter() - start
+
+    tasks = index.filter(args.priority, args.status, args.component)
+    if not tasks:
+        print(f"No tasks match (of {len(index)})")
+        sys.exit(1)
+    results, timings = generate_batch(tasks, doc_index, force=args.force, workers=args.workers)
+
+    counts = {}
+    for task_id, path, outcome in results:
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if outcome == "edited":
+            print(f"⚠️ {task_id}: {path.relative_to(REPO_ROOT)} edited by hand, skipped (--force to overwrite)")
+        elif outcome != "unchanged":
+            print(f"✅ {outcome.capitalize()}: {path.relative_to(REPO_ROOT)}")
+
+    total = parse_s + timings["render"] + timings["write"]
+    summary = ", ".join(f"{counts[k]} {k}" for k in ("created", "updated", "renamed", "unchanged", "edited")
+                        if k in counts)
+    print(f"\n{len(results)} tasks: {summary}")
+    print(f"Parse {parse_s * 1000:.0f}ms, render {timings['render'] * 1000:.0f}ms, "
+          f"write {timings['write'] * 1000:.0f}ms, total {total * 1000:.0f}ms "
+          f"({total * 1000 / len(results):.1f}ms per task)")
 
-    task_id = sys.argv[1].upper()
+
+def main():
+    args = parse_args()
+    if args.list:
+        list_tasks(args)
+        return
+    if args.watch:
+        watch(args)
+        return
+    if args.batch:
+        generate_tasks(args)
+        return
+
+    task_id = args.task_id.upper()
 
     # Extract task from Master Tracker
-    task = extract_task_from_tracker(task_id)
+    try:
+        task = extract_task_from_tracker(task_id)
+    except TrackerError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
 
     # Generate markdown content
     ia_content, filename_desc = generate_ia_markdown(task)
 
-    # Write to file
-    output_dir = Path("docs/CORE/implementation_actions")
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    output_file = output_dir / f"{task_id}_{filename_desc}.md"
-    output_file.write_text(ia_content)
+    # Write to file (asked for by ID, so hand edits are overwritten as before)
+    output_file = output_path(task, filename_desc)
+    manifest = Manifest()
+    manifest.write(output_file, ia_content, force=True, task_id=task["id"])
+    manifest.save()
 
-    print(f"✅ Created: {output_file}")
+    print(f"✅ Created: {output_file.relative_to(REPO_ROOT)}")
     print(f"📝 Next steps:")
     print(f"   1. Fill in [TODO] sections with details from reconciliation docs")
     print(f"   2. Add code examples for anti-patterns (❌ WRONG vs ✅ CORRECT)")
@@ -0,0 +1,739 @@
+#!/usr/bin/env python3
+"""
+Vectorised simulator for the JITAIDecisionEngine intervention policy
+
+Replays JITAIDecisionEngine.decide() and recordOutcome() for a whole synthetic
+population at once. Every decision point (one per user per scheduled hour)
+is a row in the same NumPy arrays, so a population of 100k users over a month
+runs in seconds:
+
+1. V-O state, as in VulnerabilityOpportunityCalculator, including the
+   predictive-failure spike for rebels.
+2. Safety gates: sensitive context (meeting, 23:00-06:00), fatigue (8
+   interventions in 24h) and the 30-minute cooldown.
+3. Quadrant: silence and waitForMoment don't intervene; deferred decisions
+   are not retried.
+4. Forced SHADOW_AUTONOMY for rebels with predicted failure > 0.7.
+5. HierarchicalBandit.select: Beta samples for the three meta-levers and
+   then for the arms of the chosen lever, with the lever and arm context
+   multipliers. Arms used in the last 4h are excluded; arms with
+   requiresRebelArchetype need a rebel; ties go to the later entry, as
+   Dart's reduce does.
+6. _calculateReward on the sampled outcome, added to the lever and arm Beta
+   posteriors (alpha += r, beta += 1 - r).
+
+The arm table (lever, priors, energy cost, intrusiveness, identity
+reinforcement, valence) is parsed from lib/domain/entities/intervention.dart.
+Policies are variants of the engine compared on the same users, contexts
+and outcome draws:
+- engine: default priors, as JITAIDecisionEngine() is built in the app.
+- seeded: HierarchicalBandit.seededForProfile.
+- plain-ts: no context multipliers.
+- greedy: posterior means instead of samples.
+- random: uniform choice.
+
+_explorationBoost scales every sample equally, so it never changes a choice
+and is not modelled. Neither is the Gottman gate: decide() ignores the
+forceDeposit it returns. The timing gate and the cascade detectors need
+per-user completion histories and are out of scope; every decision goes
+straight from the safety gates to the quadrant.
+
+Outcomes come from a response model: probabilities of completion,
+tiny-version use, interaction (action / opened / dismissed / ignored),
+annoyance and disabling notifications, for each archetype, arm and context
+bucket. The context bucket covers sleep-deprived, stressed, fatigued,
+weekend and on-a-streak. Because the grid is small, each cell's expected
+reward is computed exactly. Regret is the gap between the best arm the
+engine could have picked and the arm it did pick. "archetype" (default) has
+made-up archetype affinities that partly agree with the seeding; "flat"
+depends only on arm attributes. Any "module:factory" whose object has a
+grid(arms, flags) method also works.
+
+Usage:
+    python3 scripts/jitai_policy_sim.py
+    python3 scripts/jitai_policy_sim.py --users 200000 --days 56 --policies engine,seeded,greedy,random --arms
+    python3 scripts/jitai_policy_sim.py --users 20000 --response flat --check 2000 --out sim.json
+"""
+
+import argparse
+import importlib
+import json
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from population_learning_contract import ARCHETYPES
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TAXONOMY_PATH = REPO_ROOT / "lib" / "domain" / "entities" / "intervention.dart"
+
+# Mirrors MetaLever and MetaLeverExtension.categories
+LEVERS = ("activate", "support", "trust")
+CATEGORY_LEVER = {
+    "identityActivation": 0, "socialWitness": 0,
+    "frictionReduction": 1, "emotionalRegulation": 1, "cognitiveReframe": 1,
+    "silence": 2, "shadowIntervention": 2,
+}
+# HierarchicalBandit._defaultLeverPriors
+LEVER_PRIORS = ((5.0, 5.0), (5.5, 4.5), (3.5, 6.5))
+SILENCE_ARM = "SILENCE_TRUST"
+SHADOW_ARM = "SHADOW_AUTONOMY"
+
+# JITAIDecisionEngine gates
+MAX_INTERVENTIONS_PER_DAY = 8
+FATIGUE_WINDOW_H = 24
+COOLDOWN_H = 0.5
+EXCLUDE_WINDOW_H = 4
+# ContextHistory.isInterventionFatigued
+CONTEXT_FATIGUE_COUNT = 5
+
+DECISION_HOURS = (8, 12, 17, 20)
+POLICIES = {
+    "engine": {"seeded": False, "modifiers": True, "select": "thompson"},
+    "seeded": {"seeded": True, "modifiers": True, "select": "thompson"},
+    "plain-ts": {"seeded": False, "modifiers": False, "select": "thompson"},
+    "greedy": {"seeded": False, "modifiers": True, "select": "mean"},
+    "random": {"seeded": False, "modifiers": False, "select": "random"},
+}
+
+BUCKET_FEATURES = ("sleep_deprived", "stressed", "fatigued", "weekend", "on_streak")
+BUCKETS = 1 << len(BUCKET_FEATURES)
+OUTCOMES = ("complete", "tiny", "action", "opened", "dismiss", "annoyance", "disabled")
+
+_ARM_BLOCK = re.compile(r"InterventionArm\(\s*\n(.*?)\n\s*\),", re.S)
+_ARM_FIELD = re.compile(r"^\s*(\w+):\s*(?:'([^']*)'|InterventionCategory\.(\w+)|([\d.-]+|true|false))", re.M)
+
+
+class Arms:
+    """InterventionTaxonomy.allArms as parallel arrays."""
+
+    def __init__(self, rows):
+        self.ids = [row["armId"] for row in rows]
+        self.index = {arm_id: j for j, arm_id in enumerate(self.ids)}
+        self.lever = np.array([CATEGORY_LEVER[row["category"]] for row in rows])
+        for field in ("energyCost", "intrusiveness", "identityReinforcement", "emotionalValence"):
+            setattr(self, field, np.array([float(row[field]) for row in rows]))
+        self.requires_rebel = np.array([row.get("requiresRebelArchetype") == "true" for row in rows])
+        self.prior_alpha = np.array([float(row.get("priorAlpha", 1.0)) for row in rows])
+        self.prior_beta = np.array([float(row.get("priorBeta", 1.0)) for row in rows])
+        self.by_lever = [np.flatnonzero(self.lever == lever) for lever in range(len(LEVERS))]
+        self.silence = self.index[SILENCE_ARM]
+        self.shadow = self.index[SHADOW_ARM]
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_arms(path=TAXONOMY_PATH):
+    rows = []
+    for block in _ARM_BLOCK.findall(Path(path).read_text()):
+        rows.append({name: quoted or enum or literal
+                     for name, quoted, enum, literal in _ARM_FIELD.findall(block)})
+    return Arms(rows)
+
+
+def _last_argmax(values):
+    """Index of the maximum per row, ties to the later column (Dart's `a.value > b.value ? a : b`)."""
+    return values.shape[1] - 1 - np.argmax(values[:, ::-1], axis=1)
+
+
+def seeded_priors(arms):
+    """HierarchicalBandit._applyArchetypeSeeding per archetype: (lever alpha/beta, arm alpha/beta) tables."""
+    lever = np.tile(np.array(LEVER_PRIORS), (len(ARCHETYPES), 1, 1))
+    alpha = np.tile(arms.prior_alpha, (len(ARCHETYPES), 1))
+
+    def boost(i, arm_id, multiplier):
+        if arm_id in arms.index:
+            alpha[i, arms.index[arm_id]] *= multiplier
+
+    for i, name in enumerate(ARCHETYPES):
+        if "REBEL" in name:
+            lever[i, 2] = (5.0, 5.0)
+            boost(i, "SHADOW_AUTONOMY", 1.3)
+        if "PERFECTIONIST" in name:
+            lever[i, 1] = (6.0, 4.0)
+            boost(i, "FRICTION_TINY", 1.3)
+            boost(i, "COG_ZOOM", 1.3)
+        if "PROCRASTINATOR" in name:
+            lever[i, 1] = (6.5, 3.5)
+            boost(i, "FRICTION_TINY", 1.5)
+        if "OVERTHINKER" in name:
+            lever[i, 1] = (6.0, 4.0)
+            boost(i, "COG_ZOOM", 1.4)
+            boost(i, "COG_LIE_CALL", 1.3)
+        if "PLEASER" in name and "PLEASURE" not in name:
+            lever[i, 0] = (6.0, 4.0)
+            boost(i, "SOCIAL_WITNESS", 1.6)
+        if "PLEASURE_SEEKER" in name:
+            boost(i, "FRICTION_TINY", 1.2)
+            for j in np.flatnonzero(arms.emotionalValence > 0.5):
+                alpha[i, j] *= 1.25
+    return lever[..., 0], lever[..., 1], alpha, np.tile(arms.prior_beta, (len(ARCHETYPES), 1))
+
+
+# ---------------------------------------------------------------------------
+# Response models
+# ---------------------------------------------------------------------------
+
+def bucket_flags():
+    """{feature: (BUCKETS,) bool}; bucket b has feature k when bit k of b is set."""
+    b = np.arange(BUCKETS)
+    return {name: (b >> k) & 1 == 1 for k, name in enumerate(BUCKET_FEATURES)}
+
+
+class FlatResponse:
+    """Outcomes that depend only on arm attributes and context; every archetype responds alike."""
+
+    def grid(self, arms, flags):
+        sd, st, fat, wk, streak = (flags[name][None, :] for name in BUCKET_FEATURES)
+        energy, intrusive = arms.energyCost[:, None], arms.intrusiveness[:, None]
+        identity, valence = arms.identityReinforcement[:, None], arms.emotionalValence[:, None]
+        notify = np.ones((len(arms), 1))
+        notify[arms.silence] = 0.0
+
+        base = 0.45 - 0.10 * sd - 0.05 * st - 0.05 * wk + 0.12 * streak
+        lift = notify * (0.04 + 0.08 * identity + 0.03 * valence - 0.05 * intrusive
+                         - 0.20 * energy * sd + 0.03 * (valence > 0.5) * st - 0.08 * intrusive * fat)
+        tiny = np.full((len(arms), 1), 0.15)
+        if "FRICTION_TINY" in arms.index:
+            tiny[arms.index["FRICTION_TINY"]] = 0.6
+        return {
+            "complete": np.clip(base + lift, 0.02, 0.98),
+            "tiny": tiny,
+            "action": notify * (0.20 + 0.10 * np.maximum(valence, 0) - 0.05 * fat),
+            "opened": notify * 0.15,
+            "dismiss": notify * (0.10 + 0.25 * intrusive + 0.10 * fat),
+            "annoyance": notify * (0.01 + 0.08 * intrusive + 0.06 * intrusive * fat),
+            "disabled": notify * (0.001 + 0.01 * intrusive + 0.01 * fat),
+        }
+
+
+class ArchetypeResponse(FlatResponse):
+    """FlatResponse plus per-archetype base rates and arm affinities (illustrative, not measured)."""
+
+    BASE = {"REBEL": -0.05, "PERFECTIONIST": 0.05, "PROCRASTINATOR": -0.08, "OVERTHINKER": 0.0,
+            "PLEASURE_SEEKER": -0.03, "PEOPLE_PLEASER": 0.04}
+    # Partly what seededForProfile assumes (tiny starts for procrastinators, witnesses for
+    # pleasers), partly not (overthinkers respond to compassion, not cognitive arms)
+    AFFINITY = {
+        "REBEL": {"SHADOW_AUTONOMY": 0.15, "SILENCE_TRUST": 0.05, "ID_ANTI_WARN": -0.10, "SOCIAL_WITNESS": -0.05},
+        "PERFECTIONIST": {"COG_ZOOM": 0.12, "EMO_COMPASSION": 0.08, "ID_ANTI_WARN": -0.08},
+        "PROCRASTINATOR": {"FRICTION_TINY": 0.15, "FRICTION_ENV": 0.06},
+        "OVERTHINKER": {"EMO_COMPASSION": 0.10, "EMO_URGE_SURF": 0.05, "COG_LIE_CALL": -0.04},
+        "PLEASURE_SEEKER": {"FRICTION_TINY": 0.08, "ID_VOTE": 0.06},
+        "PEOPLE_PLEASER": {"SOCIAL_WITNESS": 0.15, "ID_MIRROR": 0.04},
+    }
+
+    def grid(self, arms, flags):
+        p = super().grid(arms, flags)
+        offset = np.zeros((len(ARCHETYPES), len(arms), 1))
+        for i, name in enumerate(ARCHETYPES):
+            offset[i] += self.BASE.get(name, 0.0)
+            for arm_id, lift in self.AFFINITY.get(name, {}).items():
+                if arm_id in arms.index:
+                    offset[i, arms.index[arm_id]] += lift
+        p["complete"] = np.clip(p["complete"][None] + offset, 0.02, 0.98)
+        # Rebels resent being pushed
+        rebel = np.array([name == "REBEL" for name in ARCHETYPES], dtype=float)[:, None, None]
+        p["annoyance"] = p["annoyance"][None] + rebel * 0.05 * arms.intrusiveness[None, :, None]
+        return p
+
+
+RESPONSE_MODELS = {"archetype": ArchetypeResponse, "flat": FlatResponse}
+
+
+def make_response(spec):
+    if spec in RESPONSE_MODELS:
+        return RESPONSE_MODELS[spec]()
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise SystemExit(f"unknown response model {spec!r}: use {', '.join(RESPONSE_MODELS)} or module:factory")
+    return getattr(importlib.import_module(module), attr)()
+
+
+def _reward(completion, streak, engagement, annoyed, disabled):
+    """JITAIDecisionEngine._calculateReward; completion: 0 miss, 1 done, 2 done with the tiny version."""
+    reward = np.where(completion > 0, 0.35 + 0.15 * streak + 0.25 * (completion == 2), -0.2)
+    return np.clip(reward + engagement - 0.4 * annoyed - 0.6 * disabled, 0.0, 1.0)
+
+
+# Reward of each interaction: action (opened + action), opened only, dismissed, ignored
+ENGAGEMENT = (0.3, 0.2, -0.1, 0.0)
+
+
+class ResponseGrid:
+    """A response model's probabilities over (archetype, arm, bucket), with exact expected rewards."""
+
+    def __init__(self, model, arms):
+        flags = bucket_flags()
+        shape = (len(ARCHETYPES), len(arms), BUCKETS)
+        raw = model.grid(arms, flags)
+        self.p = {name: np.broadcast_to(np.asarray(raw[name], dtype=float), shape).copy() for name in OUTCOMES}
+        interaction = self.p["action"] + self.p["opened"] + self.p["dismiss"]
+        if any((v < 0).any() or (v > 1).any() for v in self.p.values()) or (interaction > 1 + 1e-9).any():
+            raise ValueError("response model probabilities must lie in [0, 1], with action + opened + dismiss <= 1")
+        self.streak = flags["on_streak"].astype(float)
+
+        p = self.p
+        completion = ((0, 1 - p["complete"]), (1, p["complete"] * (1 - p["tiny"])), (2, p["complete"] * p["tiny"]))
+        engagement = tuple(zip(ENGAGEMENT, (p["action"], p["opened"], p["dismiss"], 1 - interaction)))
+        expected = np.zeros(shape)
+        for c, pc in completion:
+            for e, pe in engagement:
+                for annoyed in (0, 1):
+                    pa = p["annoyance"] if annoyed else 1 - p["annoyance"]
+                    for disabled in (0, 1):
+                        pd = p["disabled"] if disabled else 1 - p["disabled"]
+                        expected += pc * pe * pa * pd * _reward(c, self.streak, e, annoyed, disabled)
+        self.expected = expected
+
+    def sample(self, archetype, arm, bucket, u):
+        """Outcomes for aligned index arrays; u is (rows, 5) uniforms. Returns (completed, reward, disabled)."""
+        cell = (archetype, arm, bucket)
+        p = {name: v[cell] for name, v in self.p.items()}
+        done = u[:, 0] < p["complete"]
+        completion = done + (done & (u[:, 1] < p["tiny"]))
+        cut = np.cumsum([p["action"], p["opened"], p["dismiss"]], axis=0)
+        engagement = np.array(ENGAGEMENT)[(u[:, 2][None, :] >= cut).sum(axis=0)]
+        annoyed = u[:, 3] < p["annoyance"]
+        disabled = u[:, 4] < p["disabled"]
+        return done, _reward(completion, self.streak[bucket], engagement, annoyed, disabled), disabled
+
+
+# ---------------------------------------------------------------------------
+# Population and context
+# ---------------------------------------------------------------------------
+
+class Population:
+    """Static profile traits and the evolving per-user state the engine reads."""
+
+    RING = MAX_INTERVENTIONS_PER_DAY
+
+    def __init__(self, users, seed):
+        rng = np.random.default_rng([seed, 0])
+        self.n = users
+        self.archetype = rng.integers(0, len(ARCHETYPES), users)
+        self.rebel = np.array(["REBEL" in name for name in ARCHETYPES])[self.archetype]
+        # PsychometricProfile.riskBitmask: 7 RiskFlags; riskScore = set flags / 7
+        bits = rng.random((users, 7)) < 0.3
+        self.risk_score = bits.sum(axis=1) / 7.0
+        self.weekend_risk, self.evening_risk = bits[:, 0], bits[:, 2]
+        self.peak_start = rng.integers(6, 11, users)
+        self.resilience = rng.uniform(0.2, 0.9, users)
+        self.has_wearable = rng.random(users) < 0.4
+        self.has_calendar = rng.random(users) < 0.6
+        self.has_location = rng.random(users) < 0.5
+        self.outdoor = rng.random(users) < 0.3
+
+        self.habit_strength = rng.uniform(0.05, 0.6, users)
+        self.identity_fusion = rng.uniform(0.2, 0.7, users)
+        self.streak = rng.integers(0, 10, users)
+        self.days_since_miss = rng.integers(1, 15, users)
+        self.recent_t = np.full((users, self.RING), -1e9)
+        self.recent_arm = np.full((users, self.RING), -1)
+        self.ring = np.zeros(users, dtype=np.int64)
+
+    def track(self, rows, t, arm):
+        """_trackIntervention: remember (time, arm) for fatigue, cooldown and exclusion."""
+        slot = self.ring[rows]
+        self.recent_t[rows, slot] = t
+        self.recent_arm[rows, slot] = arm
+        self.ring[rows] = (slot + 1) % self.RING
+
+    def end_day(self, done):
+        self.streak = np.where(done, self.streak + 1, 0)
+        self.days_since_miss = np.where(done, self.days_since_miss + 1, 1)
+        self.habit_strength = 0.95 * self.habit_strength + 0.05 * done
+        self.identity_fusion = 0.98 * self.identity_fusion + 0.02 * done
+
+
+def daily_context(pop, day, seed):
+    rng = np.random.default_rng([seed, 1, day])
+    return {"sleep_z": rng.normal(0, 1, pop.n), "hrv_z": rng.normal(0, 1, pop.n),
+            "weather_bad": rng.random(pop.n) < 0.2, "weekend": day % 7 >= 5}
+
+
+def step_context(pop, daily, day, hour, seed):
+    """The parts of a ContextSnapshot the engine reads; unobserved sources (no wearable, ...) are off."""
+    rng = np.random.default_rng([seed, 2, day, hour])
+    n = pop.n
+    working = not daily["weekend"] and 9 <= hour < 17
+    meeting = rng.random(n) < (0.3 if working else 0.03)
+    good_window = ~meeting & (rng.random(n) < 0.35)
+    ctx = {
+        "hour": hour,
+        "weekend": daily["weekend"],
+        "sleep_deprived": daily["sleep_z"] < -1.0,
+        "stressed": daily["hrv_z"] < -1.0,
+        "meeting": meeting & pop.has_calendar,
+        "good_window": good_window & pop.has_calendar,
+        "free_45": good_window & pop.has_calendar & (rng.random(n) < 0.5),
+        "at_home": pop.has_location & (rng.random(n) < (0.7 if hour < 9 or hour >= 18 else 0.25)),
+        "near_habit": pop.has_location & (rng.random(n) < 0.15),
+        "at_gym": pop.has_location & (rng.random(n) < 0.05),
+        "high_distraction": rng.normal(0, 1, n) > 1.0,
+        "emotion_boost": (rng.random(n) < 0.15) * rng.uniform(0, 0.3, n),
+        "bad_weather": pop.outdoor & daily["weather_bad"],
+    }
+    wearable = pop.has_wearable
+    ctx["sleep_obs"] = ctx["sleep_deprived"] & wearable
+    ctx["stressed_obs"] = ctx["stressed"] & wearable
+    ctx["sleep_z_obs"] = np.where(wearable, daily["sleep_z"], 0.0)
+    ctx["hrv_z_obs"] = np.where(wearable, daily["hrv_z"], 0.0)
+    return ctx
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+def vo_state(pop, ctx, count24, hours_since):
+    """VulnerabilityOpportunityCalculator.calculate: (vulnerability, opportunity, predictive failure)."""
+    hour, weekend = ctx["hour"], ctx["weekend"]
+    evening = hour >= 18
+    weekend_hit = weekend & pop.weekend_risk
+    evening_hit = evening & pop.evening_risk
+    dsm, hs, res = pop.days_since_miss, pop.habit_strength, pop.resilience
+
+    modifier = (0.12 * weekend_hit + 0.08 * evening_hit
+                + ctx["sleep_obs"] * 0.10 * (1 + np.abs(ctx["sleep_z_obs"]) * 0.2)
+                + ctx["stressed_obs"] * 0.08 * (1 + np.abs(ctx["hrv_z_obs"]) * 0.2)
+                + 0.08 * ctx["high_distraction"] + ctx["emotion_boost"]
+                + (dsm <= 2) * 0.12 * (1 - dsm / 3.0)
+                + (res < 0.4) * 0.06 * (1 - res) + (hs < 0.3) * 0.06 * (1 - hs)
+                + 0.08 * ctx["bad_weather"])
+    vulnerability = np.clip(pop.risk_score * 0.4 + modifier, 0.0, 1.0)
+
+    failure = np.clip(0.3 + 0.15 * weekend_hit + 0.10 * evening_hit + 0.15 * ctx["sleep_obs"]
+                      + 0.10 * ctx["stressed_obs"] + 0.20 * (dsm <= 1) + 0.15 * (hs < 0.2), 0.0, 1.0)
+    spiked = np.where(pop.rebel & (failure > 0.6), np.maximum(vulnerability, 0.75),
+                      vulnerability * 0.7 + failure * 0.3)
+
+    opportunity = (0.5 + np.where(ctx["meeting"], -0.4, ctx["good_window"] * 0.2 + ctx["free_45"] * 0.1)
+                   + 0.15 * ((pop.peak_start <= hour) & (hour < pop.peak_start + 3))
+                   + (0.1 if 5 <= hour < 8 else 0.0) - (0.2 if hour >= 22 else 0.0)
+                   + 0.05 * ctx["at_home"] + 0.15 * ctx["near_habit"] + 0.2 * ctx["at_gym"]
+                   - 0.2 * (hours_since < 2) - 0.3 * (count24 >= CONTEXT_FATIGUE_COUNT)
+                   + (pop.streak > 7) * 0.1 * np.minimum(pop.streak / 30.0, 0.15)
+                   + 0.1 * (ctx["sleep_z_obs"] > 0.5) + 0.1 * (ctx["hrv_z_obs"] > 0.5))
+    return np.clip(spiked, 0.0, 1.0), np.clip(opportunity, 0.0, 1.0), failure
+
+
+def excluded_arms(pop, rows, t, n_arms):
+    """_getRecentArmIds as a (rows, arms) mask: arms used in the last EXCLUDE_WINDOW_H hours."""
+    recent = (t - pop.recent_t[rows]) < EXCLUDE_WINDOW_H
+    mask = np.zeros((len(rows), n_arms), dtype=bool)
+    r, slot = np.nonzero(recent)
+    mask[r, pop.recent_arm[rows][r, slot]] = True
+    return mask
+
+
+def _draw(kind, alpha, beta, rng):
+    if kind == "thompson":
+        return rng.beta(alpha, beta)
+    if kind == "mean":
+        return alpha / (alpha + beta)
+    return rng.random(alpha.shape)
+
+
+def select(arms, policy, post, rows, feats, excluded, rng, keep_samples=False):
+    """HierarchicalBandit.select for `rows`; returns (lever, arm, lever samples, arm samples or None).
+
+    The raw Beta samples are returned for check_selection; arm samples only with keep_samples.
+    """
+    kind, modifiers = policy["select"], policy["modifiers"]
+    lever_samples = _draw(kind, post["lever_a"][rows], post["lever_b"][rows], rng)
+    scores = lever_samples.copy()
+    if modifiers:
+        scores[:, 1] *= np.where(feats["vulnerability"] > 0.7, 1.3, 1.0)
+        scores[:, 2] *= (np.where(feats["habit_strength"] > 0.7, 1.4, 1.0)
+                                * np.where(feats["rebel"] & (feats["failure"] > 0.6), 1.5, 1.0)
+                                * np.where(feats["fatigued"], 1.6, 1.0))
+        scores[:, 0] *= np.where(feats["identity_fusion"] < 0.4, 1.3, 1.0)
+    lever = _last_argmax(scores)
+
+    arm = np.full(len(rows), arms.silence)
+    arm_samples = np.full((len(rows), len(arms)), np.nan) if keep_samples else None
+    for l, cols in enumerate(arms.by_lever):
+        sub = np.flatnonzero(lever == l)
+        if not sub.size:
+            continue
+        r = rows[sub]
+        cells = (r[:, None], cols)
+        samples = _draw(kind, post["arm_a"][cells], post["arm_b"][cells], rng)
+        if keep_samples:
+            arm_samples[sub[:, None], cols] = samples
+        if modifiers:
+            multiplier = (np.where(feats["sleep_obs"][sub, None], 1.0 - arms.energyCost[cols] * 0.5, 1.0)
+                          * np.where(feats["count24"][sub, None] > 2, 1.0 - arms.intrusiveness[cols] * 0.3, 1.0)
+                          * (1.0 + arms.identityReinforcement[cols] * 0.2))
+            samples = samples * multiplier
+        eligible = ~excluded[sub][:, cols] & (~arms.requires_rebel[cols] | feats["rebel"][sub, None])
+        pick = _last_argmax(np.where(eligible, samples, -np.inf))
+        arm[sub] = np.where(eligible.any(axis=1), cols[pick], arms.silence)
+    return lever, arm, lever_samples, arm_samples
+
+
+def reference_select(arms, policy, lever_samples, arm_samples, feats, excluded):
+    """One decision the way the Dart code walks it (dict loops), on the vectorised path's samples."""
+    samples = dict(zip(LEVERS, lever_samples))
+    if policy["modifiers"]:
+        if feats["vulnerability"] > 0.7:
+            samples["support"] *= 1.3
+        if feats["habit_strength"] > 0.7:
+            samples["trust"] *= 1.4
+        if feats["rebel"] and feats["failure"] > 0.6:
+            samples["trust"] *= 1.5
+        if feats["fatigued"]:
+            samples["trust"] *= 1.6
+        if feats["identity_fusion"] < 0.4:
+            samples["activate"] *= 1.3
+    lever = None
+    for name, value in samples.items():
+        if lever is None or not samples[lever] > value:
+            lever = name
+    lever = LEVERS.index(lever)
+
+    eligible = [j for j in range(len(arms)) if arms.lever[j] == lever and not excluded[j]
+                and (not arms.requires_rebel[j] or feats["rebel"])]
+    if not eligible:
+        return lever, arms.silence
+    scores = {}
+    for j in eligible:
+        multiplier = 1.0
+        if policy["modifiers"]:
+            if feats["sleep_obs"]:
+                multiplier *= 1.0 - arms.energyCost[j] * 0.5
+            if feats["count24"] > 2:
+                multiplier *= 1.0 - arms.intrusiveness[j] * 0.3
+            multiplier *= 1.0 + arms.identityReinforcement[j] * 0.2
+        scores[j] = arm_samples[j] * multiplier
+    best = None
+    for j, value in scores.items():
+        if best is None or not scores[best] > value:
+            best = j
+    return lever, best
+
+
+def check_selection(arms, policy, lever, arm, lever_samples, arm_samples, feats, excluded, limit, vector_s, log=print):
+    count = min(limit, len(lever))
+    start = time.perf_counter()
+    mismatches = 0
+    for k in range(count):
+        row = {name: value[k] for name, value in feats.items()}
+        if reference_select(arms, policy, lever_samples[k], arm_samples[k], row, excluded[k]) != (lever[k], arm[k]):
+            mismatches += 1
+    loop_us = (time.perf_counter() - start) / max(count, 1) * 1e6
+    status = "matches" if not mismatches else f"DIFFERS on {mismatches}"
+    log(f"Vectorised selection {status} the per-decision loop on {count:,} decisions: "
+        f"{loop_us:.1f}µs per decision in the loop vs {vector_s / len(lever) * 1e6:.2f}µs vectorised")
+
+
+def simulate(policy_name, pop, arms, grid, days, hours, seed, check=0, log=print):
+    """Run one policy over the population; returns a metrics dict."""
+    policy = POLICIES[policy_name]
+    n, n_arms = pop.n, len(arms)
+    if policy["seeded"]:
+        lever_a, lever_b, arm_a, arm_b = seeded_priors(arms)
+        post = {"lever_a": lever_a[pop.archetype], "lever_b": lever_b[pop.archetype],
+                "arm_a": arm_a[pop.archetype], "arm_b": arm_b[pop.archetype]}
+    else:
+        post = {"lever_a": np.tile(np.array(LEVER_PRIORS)[:, 0], (n, 1)),
+                "lever_b": np.tile(np.array(LEVER_PRIORS)[:, 1], (n, 1)),
+                "arm_a": np.tile(arms.prior_alpha, (n, 1)), "arm_b": np.tile(arms.prior_beta, (n, 1))}
+    rng = np.random.default_rng([seed, 3, list(POLICIES).index(policy_name)])
+    gates = dict.fromkeys(("sensitive", "fatigue", "cooldown", "silence", "deferred", "shadow", "bandit"), 0)
+    m = {"decisions": 0, "interventions": 0, "notifications": 0, "reward": 0.0, "regret": 0.0, "optimal": 0,
+         "completions": 0, "user_days": 0, "disabled": 0, "decide_s": 0.0, "update_s": 0.0, "world_s": 0.0,
+         "weekly": [], "arm_counts": np.zeros((len(ARCHETYPES), n_arms), dtype=np.int64)}
+    week = {"interventions": 0, "regret": 0.0}
+
+    for day in range(days):
+        start = time.perf_counter()
+        daily = daily_context(pop, day, seed)
+        done_today = np.zeros(n, dtype=bool)
+        intervened_today = np.zeros(n, dtype=bool)
+        m["world_s"] += time.perf_counter() - start
+        for hour in hours:
+            t = day * 24 + hour
+            start = time.perf_counter()
+            ctx = step_context(pop, daily, day, hour, seed)
+            u = np.random.default_rng([seed, 4, day, hour]).random((n, 5))
+            world = time.perf_counter()
+
+            age = t - pop.recent_t
+            count24 = (age < FATIGUE_WINDOW_H).sum(axis=1)
+            hours_since = age.min(axis=1)
+            vulnerability, opportunity, failure = vo_state(pop, ctx, count24, hours_since)
+            sensitive = ctx["meeting"] | (hour >= 23) | (hour < 6)
+            fatigue = ~sensitive & (count24 >= MAX_INTERVENTIONS_PER_DAY)
+            cooldown = ~sensitive & ~fatigue & (hours_since < COOLDOWN_H)
+            proceed = ~(sensitive | fatigue | cooldown)
+            high_v, high_o = vulnerability > 0.5, opportunity > 0.5
+            act = proceed & high_o
+            shadow = act & (failure > 0.7) & pop.rebel
+            rows = np.flatnonzero(act & ~shadow)
+            # Forced shadow rows join the bandit rows for outcomes and updates
+            shadow_rows = np.flatnonzero(shadow)
+            act_rows = np.concatenate([rows, shadow_rows])
+            excluded = excluded_arms(pop, act_rows, t, n_arms)
+
+            feats = {"vulnerability": vulnerability[rows], "failure": failure[rows], "rebel": pop.rebel[rows],
+                     "habit_strength": pop.habit_strength[rows], "identity_fusion": pop.identity_fusion[rows],
+                     "fatigued": count24[rows] >= CONTEXT_FATIGUE_COUNT, "count24": count24[rows],
+                     "sleep_obs": ctx["sleep_obs"][rows]}
+            select_start = time.perf_counter()
+            lever, arm, lever_samples, arm_samples = select(arms, policy, post, rows, feats, excluded[:rows.size], rng,
+                                                            keep_samples=bool(check))
+            select_s = time.perf_counter() - select_start
+            if check and rows.size:
+                check_selection(arms, policy, lever, arm, lever_samples, arm_samples, feats, excluded[:rows.size], check,
+                                select_s, log)
+                check = 0
+
+            act_lever = np.concatenate([lever, np.full(shadow_rows.size, 2)])
+            act_arm = np.concatenate([arm, np.full(shadow_rows.size, arms.shadow)])
+            decided = time.perf_counter()
+
+            bucket = (ctx["sleep_deprived"][act_rows] * 1 + ctx["stressed"][act_rows] * 2
+                      + (count24[act_rows] >= CONTEXT_FATIGUE_COUNT) * 4 + ctx["weekend"] * 8
+                      + (pop.streak[act_rows] > 0) * 16)
+            arch = pop.archetype[act_rows]
+            done, reward, disabled = grid.sample(arch, act_arm, bucket, u[act_rows])
+            post["lever_a"][act_rows, act_lever] += reward
+            post["lever_b"][act_rows, act_lever] += 1.0 - reward
+            post["arm_a"][act_rows, act_arm] += reward
+            post["arm_b"][act_rows, act_arm] += 1.0 - reward
+            pop.track(act_rows, t, act_arm)
+            updated = time.perf_counter()
+
+            expected = grid.expected[arch, :, bucket]
+            allowed = ~excluded & (~arms.requires_rebel | pop.rebel[act_rows, None])
+            regret = np.where(allowed, expected, -np.inf).max(axis=1) - expected[np.arange(act_rows.size), act_arm]
+            done_today[act_rows] |= done
+            intervened_today[act_rows] = True
+            m["arm_counts"] += np.bincount(arch * n_arms + act_arm, minlength=m["arm_counts"].size).reshape(
+                m["arm_counts"].shape)
+
+            m["decisions"] += n
+            m["interventions"] += act_rows.size
+            m["notifications"] += int(np.count_nonzero(act_arm != arms.silence))
+            m["reward"] += float(reward.sum())
+            m["regret"] += float(regret.sum())
+            m["optimal"] += int(np.count_nonzero(regret < 1e-12))
+            m["disabled"] += int(np.count_nonzero(disabled))
+            week["interventions"] += act_rows.size
+            week["regret"] += float(regret.sum())
+            for name, mask in (("sensitive", sensitive), ("fatigue", fatigue), ("cooldown", cooldown),
+                               ("silence", proceed & ~high_v & ~high_o), ("deferred", proceed & high_v & ~high_o)):
+                gates[name] += int(np.count_nonzero(mask))
+            gates["shadow"] += shadow_rows.size
+            gates["bandit"] += rows.size
+            m["world_s"] += world - start
+            m["decide_s"] += decided - world
+            m["update_s"] += updated - decided
+
+        # Days without any intervention still complete (or not) on their own, as under silence
+        start = time.perf_counter()
+        quiet = np.flatnonzero(~intervened_today)
+        quiet_bucket = (daily["sleep_z"][quiet] < -1) * 1 + (daily["hrv_z"][quiet] < -1) * 2 + daily["weekend"] * 8 \
+            + (pop.streak[quiet] > 0) * 16
+        p_quiet = grid.p["complete"][pop.archetype[quiet], arms.silence, quiet_bucket]
+        done_today[quiet] = np.random.default_rng([seed, 5, day]).random(quiet.size) < p_quiet
+        pop.end_day(done_today)
+        m["completions"] += int(np.count_nonzero(done_today))
+        m["user_days"] += n
+        m["world_s"] += time.perf_counter() - start
+        if day % 7 == 6 or day == days - 1:
+            m["weekly"].append(week["regret"] / max(week["interventions"], 1))
+            week = {"interventions": 0, "regret": 0.0}
+
+    m["gates"] = gates
+    return m
+
+
+def print_report(results, arms, grid, show_arms=False, log=print):
+    log(f"\n{'POLICY':<10} {'INTERVENE':>9} {'NOTIFY':>7} {'REWARD':>7} {'REGRET':>7} {'1ST WK':>7} "
+        f"{'LAST WK':>7} {'OPTIMAL':>8} {'DONE/DAY':>9} {'DISABLED':>9} {'µs/DEC':>7}")
+    for name, m in results.items():
+        decisions, interventions = m["decisions"], max(m["interventions"], 1)
+        log(f"{name:<10} {m['interventions'] / decisions:>9.1%} {m['notifications'] / decisions:>7.1%} "
+            f"{m['reward'] / interventions:>7.3f} {m['regret'] / interventions:>7.4f} {m['weekly'][0]:>7.4f} "
+            f"{m['weekly'][-1]:>7.4f} {m['optimal'] / interventions:>8.1%} "
+            f"{m['completions'] / m['user_days']:>9.1%} {m['disabled']:>9,} "
+            f"{(m['decide_s'] + m['update_s']) / decisions * 1e6:>7.2f}")
+    log("REWARD and REGRET are per intervention; REGRET is against the best arm the engine could have picked.")
+
+    first = next(iter(results.values()))
+    gates = first["gates"]
+    log("\nDecision points (first policy): " + ", ".join(
+        f"{name} {count / first['decisions']:.1%}" for name, count in gates.items()))
+
+    if show_arms:
+        # The arm with the best expected reward per archetype, averaged over context buckets
+        best = grid.expected.mean(axis=2).argmax(axis=1)
+        for name, m in results.items():
+            log(f"\n{name}: most chosen arms per archetype (best on average: *)")
+            for i, archetype in enumerate(ARCHETYPES):
+                counts = m["arm_counts"][i]
+                top = np.argsort(counts)[::-1][:3]
+                share = ", ".join(f"{arms.ids[j]}{'*' if j == best[i] else ''} {counts[j] / max(counts.sum(), 1):.0%}"
+                                  for j in top)
+                log(f"  {archetype:<16} {share}   (best: {arms.ids[best[i]]})")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulate the JITAIDecisionEngine policy over a synthetic population")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--hours", default=",".join(map(str, DECISION_HOURS)),
+                        help="decision points per day, as hours (default: %(default)s)")
+    parser.add_argument("--policies", default="engine,seeded,random",
+                        help=f"comma-separated, from {', '.join(POLICIES)} (default: %(default)s)")
+    parser.add_argument("--response", default="archetype",
+                        help=f"{', '.join(RESPONSE_MODELS)} or module:factory (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", type=int, default=0, metavar="N",
+                        help="verify N selections of each policy's first step against the per-decision loop")
+    parser.add_argument("--arms", action="store_true", help="show the most chosen arms per archetype")
+    parser.add_argument("--out", help="write the metrics as JSON here")
+    args = parser.parse_args()
+    args.hours = sorted(int(h) for h in args.hours.split(","))
+    args.policies = args.policies.split(",")
+    unknown = [p for p in args.policies if p not in POLICIES]
+    if unknown:
+        parser.error(f"unknown policies: {', '.join(unknown)}")
+    return args
+
+
+def main():
+    args = parse_args()
+    arms = load_arms()
+    grid = ResponseGrid(make_response(args.response), arms)
+    print(f"{len(arms)} arms from {TAXONOMY_PATH.name}; {args.users:,} users × {args.days} days × "
+          f"{len(args.hours)} decision points ({', '.join(f'{h}h' for h in args.hours)}); "
+          f"response model: {args.response}")
+
+    results = {}
+    for name in args.policies:
+        start = time.perf_counter()
+        results[name] = simulate(name, Population(args.users, args.seed), arms, grid, args.days, args.hours,
+                                 args.seed, args.check)
+        m = results[name]
+        print(f"{name}: {m['decisions']:,} decision points in {time.perf_counter() - start:.1f}s "
+              f"(policy {m['decide_s'] + m['update_s']:.1f}s, world {m['world_s']:.1f}s)")
+    print_report(results, arms, grid, args.arms)
+
+    if args.out:
+        out = {name: dict(m, arm_counts={ARCHETYPES[i]: dict(zip(arms.ids, m["arm_counts"][i].tolist()))
+                                         for i in range(len(ARCHETYPES))})
+               for name, m in results.items()}
+        with open(args.out, "w") as f:
+            json.dump({"users": args.users, "days": args.days, "hours": args.hours,
+                       "response": args.response, "policies": out}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Latency summary helpers shared by the load and benchmark scripts
+
+percentile() over an already sorted list, a fixed-edge millisecond histogram,
+and summarise() (count, min, p50/p95/p99, max, mean, histogram) as reported by
+gemini_live_load.py and population_learning_load.py.
+"""
+
+# Upper bucket edges in ms; the last bucket catches everything slower
+HISTOGRAM_EDGES_MS = [25, 50, 100, 200, 400, 800, 1600, 3200, 6400, 12800]
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def histogram(values, edges=HISTOGRAM_EDGES_MS):
+    counts = [0] * (len(edges) + 1)
+    for v in values:
+        for i, edge in enumerate(edges):
+            if v <= edge:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<={e}" for e in edges] + [f">{edges[-1]}"]
+    return dict(zip(labels, counts))
+
+
+def summarise(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1],
+        "mean": sum(ordered) / len(ordered),
+        "histogram": histogram(ordered),
+    }
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Population learning edge function contract
+
+What population_learning_sim.py, the stand-in server and the load generator
+share about supabase/functions/population-learning-{sync,fetch}: the
+constants the functions hard-code, the archetype list they validate against,
+the default priors seeded by supabase/migrations/20260103_population_learning.sql,
+and the routes the app calls under /functions/v1.
+"""
+
+import re
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MIGRATION_PATH = REPO_ROOT / "supabase" / "migrations" / "20260103_population_learning.sql"
+
+# Mirrors supabase/functions/population-learning-sync/index.ts
+LEARNING_RATE = 0.1
+MIN_SAMPLES_THRESHOLD = 5
+ARCHETYPES = ("REBEL", "PERFECTIONIST", "PROCRASTINATOR", "OVERTHINKER", "PLEASURE_SEEKER", "PEOPLE_PLEASER")
+# `prior?.alpha ?? 1.0` for an arm with no row yet
+DEFAULT_ALPHA = 1.0
+DEFAULT_BETA = 1.0
+
+FUNCTIONS_PATH = "/functions/v1"
+SYNC_ROUTE = "population-learning-sync"
+FETCH_ROUTE = "population-learning-fetch"
+# Counters served by population_learning_standin_server.py only
+STATS_ROUTE = "_stats"
+
+# Mean outcomes per sync request in the synthetic population
+SESSION_MEAN = 5
+
+_SEED_ROW = re.compile(r"\('(\w+)',\s*'(\w+)',\s*([\d.]+),\s*([\d.]+)\)")
+
+
+def load_seed_priors(path=MIGRATION_PATH):
+    """{(archetype, arm): (alpha, beta)} from the migration's default priors INSERT."""
+    return {(archetype, arm): (float(alpha), float(beta))
+            for archetype, arm, alpha, beta in _SEED_ROW.findall(Path(path).read_text())}
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Population learning edge function load generator
+Where do population-learning-sync and -fetch fall over, and how big should sync batches be?
+
+Sends sync sessions the way PopulationLearningService.syncToEdgeFunction does:
+one POST per archetype carrying that archetype's pending outcomes, with
+userHash the SHA-256 of the user id. Users come from a pool with log-normal
+activity, so busy users come back inside the 24 hour rate-limit window as they
+would in production. Each user has a primary archetype (--mix, uniform by
+default), and SWITCH_RATE of sessions also carry outcomes logged under a second
+archetype, which become a second POST. Outcomes mostly name the archetype's
+seeded arms, with a share (EXPLORE_RATE) naming other arms, which creates new
+rows. --fetch-ratio of sessions first GET population-learning-fetch, as
+initializeForProfile does. --replay sends the request bodies written by
+population_learning_sim.py synth --jsonl instead.
+
+Each batch size in --batch-sizes is one stage. Pending outcomes are split into
+requests of at most that many outcomes; 0 sends them all in one request, which
+is what the app does. Each stage salts the user hashes, so stages start with
+a clean rate-limit log. Requests share a pool of --connections HTTP/1.1
+keep-alive connections; --no-keep-alive opens a connection per request. Without
+--rate every connection sends back to back (closed loop). With --rate, sessions
+arrive as a Poisson process and latency is measured from the scheduled arrival,
+so time spent queueing for a connection counts.
+
+Per stage it reports:
+  - request throughput, and accepted-outcome throughput against the total
+    outcomes sent;
+  - p50/p95/p99/max latency of accepted syncs, plus status counts;
+  - write amplification from the stand-in server's /_stats:
+      - DB statements and transactions per request;
+      - rows written per applied outcome;
+      - lost updates: applied outcomes whose sample_count increment was
+        overwritten by a concurrent read-modify-write.
+Against a real deployment (--url, --key) the server columns are blank.
+
+Usage:
+    python3 scripts/population_learning_standin_server.py --db-rtt 2 &
+    python3 scripts/population_learning_load.py --sessions 5000 --connections 32 --batch-sizes 0,5,1
+    python3 scripts/population_learning_load.py --replay outcomes.jsonl --rate 300 --out run.json
+    python3 scripts/population_learning_load.py --url https://<project>.supabase.co --key <anon key> --sessions 50
+"""
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import ssl
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from latency_stats import summarise
+from population_learning_contract import (ARCHETYPES, FETCH_ROUTE, FUNCTIONS_PATH, SESSION_MEAN, STATS_ROUTE, SYNC_ROUTE,
+                                          load_seed_priors)
+
+# Spread of per-user activity; sigma 1 puts ~40% of sessions on the busiest 10% of users
+ACTIVITY_SIGMA = 1.0
+# Share of sessions that also carry outcomes for a second archetype (the profile evolved)
+SWITCH_RATE = 0.1
+# Share of outcomes naming an arm outside the archetype's seeded priors
+EXPLORE_RATE = 0.2
+
+Session = collections.namedtuple("Session", "user fetch syncs")
+
+
+def parse_mix(text):
+    """'REBEL=2,OVERTHINKER=1' -> weights over ARCHETYPES (unlisted archetypes get 0)."""
+    if not text:
+        return np.full(len(ARCHETYPES), 1 / len(ARCHETYPES))
+    weights = dict.fromkeys(ARCHETYPES, 0.0)
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip().upper() not in weights:
+            raise SystemExit(f"Unknown archetype in --mix: {name}")
+        weights[name.strip().upper()] = float(weight or 1)
+    total = sum(weights.values())
+    return np.array([weights[a] / total for a in ARCHETYPES])
+
+
+def synthetic_sessions(count, users, mix, fetch_ratio, seeds, rng):
+    """`count` sessions from a pool of `users`, each sync a (archetype, outcomes) request body."""
+    arms = sorted({arm for _, arm in seeds})
+    seeded = {a: [(arm, alpha / (alpha + beta)) for (x, arm), (alpha, beta) in seeds.items() if x == a]
+              for a in ARCHETYPES}
+    activity = rng.lognormal(0.0, ACTIVITY_SIGMA, users)
+    who = rng.choice(users, count, p=activity / activity.sum())
+    primary = rng.choice(len(ARCHETYPES), users, p=mix)
+    secondary = (primary + rng.integers(1, len(ARCHETYPES), users)) % len(ARCHETYPES)
+
+    sessions = []
+    for user in who.tolist():
+        archetypes = [primary[user]] + ([secondary[user]] if rng.random() < SWITCH_RATE else [])
+        syncs = []
+        for archetype in (ARCHETYPES[i] for i in archetypes):
+            outcomes = []
+            for _ in range(1 + rng.poisson(SESSION_MEAN - 1)):
+                if rng.random() < EXPLORE_RATE or not seeded[archetype]:
+                    arm, p = arms[rng.integers(len(arms))], 0.5
+                else:
+                    arm, p = seeded[archetype][rng.integers(len(seeded[archetype]))]
+                outcomes.append({"armId": arm, "success": bool(rng.random() < p)})
+            syncs.append((archetype, outcomes))
+        sessions.append(Session(f"user-{user}", bool(rng.random() < fetch_ratio), syncs))
+    return sessions
+
+
+def replay_sessions(path, limit, fetch_ratio, rng):
+    """Sessions from sync request bodies in JSONL, one request body (and one session) per line."""
+    sessions = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            body = json.loads(line)
+            if "userHash" not in body:
+                continue
+            sessions.append(Session(str(body["userHash"]), bool(rng.random() < fetch_ratio),
+                                    [(body.get("archetype"), body.get("outcomes"))]))
+            if limit and len(sessions) >= limit:
+                break
+    return sessions
+
+
+def user_hash(salt, user):
+    return hashlib.sha256(f"{salt}:{user}".encode()).hexdigest()
+
+
+def split_outcomes(outcomes, batch):
+    """Request-sized slices of one archetype's pending outcomes; batch 0 keeps them together."""
+    if not isinstance(outcomes, list) or not batch or len(outcomes) <= batch:
+        return [outcomes]
+    return [outcomes[i:i + batch] for i in range(0, len(outcomes), batch)]
+
+
+class HTTPConnection:
+    """One HTTP/1.1 connection; the pool never runs two requests on it at once."""
+
+    def __init__(self, host, port, ssl_context):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.reader = None
+        self.writer = None
+        self.used = 0
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl_context)
+        return self
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+    async def request(self, raw):
+        """Send a serialised request; returns (status, body, server keeps the connection open)."""
+        self.used += 1
+        self.writer.write(raw)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed before response")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        reusable = headers.get("connection", "").lower() != "close"
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if not size:
+                    while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            body, reusable = await self.reader.read(), False
+        return status, body, reusable
+
+
+class ConnectionPool:
+    """At most `size` connections in flight; with keep-alive, idle ones are reused."""
+
+    def __init__(self, url, size, keep_alive=True, key=None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl_context = ssl.create_default_context() if parts.scheme == "https" else None
+        base = parts.path.rstrip("/")
+        self.base = base if base.endswith(FUNCTIONS_PATH) else base + FUNCTIONS_PATH
+        self.keep_alive = keep_alive
+        self.headers = {"Host": parts.netloc, "Content-Type": "application/json",
+                        "Connection": "keep-alive" if keep_alive else "close"}
+        if key:
+            self.headers.update({"Authorization": f"Bearer {key}", "apikey": key})
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+        self.opened = 0
+        self.retries = 0
+
+    def _serialise(self, method, route, payload, query):
+        path = f"{self.base}/{route}" + (f"?{urlencode(query)}" if query else "")
+        body = json.dumps(payload).encode() if payload is not None else b""
+        headers = {**self.headers, "Content-Length": str(len(body))}
+        return (f"{method} {path} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+                + "\r\n").encode() + body
+
+    async def _connect(self):
+        self.opened += 1
+        return await HTTPConnection(self.host, self.port, self.ssl_context).open()
+
+    async def request(self, method, route, payload=None, query=None):
+        """(status, decoded JSON body or None)."""
+        raw = self._serialise(method, route, payload, query)
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else await self._connect()
+            try:
+                try:
+                    status, body, reusable = await conn.request(raw)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    if not conn.used > 1:
+                        raise
+                    # The server closed an idle keep-alive connection; resend once on a fresh one
+                    conn.close()
+                    self.retries += 1
+                    conn = await self._connect()
+                    status, body, reusable = await conn.request(raw)
+            except BaseException:
+                conn.close()
+                raise
+            if self.keep_alive and reusable:
+                self._idle.append(conn)
+            else:
+                conn.close()
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, None
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+async def timed_request(pool, records, timeout, start, method, route, payload=None, query=None, sent=0):
+    record = {"route": route, "status": 0, "sent": sent, "accepted": 0, "error": None}
+    try:
+        status, data = await asyncio.wait_for(pool.request(method, route, payload, query), timeout)
+        record["status"] = status
+        if route == SYNC_ROUTE and status == 200 and isinstance(data, dict):
+            record["accepted"] = sum(1 for r in data.get("results", []) if r.get("status") == "success")
+    except asyncio.TimeoutError:
+        record["error"] = "TIMEOUT"
+    except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["latency_ms"] = (time.monotonic() - start) * 1000
+    records.append(record)
+
+
+async def run_session(pool, session, salt, batch, records, timeout, scheduled=None):
+    """One user's fetch (optional) then sync requests, in order, as the app sends them."""
+    start = scheduled or time.monotonic()
+    hashed = user_hash(salt, session.user)
+    if session.fetch and session.syncs:
+        await timed_request(pool, records, timeout, start, "GET", FETCH_ROUTE,
+                            query={"archetype": session.syncs[0][0]})
+        start = time.monotonic()
+    for archetype, outcomes in session.syncs:
+        for part in split_outcomes(outcomes, batch):
+            body = {"userHash": hashed, "archetype": archetype, "outcomes": part}
+            await timed_request(pool, records, timeout, start, "POST", SYNC_ROUTE, body,
+                                sent=len(part) if isinstance(part, list) else 0)
+            start = time.monotonic()
+
+
+async def server_stats(pool, timeout):
+    """The stand-in's /_stats counters, or None when the server is not the stand-in."""
+    try:
+        status, data = await asyncio.wait_for(pool.request("GET", STATS_ROUTE), timeout)
+    except (asyncio.TimeoutError, OSError, asyncio.IncompleteReadError):
+        return None
+    return data if status == 200 and isinstance(data, dict) and "statements" in data else None
+
+
+def server_deltas(before, after, requests):
+    if not before or not after:
+        return None
+
+    def delta(key):
+        return after[key] - before[key]
+
+    statements = sum(after["statements"].values()) - sum(before["statements"].values())
+    applied = delta("outcomesApplied")
+    return {
+        "sync_mode": after["syncMode"],
+        "db_rtt_ms": after["dbRttMs"],
+        "statements": statements,
+        "statements_per_request": statements / max(requests, 1),
+        "transactions_per_request": delta("transactions") / max(requests, 1),
+        "rows_written": delta("rowsWritten"),
+        "rows_per_outcome": delta("rowsWritten") / applied if applied else None,
+        "outcomes_applied": applied,
+        "lost_updates": applied - delta("sampleCountAdded"),
+        "duplicate_sessions": delta("duplicateSessions"),
+    }
+
+
+async def run_stage(pool, sessions, salt, batch, concurrency, rate, timeout, rng):
+    before = await server_stats(pool, timeout)
+    opened = pool.opened
+    records = []
+    start = time.monotonic()
+    if rate:
+        tasks = []
+        arrival = start
+        for session in sessions:
+            arrival += rng.exponential(1 / rate)
+            delay = arrival - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(run_session(pool, session, salt, batch, records, timeout, arrival)))
+        await asyncio.gather(*tasks)
+    else:
+        queue = iter(sessions)
+
+        async def worker():
+            for session in queue:
+                await run_session(pool, session, salt, batch, records, timeout)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_s = time.monotonic() - start
+    # Let the fire-and-forget contribution cleanups land before reading the counters
+    await asyncio.sleep(0.1)
+    after = await server_stats(pool, timeout)
+
+    syncs = [r for r in records if r["route"] == SYNC_ROUTE]
+    statuses = collections.Counter(f"{'sync' if r['route'] == SYNC_ROUTE else 'fetch'} {r['status'] or r['error']}"
+                                   for r in records)
+    accepted = sum(r["accepted"] for r in syncs)
+    return {
+        "batch": batch,
+        "sessions": len(sessions),
+        "requests": len(records),
+        "wall_s": wall_s,
+        "requests_per_s": len(records) / wall_s if wall_s else 0.0,
+        "outcomes_sent": sum(r["sent"] for r in syncs),
+        "outcomes_accepted": accepted,
+        "accepted_per_s": accepted / wall_s if wall_s else 0.0,
+        "connections_opened": pool.opened - opened,
+        "statuses": dict(statuses),
+        "latency": {
+            "sync_accepted": summarise([r["latency_ms"] for r in syncs if r["status"] == 200]),
+            "sync_rejected": summarise([r["latency_ms"] for r in syncs if r["status"] not in (0, 200)]),
+            "fetch": summarise([r["latency_ms"] for r in records if r["route"] == FETCH_ROUTE and r["status"]]),
+        },
+        "server": server_deltas(before, after, len(records)),
+    }
+
+
+def fmt(value, spec):
+    return format(value, spec) if value is not None else "-"
+
+
+def print_report(stages):
+    print(f"\n{'BATCH':>5} {'REQS':>7} {'REQ/S':>7} {'OUT/S':>7} {'ACCEPTED':>9} {'P50':>6} {'P95':>6} {'P99':>6} "
+          f"{'MAX':>6} {'STMT/REQ':>8} {'ROWS/OUT':>8} {'LOST':>6} {'CONNS':>6}")
+    for s in stages:
+        lat = s["latency"]["sync_accepted"]
+        server = s["server"] or {}
+        print(f"{s['batch'] or 'all':>5} {s['requests']:>7,} {s['requests_per_s']:>7.0f} {s['accepted_per_s']:>7.0f} "
+              f"{s['outcomes_accepted'] / max(s['outcomes_sent'], 1):>9.1%} "
+              f"{fmt(lat.get('p50'), '6.1f')} {fmt(lat.get('p95'), '6.1f')} {fmt(lat.get('p99'), '6.1f')} "
+              f"{fmt(lat.get('max'), '6.1f')} {fmt(server.get('statements_per_request'), '8.2f')} "
+              f"{fmt(server.get('rows_per_outcome'), '8.2f')} {fmt(server.get('lost_updates'), '6,')} "
+              f"{s['connections_opened']:>6,}")
+    print("Latency (ms) is for accepted syncs; ACCEPTED is accepted / sent outcomes; "
+          "ROWS/OUT is rows written per applied outcome.")
+
+    for s in stages:
+        statuses = ", ".join(f"{k} ×{v:,}" for k, v in sorted(s["statuses"].items()))
+        extras = []
+        for name in ("sync_rejected", "fetch"):
+            lat = s["latency"][name]
+            if lat["count"]:
+                extras.append(f"{name.replace('_', ' ')} p50 {lat['p50']:.1f} p99 {lat['p99']:.1f}ms")
+        server = s["server"]
+        if server and server["duplicate_sessions"]:
+            extras.append(f"{server['duplicate_sessions']:,} sessions past the rate limit by racing it")
+        print(f"\n[batch {s['batch'] or 'all'}] {statuses}")
+        if extras:
+            print("    " + "; ".join(extras))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Population learning edge function load generator")
+    parser.add_argument("--url", default="http://127.0.0.1:8787",
+                        help="stand-in server or Supabase project URL (/functions/v1 is appended)")
+    parser.add_argument("--key", default=os.environ.get("SUPABASE_ANON_KEY"),
+                        help="anon key sent as Authorization and apikey (default $SUPABASE_ANON_KEY)")
+    parser.add_argument("--sessions", type=int, default=2000, help="sync sessions per stage")
+    parser.add_argument("--users", type=int, help="user pool size (default: --sessions)")
+    parser.add_argument("--mix", help="archetype weights, e.g. REBEL=2,PERFECTIONIST=1 (default uniform)")
+    parser.add_argument("--replay", help="send sync request bodies from JSONL instead of synthetic sessions")
+    parser.add_argument("--batch-sizes", default="0,5,1",
+                        help="comma-separated outcomes per request, one stage each (0 = all pending)")
+    parser.add_argument("--connections", type=int, default=16, help="pool size, and closed-loop concurrency")
+    parser.add_argument("--no-keep-alive", action="store_true", help="open a new connection per request")
+    parser.add_argument("--rate", type=float, help="open loop: sessions per second (Poisson arrivals)")
+    parser.add_argument("--fetch-ratio", type=float, default=0.2,
+                        help="share of sessions that fetch priors before syncing")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results JSON here")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    batches = [int(b) for b in args.batch_sizes.split(",")]
+    if args.replay:
+        sessions = replay_sessions(args.replay, args.sessions, args.fetch_ratio, rng)
+        source = args.replay
+    else:
+        sessions = synthetic_sessions(args.sessions, args.users or args.sessions, parse_mix(args.mix),
+                                      args.fetch_ratio, load_seed_priors(), rng)
+        source = f"{len({s.user for s in sessions}):,} synthetic users"
+    if not sessions:
+        print("No sessions to send")
+        sys.exit(1)
+
+    pool = ConnectionPool(args.url, args.connections, not args.no_keep_alive, args.key)
+    mode = f"open loop at {args.rate:g} sessions/s" if args.rate else "closed loop"
+    print(f"{len(sessions):,} sessions from {source} → {args.url}; {args.connections} "
+          f"{'keep-alive' if pool.keep_alive else 'one-shot'} connections, {mode}")
+    run_id = f"{time.time_ns():x}"
+    stages = []
+    for batch in batches:
+        stage = await run_stage(pool, sessions, f"{run_id}:{batch}", batch, args.connections, args.rate,
+                                args.timeout, rng)
+        server = stage["server"]
+        print(f"  batch {batch or 'all'}: {stage['requests']:,} requests in {stage['wall_s']:.2f}s"
+              + (f" ({server['sync_mode']}, {server['db_rtt_ms']:g}ms per DB call)" if server else ""))
+        stages.append(stage)
+    pool.close()
+    if pool.retries:
+        print(f"{pool.retries:,} requests resent after the server closed an idle connection")
+
+    print_report(stages)
+    if args.out:
+        report = {"url": args.url, "sessions": len(sessions), "connections": args.connections,
+                  "keep_alive": pool.keep_alive, "rate": args.rate, "stages": stages}
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Offline simulator for the population-learning-sync Beta-prior aggregation
+
+supabase/functions/population-learning-sync updates archetype_priors one
+outcome at a time: read the (archetype, arm) row, add LEARNING_RATE to alpha on
+success or to beta on failure, increment sample_count, upsert. The update is a
+sum, so a batch of outcomes reduces to two bincounts over flat (archetype, arm)
+cells. This script applies it that way, at millions of outcomes per second,
+starting from the priors seeded by
+supabase/migrations/20260103_population_learning.sql.
+
+The request-level rules are modelled too. Replay lines that are not JSON
+objects are counted as malformed and skipped. Unknown archetypes are rejected.
+Outcomes without an armId or a boolean success are skipped. A second session
+for the same (userHash, archetype) on the same day is rate limited.
+MIN_SAMPLES_THRESHOLD is declared in the function but not applied;
+--min-samples N drops sessions with fewer than N valid outcomes, to see what
+enforcing it would change.
+
+Outcomes come either from a synthetic population with known success rates,
+which can drift linearly over the run, or from JSONL with one sync request
+body per line:
+    {"userHash": "...", "archetype": "REBEL", "day": 0, "outcomes": [{"armId": "ACT_STREAK", "success": true}]}
+Flat {"archetype", "armId", "success"} rows are read as one-outcome sessions.
+
+After every chunk, the posterior means alpha / (alpha + beta) are compared
+with the true rates. The report shows mean and max absolute error, signed
+bias (drift lag), and how often the truth falls inside the 95% interval.
+
+Usage:
+    python3 scripts/population_learning_sim.py synth --outcomes 20000000 --drift 0.2
+    python3 scripts/population_learning_sim.py synth --outcomes 1000000 --jsonl outcomes.jsonl --truth truth.json
+    python3 scripts/population_learning_sim.py replay outcomes.jsonl --truth truth.json --min-samples 5
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from population_learning_contract import (ARCHETYPES, DEFAULT_ALPHA, DEFAULT_BETA, LEARNING_RATE, MIGRATION_PATH,
+                                          MIN_SAMPLES_THRESHOLD, SESSION_MEAN, load_seed_priors)
+
+CHUNK = 1_000_000
+# Spread of the true rates around the seeded prior means
+TRUTH_SD = 0.1
+# A cell has converged once its posterior mean stays within this of the truth
+TOLERANCE = 0.02
+Z95 = 1.96
+
+
+class Batch:
+    """One chunk of outcomes as parallel arrays; session numbers restart at 0 per batch."""
+
+    def __init__(self, archetype, arm, success, session):
+        self.archetype = np.asarray(archetype, dtype=np.int64)
+        self.arm = np.asarray(arm, dtype=np.int64)
+        self.success = np.asarray(success, dtype=bool)
+        self.session = np.asarray(session, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.archetype)
+
+    def min_samples(self, threshold):
+        """Only the outcomes of sessions with at least `threshold` of them."""
+        if threshold <= 1 or not len(self):
+            return self
+        keep = np.bincount(self.session)[self.session] >= threshold
+        return Batch(self.archetype[keep], self.arm[keep], self.success[keep], self.session[keep])
+
+
+class PriorTable:
+    """archetype_priors as (archetype x arm) arrays; arms get a column when first named."""
+
+    def __init__(self, seeds):
+        self.archetype_index = {name: i for i, name in enumerate(ARCHETYPES)}
+        self.arms = []
+        self.arm_index = {}
+        shape = (len(ARCHETYPES), 0)
+        self.alpha = np.empty(shape)
+        self.beta = np.empty(shape)
+        self.count = np.empty(shape, dtype=np.int64)
+        for (archetype, arm), (alpha, beta) in seeds.items():
+            i, j = self.archetype_index[archetype], self.arm_id(arm)
+            self.alpha[i, j], self.beta[i, j] = alpha, beta
+
+    def arm_id(self, arm):
+        j = self.arm_index.get(arm)
+        if j is None:
+            j = self.arm_index[arm] = len(self.arms)
+            self.arms.append(arm)
+            self.alpha = np.pad(self.alpha, ((0, 0), (0, 1)), constant_values=DEFAULT_ALPHA)
+            self.beta = np.pad(self.beta, ((0, 0), (0, 1)), constant_values=DEFAULT_BETA)
+            self.count = np.pad(self.count, ((0, 0), (0, 1)))
+        return j
+
+    def apply(self, batch):
+        """The sync function's per-outcome update, for a whole batch at once."""
+        width = len(self.arms)
+        size = len(ARCHETYPES) * width
+        cells = batch.archetype * width + batch.arm
+        n = np.bincount(cells, minlength=size).reshape(-1, width)
+        wins = np.bincount(cells, weights=batch.success, minlength=size).reshape(-1, width)
+        self.alpha += LEARNING_RATE * wins
+        self.beta += LEARNING_RATE * (n - wins)
+        self.count += n
+
+    def posterior(self, archetype, arm):
+        """Posterior mean and standard deviation at the given cells."""
+        a, b = self.alpha[archetype, arm], self.beta[archetype, arm]
+        total = a + b
+        return a / total, np.sqrt(a * b / (total ** 2 * (total + 1)))
+
+
+def sequential_reference(table, batch):
+    """The edge function's loop in plain Python: {(archetype, arm): [alpha, beta, count]} after batch."""
+    rows = {}
+    for i, j, success in zip(batch.archetype.tolist(), batch.arm.tolist(), batch.success.tolist()):
+        row = rows.get((i, j))
+        if row is None:
+            row = rows[(i, j)] = [table.alpha[i, j], table.beta[i, j], table.count[i, j]]
+        row[0] += LEARNING_RATE if success else 0
+        row[1] += 0 if success else LEARNING_RATE
+        row[2] += 1
+    return rows
+
+
+class Truth:
+    """True success rate per cell, moving linearly from p_start to p_end over `outcomes`."""
+
+    def __init__(self, archetype, arm, p_start, p_end, outcomes):
+        self.archetype = np.asarray(archetype, dtype=np.int64)
+        self.arm = np.asarray(arm, dtype=np.int64)
+        self.p_start = np.asarray(p_start, dtype=float)
+        self.p_end = np.asarray(p_end, dtype=float)
+        self.outcomes = outcomes
+
+    def at(self, position, cells=slice(None)):
+        """Rates at `position` outcomes into the run, for all cells or per outcome (cells and position aligned)."""
+        progress = np.clip(position / max(self.outcomes, 1), 0.0, 1.0)
+        return self.p_start[cells] + (self.p_end[cells] - self.p_start[cells]) * progress
+
+    @classmethod
+    def synthetic(cls, table, seeds, outcomes, drift, rng):
+        cells = sorted(seeds, key=lambda cell: table.archetype_index[cell[0]])
+        prior_mean = np.array([alpha / (alpha + beta) for alpha, beta in (seeds[cell] for cell in cells)])
+        p_start = np.clip(prior_mean + rng.normal(0, TRUTH_SD, len(cells)), 0.05, 0.95)
+        p_end = np.clip(p_start + drift * rng.choice([-1.0, 1.0], len(cells)), 0.02, 0.98)
+        return cls([table.archetype_index[a] for a, _ in cells], [table.arm_index[arm] for _, arm in cells],
+                   p_start, p_end, outcomes)
+
+    @classmethod
+    def load(cls, path, table):
+        data = json.loads(Path(path).read_text())
+        cells = data["cells"]
+        return cls([table.archetype_index[c["archetype"]] for c in cells],
+                   [table.arm_id(c["armId"]) for c in cells],
+                   [c["p_start"] for c in cells], [c["p_end"] for c in cells], data["outcomes"])
+
+    def save(self, path, table):
+        cells = [{"archetype": ARCHETYPES[i], "armId": table.arms[j], "p_start": float(p0), "p_end": float(p1)}
+                 for i, j, p0, p1 in zip(self.archetype, self.arm, self.p_start, self.p_end)]
+        Path(path).write_text(json.dumps({"outcomes": self.outcomes, "cells": cells}, indent=1))
+
+
+def synthetic_batches(truth, chunk, rng):
+    """Sync sessions (one archetype, SESSION_MEAN outcomes on average) drawn from truth, ~chunk outcomes per batch."""
+    order = np.argsort(truth.archetype, kind="stable")
+    per_archetype = np.bincount(truth.archetype, minlength=len(ARCHETYPES))
+    offsets = np.concatenate([[0], np.cumsum(per_archetype)[:-1]])
+    seeded = np.flatnonzero(per_archetype)
+    produced = 0
+    for target in range(0, truth.outcomes, chunk):
+        # Session sizes are random, so totals land near (not exactly on) the target
+        sessions = max(1, round(min(chunk, truth.outcomes - target) / SESSION_MEAN))
+        sizes = 1 + rng.poisson(SESSION_MEAN - 1, sessions)
+        session = np.repeat(np.arange(sessions), sizes)
+        archetype = seeded[rng.integers(0, len(seeded), sessions)][session]
+        # Each outcome picks one of its archetype's arms uniformly
+        local = (rng.random(len(session)) * per_archetype[archetype]).astype(np.int64)
+        cell = order[offsets[archetype] + local]
+        p = truth.at(produced + np.arange(len(session)), cell)
+        success = rng.random(len(session)) < p
+        produced += len(session)
+        yield Batch(archetype, truth.arm[cell], success, session)
+
+
+def write_jsonl(path, batches, table):
+    """Write batches as sync request bodies and pass them through; sessions get unique user hashes."""
+    user = 0
+    with open(path, "w") as f:
+        for batch in batches:
+            bounds = np.flatnonzero(np.diff(batch.session)) + 1
+            for start, end in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(batch)]])):
+                outcomes = [{"armId": table.arms[j], "success": s}
+                            for j, s in zip(batch.arm[start:end].tolist(), batch.success[start:end].tolist())]
+                f.write(json.dumps({"userHash": f"u{user:08x}", "archetype": ARCHETYPES[batch.archetype[start]],
+                                    "day": 0, "outcomes": outcomes}) + "\n")
+                user += 1
+            yield batch
+
+
+def jsonl_batches(path, table, chunk, stats):
+    """Read sync request bodies, applying the function's validation and rate limit, ~chunk outcomes per batch."""
+    seen = set()
+    columns = ([], [], [], [])
+    session = 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                body = json.loads(line)
+            except ValueError:
+                body = None
+            if not isinstance(body, dict):
+                stats["malformed"] += 1
+                continue
+            archetype = body.get("archetype")
+            outcomes = body.get("outcomes")
+            if outcomes is None and "armId" in body:
+                outcomes = [{"armId": body["armId"], "success": body.get("success")}]
+            elif not body.get("userHash"):
+                outcomes = None
+            i = table.archetype_index.get(archetype)
+            if i is None or not isinstance(outcomes, list):
+                stats["rejected"] += 1
+                continue
+            if body.get("userHash"):
+                key = (body["userHash"], archetype, body.get("day", 0))
+                if key in seen:
+                    stats["rate_limited"] += 1
+                    continue
+                seen.add(key)
+
+            for outcome in outcomes:
+                if not isinstance(outcome, dict):
+                    stats["skipped"] += 1
+                    continue
+                arm, success = outcome.get("armId"), outcome.get("success")
+                if not arm or not isinstance(success, bool):
+                    stats["skipped"] += 1
+                    continue
+                for column, value in zip(columns, (i, table.arm_id(arm), success, session)):
+                    column.append(value)
+            session += 1
+            if len(columns[0]) >= chunk:
+                yield Batch(*columns)
+                columns = ([], [], [], [])
+                session = 0
+    if columns[0]:
+        yield Batch(*columns)
+
+
+def evaluate(table, truth, position):
+    """Posterior vs truth at `position` outcomes into the run."""
+    mean, sd = table.posterior(truth.archetype, truth.arm)
+    p = truth.at(position)
+    error = mean - p
+    return {
+        "outcomes": int(position),
+        "mae": float(np.mean(np.abs(error))),
+        "max_error": float(np.max(np.abs(error))),
+        "bias": float(np.mean(error)),
+        "coverage": float(np.mean(np.abs(error) <= Z95 * sd)),
+        "pseudo_counts": float(np.mean(table.alpha[truth.archetype, truth.arm] + table.beta[truth.archetype, truth.arm])),
+    }, error
+
+
+def simulate(table, batches, truth=None, min_samples=0, check=False, log=print):
+    """Apply batches to table, evaluating against truth after each; returns (history, converged_at, timings)."""
+    history = []
+    converged_at = np.full(len(truth.archetype), np.nan) if truth else None
+    timings = {"read": 0.0, "update": 0.0, "outcomes": 0, "applied": 0}
+    position = 0
+    iterator = iter(batches)
+    while True:
+        start = time.perf_counter()
+        batch = next(iterator, None)
+        timings["read"] += time.perf_counter() - start
+        if batch is None:
+            break
+        position += len(batch)
+        timings["outcomes"] += len(batch)
+        batch = batch.min_samples(min_samples)
+        timings["applied"] += len(batch)
+
+        expected = None
+        if check and not history:
+            start = time.perf_counter()
+            expected = sequential_reference(table, batch)
+            reference_s = time.perf_counter() - start
+        start = time.perf_counter()
+        table.apply(batch)
+        update_s = time.perf_counter() - start
+        timings["update"] += update_s
+        if expected is not None:
+            verify_against_reference(table, expected, len(batch), reference_s, update_s, log)
+
+        if truth is None:
+            history.append({"outcomes": position})
+            continue
+        row, error = evaluate(table, truth, position)
+        history.append(row)
+        within = np.abs(error) <= TOLERANCE
+        converged_at[within & np.isnan(converged_at)] = position
+        converged_at[~within] = np.nan
+        log(f"{position:>12,} {row['mae']:>8.4f} {row['max_error']:>8.4f} {row['bias']:>+8.4f} "
+            f"{row['coverage'] * 100:>7.1f}% {row['pseudo_counts']:>11,.0f}")
+    return history, converged_at, timings
+
+
+def verify_against_reference(table, expected, outcomes, reference_s, update_s, log=print):
+    worst = max((abs(table.alpha[i, j] - a) + abs(table.beta[i, j] - b) + abs(table.count[i, j] - n)
+                 for (i, j), (a, b, n) in expected.items()), default=0.0)
+    status = "matches" if worst < 1e-6 * max(outcomes, 1) else f"DIFFERS (max {worst:.3g})"
+    log(f"Batched update {status} the per-outcome loop on the first chunk ({len(expected)} cells, "
+        f"{outcomes:,} outcomes): {reference_s:.2f}s vs {update_s * 1000:.1f}ms batched")
+
+
+def print_cells(table, seeds, truth, converged_at, log=print):
+    mean, sd = table.posterior(truth.archetype, truth.arm)
+    p = truth.at(truth.outcomes)
+    log(f"\n{'ARCHETYPE':<16} {'ARM':<16} {'SEED':>6} {'TRUTH':>6} {'POST':>6} {'±95%':>6} "
+        f"{'SAMPLES':>10} {'CONVERGED AT':>13}")
+    for k, (i, j) in enumerate(zip(truth.archetype, truth.arm)):
+        seed = seeds.get((ARCHETYPES[i], table.arms[j]), (DEFAULT_ALPHA, DEFAULT_BETA))
+        converged = f"{converged_at[k]:,.0f}" if not np.isnan(converged_at[k]) else "-"
+        log(f"{ARCHETYPES[i]:<16} {table.arms[j]:<16} {seed[0] / sum(seed):>6.3f} {p[k]:>6.3f} "
+            f"{mean[k]:>6.3f} {Z95 * sd[k]:>6.3f} {table.count[i, j]:>10,} {converged:>13}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulate population-learning-sync prior aggregation")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    synth = sub.add_parser("synth", help="simulate a synthetic population with known success rates")
+    synth.add_argument("--outcomes", type=float, default=10_000_000, help="total outcomes to simulate")
+    synth.add_argument("--drift", type=float, default=0.0,
+                       help="how far each true rate moves (up or down) over the run")
+    synth.add_argument("--seed", type=int, default=0)
+    synth.add_argument("--jsonl", help="also write the outcomes as sync request bodies here")
+    synth.add_argument("--truth", help="also write the true rates here, for replay --truth")
+    replay = sub.add_parser("replay", help="stream sync request bodies from JSONL")
+    replay.add_argument("path")
+    replay.add_argument("--truth", help="true rates written by synth --truth")
+    for p in (synth, replay):
+        p.add_argument("--chunk", type=float, default=CHUNK, help="outcomes per batch")
+        p.add_argument("--min-samples", type=int, default=0,
+                       help=f"drop sessions with fewer valid outcomes (the function declares "
+                            f"{MIN_SAMPLES_THRESHOLD} but does not enforce it)")
+        p.add_argument("--check", action="store_true",
+                       help="verify the first batch against the per-outcome loop")
+        p.add_argument("--out", help="write the convergence history and final priors as JSON here")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    seeds = load_seed_priors()
+    table = PriorTable(seeds)
+    chunk = int(args.chunk)
+    stats = {"malformed": 0, "rejected": 0, "rate_limited": 0, "skipped": 0}
+
+    if args.mode == "synth":
+        rng = np.random.default_rng(args.seed)
+        truth = Truth.synthetic(table, seeds, int(args.outcomes), args.drift, rng)
+        if args.truth:
+            truth.save(args.truth, table)
+        batches = synthetic_batches(truth, chunk, rng)
+        if args.jsonl:
+            batches = write_jsonl(args.jsonl, batches, table)
+    else:
+        truth = Truth.load(args.truth, table) if args.truth else None
+        batches = jsonl_batches(args.path, table, chunk, stats)
+
+    print(f"{len(seeds)} seeded priors from {MIGRATION_PATH.name}; learning rate {LEARNING_RATE}, "
+          f"min samples {args.min_samples or 'not enforced'}")
+    if truth:
+        print(f"\n{'OUTCOMES':>12} {'MAE':>8} {'MAX ERR':>8} {'BIAS':>8} {'COVER95':>8} {'PSEUDO-N':>11}")
+    history, converged_at, timings = simulate(table, batches, truth, args.min_samples, args.check)
+    if not timings["outcomes"]:
+        print("No outcomes read")
+        sys.exit(1)
+
+    if truth:
+        print_cells(table, seeds, truth, converged_at)
+        done = np.count_nonzero(~np.isnan(converged_at))
+        print(f"\n{done}/{len(converged_at)} cells within ±{TOLERANCE} of the truth at the end")
+    if any(stats.values()):
+        print(f"Lines malformed {stats['malformed']:,}; requests rejected {stats['rejected']:,}, "
+              f"rate limited {stats['rate_limited']:,}; outcomes skipped {stats['skipped']:,}")
+    dropped = timings["outcomes"] - timings["applied"]
+    if dropped:
+        print(f"{dropped:,} outcomes dropped by --min-samples {args.min_samples}")
+    total = timings["read"] + timings["update"]
+    print(f"{timings['outcomes']:,} outcomes: update {timings['update']:.2f}s "
+          f"({timings['applied'] / max(timings['update'], 1e-9) / 1e6:.1f}M/s), "
+          f"{'generate' if args.mode == 'synth' else 'read'} {timings['read']:.2f}s, "
+          f"overall {timings['outcomes'] / total / 1e6:.2f}M/s")
+
+    if args.out:
+        priors = [{"archetype": ARCHETYPES[i], "armId": arm, "alpha": float(table.alpha[i, j]),
+                   "beta": float(table.beta[i, j]), "sampleCount": int(table.count[i, j])}
+                  for i in range(len(ARCHETYPES)) for j, arm in enumerate(table.arms) if table.count[i, j]
+                  or (ARCHETYPES[i], arm) in seeds]
+        with open(args.out, "w") as f:
+            json.dump({"history": history, "priors": priors}, f, indent=2)
+        print(f"💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Local population-learning edge function stand-in
+Offline load testing for population-learning-sync and population-learning-fetch
+
+Serves the request and response contracts of
+supabase/functions/population-learning-{sync,fetch}/index.ts over HTTP/1.1
+keep-alive, backed by SQLite with the tables, indexes and seeded priors of
+supabase/migrations/20260103_population_learning.sql:
+  - POST /functions/v1/population-learning-sync   -> archetype validation, the
+                                                     contribution_log rate limit,
+                                                     then a read and an upsert
+                                                     per outcome
+  - GET  /functions/v1/population-learning-fetch?archetype=REBEL
+  - GET  /_stats                                  -> counters for
+                                                     population_learning_load.py
+                                                     (stand-in only)
+
+The sync handler issues the function's statements in the function's order, each
+as its own transaction behind a simulated PostgREST round trip (--db-rtt). The
+read-modify-write on archetype_priors and the gap between the rate-limit check
+and the contribution_log insert therefore race under concurrency just as they
+do in production. --sync-mode rpc applies a request in a single transaction
+instead (claim the rate-limit row, then one increment per distinct arm), to
+compare against.
+
+MIN_SAMPLES_THRESHOLD is declared in the function but not applied;
+--min-samples N rejects sessions with fewer than N valid outcomes, to see what
+enforcing it would change.
+
+Usage:
+    python3 scripts/population_learning_standin_server.py --port 8787 --db-rtt 2
+    python3 scripts/population_learning_standin_server.py --sync-mode rpc --db .cache/priors.db
+    python3 scripts/population_learning_load.py --url http://127.0.0.1:8787
+"""
+
+import argparse
+import asyncio
+import collections
+import http
+import json
+import random
+import sqlite3
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+from population_learning_contract import (ARCHETYPES, FETCH_ROUTE, LEARNING_RATE, MIN_SAMPLES_THRESHOLD, STATS_ROUTE,
+                                          SYNC_ROUTE, load_seed_priors)
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type",
+}
+# clean_old_contributions() deletes contribution_log rows older than 24 hours
+CONTRIBUTION_TTL_S = 24 * 3600
+MAX_BODY_BYTES = 1 << 20
+
+# The migration's schema; UUID keys become INTEGER PRIMARY KEY and timestamps
+# are ISO strings (archetype_priors) or epoch seconds (contribution_log)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archetype_priors (
+    id INTEGER PRIMARY KEY,
+    archetype TEXT NOT NULL,
+    arm_id TEXT NOT NULL,
+    alpha REAL NOT NULL DEFAULT 1.0,
+    beta REAL NOT NULL DEFAULT 1.0,
+    sample_count INTEGER NOT NULL DEFAULT 0,
+    last_updated TEXT,
+    CONSTRAINT unique_archetype_arm UNIQUE (archetype, arm_id)
+);
+CREATE INDEX IF NOT EXISTS idx_archetype_priors_archetype ON archetype_priors(archetype);
+CREATE INDEX IF NOT EXISTS idx_archetype_priors_arm ON archetype_priors(arm_id);
+CREATE INDEX IF NOT EXISTS idx_archetype_priors_composite ON archetype_priors(archetype, arm_id);
+
+CREATE TABLE IF NOT EXISTS contribution_log (
+    id INTEGER PRIMARY KEY,
+    user_hash TEXT NOT NULL,
+    archetype TEXT NOT NULL,
+    arm_id TEXT NOT NULL DEFAULT '_session_',
+    contributed_at REAL NOT NULL,
+    CONSTRAINT unique_contribution_session_24h UNIQUE (user_hash, archetype)
+);
+CREATE INDEX IF NOT EXISTS idx_contribution_log_time ON contribution_log(contributed_at);
+"""
+
+_UPSERT_PRIOR = """
+INSERT INTO archetype_priors (archetype, arm_id, alpha, beta, sample_count, last_updated)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (archetype, arm_id) DO UPDATE SET
+    alpha = excluded.alpha, beta = excluded.beta,
+    sample_count = excluded.sample_count, last_updated = excluded.last_updated
+"""
+
+# rpc mode: increments instead of read-modify-write, so concurrent sessions cannot lose updates
+_INCREMENT_PRIOR = """
+INSERT INTO archetype_priors (archetype, arm_id, alpha, beta, sample_count, last_updated)
+VALUES (:archetype, :arm, 1.0 + :wins, 1.0 + :losses, :n, :now)
+ON CONFLICT (archetype, arm_id) DO UPDATE SET
+    alpha = alpha + :wins, beta = beta + :losses,
+    sample_count = sample_count + :n, last_updated = :now
+"""
+
+
+def log(msg):
+    timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+    print(f"[{timestamp}] {msg}")
+
+
+def iso_now():
+    """`new Date().toISOString()`"""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class StandInConfig:
+    """Knobs for the stand-in server. All times are in milliseconds."""
+
+    def __init__(self, db_rtt=1.0, jitter=0.25, sync_mode="faithful", min_samples=0, rate_limit=True,
+                 seed=None):
+        # Edge function <-> PostgREST round trip paid by every supabase-js call
+        self.db_rtt = db_rtt
+        self.jitter = jitter
+        self.sync_mode = sync_mode
+        self.min_samples = min_samples
+        self.rate_limit = rate_limit
+        self.rng = random.Random(seed)
+
+    def delay(self) -> float:
+        """Half a round trip plus uniform +/- jitter, in seconds."""
+        jittered = self.db_rtt / 2 + self.rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, jittered) / 1000
+
+
+class PriorStore:
+    """archetype_priors and contribution_log in SQLite. Each public method is one PostgREST call."""
+
+    def __init__(self, path, seeds):
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        now = iso_now()
+        self.conn.executemany(
+            "INSERT INTO archetype_priors (archetype, arm_id, alpha, beta, last_updated) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (archetype, arm_id) DO NOTHING",
+            [(archetype, arm, alpha, beta, now) for (archetype, arm), (alpha, beta) in seeds.items()])
+        self.statements = collections.Counter()
+        self.transactions = 0
+        self._changes_at_start = self.conn.total_changes
+
+    @property
+    def rows_written(self):
+        return self.conn.total_changes - self._changes_at_start
+
+    def _execute(self, kind, sql, params=()):
+        self.statements[kind] += 1
+        self.transactions += 1
+        return self.conn.execute(sql, params)
+
+    def contributed(self, user_hash, archetype):
+        return self._execute("select", "SELECT id FROM contribution_log WHERE user_hash = ? AND archetype = ? LIMIT 1",
+                             (user_hash, archetype)).fetchone() is not None
+
+    def get_prior(self, archetype, arm):
+        """(alpha, beta, sample_count), or None before the arm's first upsert."""
+        return self._execute("select", "SELECT alpha, beta, sample_count FROM archetype_priors "
+                                       "WHERE archetype = ? AND arm_id = ?", (archetype, arm)).fetchone()
+
+    def upsert_prior(self, archetype, arm, alpha, beta, sample_count, updated):
+        self._execute("upsert", _UPSERT_PRIOR, (archetype, arm, alpha, beta, sample_count, updated))
+
+    def log_contribution(self, user_hash, archetype, now):
+        """False when the unique (user_hash, archetype) constraint rejects the row."""
+        try:
+            self._execute("insert", "INSERT INTO contribution_log (user_hash, archetype, contributed_at) "
+                                    "VALUES (?, ?, ?)", (user_hash, archetype, now))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def clean_old_contributions(self, now):
+        self._execute("delete", "DELETE FROM contribution_log WHERE contributed_at < ?", (now - CONTRIBUTION_TTL_S,))
+
+    def apply_session(self, user_hash, archetype, outcomes, now, rate_limit=True):
+        """rpc mode: claim the session and apply all outcomes in one transaction; None when rate limited."""
+        per_arm = {}
+        for arm, success in outcomes:
+            n, wins = per_arm.get(arm, (0, 0))
+            per_arm[arm] = (n + 1, wins + success)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if rate_limit:
+                self.statements["insert"] += 1
+                claimed = self.conn.execute(
+                    "INSERT INTO contribution_log (user_hash, archetype, contributed_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (user_hash, archetype) DO NOTHING", (user_hash, archetype, now)).rowcount
+                if not claimed:
+                    self.conn.execute("ROLLBACK")
+                    return None
+            updated = iso_now()
+            self.statements["upsert"] += len(per_arm)
+            self.conn.executemany(_INCREMENT_PRIOR, [
+                {"archetype": archetype, "arm": arm, "wins": LEARNING_RATE * wins,
+                 "losses": LEARNING_RATE * (n - wins), "n": n, "now": updated}
+                for arm, (n, wins) in per_arm.items()])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        finally:
+            self.transactions += 1
+        return len(outcomes)
+
+    def fetch(self, archetype):
+        return self._execute("select", "SELECT arm_id, alpha, beta, sample_count, last_updated FROM archetype_priors "
+                                       "WHERE archetype = ?", (archetype,)).fetchall()
+
+    def sample_count_total(self):
+        """Not a PostgREST call: read by /_stats to detect lost updates."""
+        return self.conn.execute("SELECT COALESCE(SUM(sample_count), 0) FROM archetype_priors").fetchone()[0]
+
+
+def _valid_outcomes(outcomes):
+    """The function's per-outcome check: `!armId || typeof success !== 'boolean'` is skipped."""
+    valid = []
+    for outcome in outcomes:
+        if not isinstance(outcome, dict):
+            continue
+        arm, success = outcome.get("armId"), outcome.get("success")
+        if arm and isinstance(success, bool):
+            valid.append((arm, success))
+    return valid
+
+
+class StandInServer:
+    def __init__(self, config: StandInConfig, store: PriorStore, host: str = "127.0.0.1", port: int = 8787):
+        self.config = config
+        self.store = store
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.responses = collections.Counter()
+        self.outcomes_applied = 0
+        # Sessions whose outcomes were applied but whose contribution_log insert hit the unique
+        # constraint: a concurrent request for the same user passed the rate-limit check too
+        self.duplicate_sessions = 0
+        self._sample_count_at_start = store.sample_count_total()
+        self._background = set()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def db(self, call, *args):
+        """One supabase-js call: half a round trip there, the statement, half a round trip back."""
+        if self.config.db_rtt > 0:
+            await asyncio.sleep(self.config.delay())
+        result = call(*args)
+        if self.config.db_rtt > 0:
+            await asyncio.sleep(self.config.delay())
+        return result
+
+    async def sync(self, body):
+        if not isinstance(body, dict):
+            raise TypeError("Request body must be a JSON object")
+        user_hash, archetype, outcomes = body.get("userHash"), body.get("archetype"), body.get("outcomes")
+        if not user_hash or not archetype or not isinstance(outcomes, list):
+            return 400, {"error": "Missing required fields: userHash, archetype, outcomes"}
+        if archetype not in ARCHETYPES:
+            return 400, {"error": "Invalid archetype"}
+
+        valid = _valid_outcomes(outcomes)
+        if len(valid) < self.config.min_samples:
+            return 400, {"success": False, "error": "insufficient_samples",
+                         "message": f"At least {self.config.min_samples} valid outcomes required per session"}
+        rate_limited = (429, {"success": False, "error": "rate_limited",
+                              "message": "Already contributed for this archetype in the last 24 hours"})
+
+        if self.config.sync_mode == "rpc":
+            if await self.db(self.store.apply_session, user_hash, archetype, valid, time.time(),
+                             self.config.rate_limit) is None:
+                return rate_limited
+            results = [{"armId": arm, "status": "success"} for arm, _ in valid]
+            self.outcomes_applied += len(valid)
+        else:
+            if self.config.rate_limit and await self.db(self.store.contributed, user_hash, archetype):
+                return rate_limited
+            results = []
+            for arm, success in valid:
+                try:
+                    prior = await self.db(self.store.get_prior, archetype, arm)
+                    alpha, beta, sample_count = prior or (1.0, 1.0, 0)
+                    await self.db(self.store.upsert_prior, archetype, arm,
+                                  alpha + (LEARNING_RATE if success else 0), beta + (0 if success else LEARNING_RATE),
+                                  sample_count + 1, iso_now())
+                except sqlite3.Error as e:
+                    log(f"❌ Error updating prior {archetype}/{arm}: {e}")
+                    results.append({"armId": arm, "status": "error"})
+                    continue
+                self.outcomes_applied += 1
+                results.append({"armId": arm, "status": "success"})
+            if self.config.rate_limit:
+                if not await self.db(self.store.log_contribution, user_hash, archetype, time.time()):
+                    self.duplicate_sessions += 1
+
+        # Fire-and-forget, like `supabase.rpc('clean_old_contributions').then(...)`
+        task = asyncio.create_task(self.db(self.store.clean_old_contributions, time.time()))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return 200, {"success": True, "results": results,
+                     "message": f"Processed {len(results)} outcomes for {archetype}"}
+
+    async def fetch(self, query):
+        archetype = query.get("archetype", [None])[0]
+        if not archetype or archetype not in ARCHETYPES:
+            return 400, {"error": "Invalid or missing archetype parameter", "validArchetypes": list(ARCHETYPES)}
+        priors = {}
+        latest = None
+        for arm, alpha, beta, sample_count, updated in await self.db(self.store.fetch, archetype):
+            priors[arm] = {"alpha": alpha, "beta": beta, "sampleCount": sample_count}
+            if latest is None or (updated and updated > latest):
+                latest = updated
+        return 200, {"archetype": archetype, "priors": priors, "lastUpdated": latest, "armCount": len(priors)}
+
+    def stats(self):
+        return {
+            "syncMode": self.config.sync_mode,
+            "dbRttMs": self.config.db_rtt,
+            "rateLimit": self.config.rate_limit,
+            "minSamples": self.config.min_samples,
+            "connections": self.connections,
+            "responses": dict(self.responses),
+            "statements": dict(self.store.statements),
+            "transactions": self.store.transactions,
+            "rowsWritten": self.store.rows_written,
+            "outcomesApplied": self.outcomes_applied,
+            "sampleCountAdded": self.store.sample_count_total() - self._sample_count_at_start,
+            "duplicateSessions": self.duplicate_sessions,
+        }
+
+    async def dispatch(self, method, target, body):
+        """(status, JSON payload or text, extra headers) for one request."""
+        url = urlsplit(target)
+        route = url.path.rstrip("/").rsplit("/", 1)[-1]
+        if route not in (SYNC_ROUTE, FETCH_ROUTE, STATS_ROUTE):
+            return 404, {"error": "Not found"}, {}
+        if method == "OPTIONS":
+            return 200, "ok", {}
+        if route == STATS_ROUTE:
+            return 200, self.stats(), {}
+        expected = "POST" if route == SYNC_ROUTE else "GET"
+        if method != expected:
+            return 405, {"error": "Method not allowed"}, {}
+
+        try:
+            if route == SYNC_ROUTE:
+                status, payload = await self.sync(json.loads(body))
+                return status, payload, {}
+            status, payload = await self.fetch(parse_qs(url.query))
+            # Cache for 5 minutes
+            return status, payload, {"Cache-Control": "public, max-age=300"} if status == 200 else {}
+        except Exception as e:
+            log(f"❌ {route} failed: {type(e).__name__}: {e}")
+            return 500, {"error": str(e) or "Unknown error"}, {}
+
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if "transfer-encoding" in headers or length > MAX_BODY_BYTES:
+                    status, payload, extra = 411 if "transfer-encoding" in headers else 413, {"error": "Bad body"}, {}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload, extra = await self.dispatch(method, target, body)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self.responses[f"{urlsplit(target).path.rsplit('/', 1)[-1]} {status}"] += 1
+
+                if isinstance(payload, str):
+                    data, content_type = payload.encode(), "text/plain"
+                else:
+                    data, content_type = json.dumps(payload).encode(), "application/json"
+                response_headers = {**CORS_HEADERS, "Content-Type": content_type, **extra,
+                                    "Content-Length": str(len(data)),
+                                    "Connection": "keep-alive" if keep_alive else "close"}
+                writer.write(f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n".encode()
+                             + "".join(f"{k}: {v}\r\n" for k, v in response_headers.items()).encode()
+                             + b"\r\n" + data)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=1024)
+        if not self.port:
+            # Port 0 asks the OS for a free port
+            self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for task in list(self._background):
+            await task
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local population-learning edge function stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--db", default=":memory:", help="SQLite database path (created and seeded if new)")
+    parser.add_argument("--db-rtt", type=float, default=1.0, help="ms per supabase-js call to PostgREST")
+    parser.add_argument("--jitter", type=float, default=0.25, help="+/- ms applied to each half round trip")
+    parser.add_argument("--sync-mode", choices=["faithful", "rpc"], default="faithful",
+                        help="the function's per-outcome statements, or one transaction per request")
+    parser.add_argument("--min-samples", type=int, default=0,
+                        help=f"reject sessions with fewer valid outcomes (the function declares "
+                             f"{MIN_SAMPLES_THRESHOLD} but does not enforce it)")
+    parser.add_argument("--no-rate-limit", action="store_true",
+                        help="skip the contribution_log check and insert, to load the prior writes alone")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    config = StandInConfig(db_rtt=args.db_rtt, jitter=args.jitter, sync_mode=args.sync_mode,
+                           min_samples=args.min_samples, rate_limit=not args.no_rate_limit, seed=args.seed)
+    store = PriorStore(args.db, load_seed_priors())
+    async with StandInServer(config, store, args.host, args.port) as server:
+        log(f"🧮 Stand-in population learning functions on {server.url}/functions/v1/ "
+            f"({config.sync_mode}, {config.db_rtt:g}ms per DB call, db {args.db})")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Seamless loop extraction for looping sound assets (ambience, clockwork)
+
+Finds the loop length at which the track best repeats itself and cuts one
+period out of it, so a few seconds ship instead of a multi-minute render:
+
+1. A coarse spectral envelope (8 log-spaced bands per 10 ms frame) is built
+   chunk by chunk; only one chunk is ever converted to float32, so a 5-minute
+   track is never held as floats all at once.
+2. FFT autocorrelation of the envelope scores every candidate loop length
+   between min_s and max_s. Among local peaks, the shortest one scoring within
+   PREFER_SHORT of the best is chosen, since shorter loops are cheaper to ship.
+3. The length is refined to the sample with an FFT cross-correlation of the raw
+   PCM around the seam, and both cut points are moved to rising zero crossings.
+4. The last crossfade_ms of the loop is blended (equal power) with the audio
+   just before the loop start, so playback wraps from end to start without a
+   step.
+
+The loop is written as WAV (or MP3 via sound_optimize.encode_mp3; ffmpeg writes
+the LAME header with encoder delay/padding, which gapless players honour),
+with the loop points as JSON metadata next to it.
+
+Usage:
+    python3 scripts/sound_loops.py assets/sounds/ambience.mp3 --out ambience_loop.wav --min-s 10 --max-s 60
+    python3 scripts/fetch_sounds.py --optimise   # loops every sound with a "loop" entry
+"""
+
+import argparse
+import json
+import os
+import wave
+
+import numpy as np
+
+from sound_optimize import analyse, decode_pcm, encode_mp3
+
+FRAME_MS = 10
+BANDS = 8
+# PCM converted to float per envelope chunk
+CHUNK_S = 20
+# Take the shortest loop scoring at least this fraction of the best one
+PREFER_SHORT = 0.97
+# Raw PCM compared across the seam when refining the length (capped at one loop)
+REFINE_MS = 1000
+# How far the loop end may move to reach a zero crossing; the start moves freely
+END_SNAP_MS = 2
+CROSSFADE_MS = 50
+# Start the loop this far into the sound, clear of any attack or fade-in
+LEAD_IN_S = 0.5
+
+
+def spectral_envelope(samples, rate, frame_ms=FRAME_MS, bands=BANDS, chunk_s=CHUNK_S):
+    """Log band energies per frame, shape (frames, bands), computed chunk by chunk."""
+    n = rate * frame_ms // 1000
+    bins = n // 2 + 1
+    # Log-spaced band edges over the FFT bins, skipping DC
+    edges = np.unique(np.geomspace(1, bins, bands + 1).astype(int))
+    chunk = (rate * chunk_s // n) * n
+    out = []
+    for offset in range(0, len(samples) - n + 1, chunk):
+        block = samples[offset:offset + chunk]
+        count = len(block) // n
+        frames = block[:count * n].reshape(count, n).astype(np.float32) / 32768
+        power = np.abs(np.fft.rfft(frames * np.hanning(n).astype(np.float32), axis=1)) ** 2
+        energy = np.add.reduceat(power[:, 1:], edges[:-1] - 1, axis=1)
+        out.append(np.log10(energy + 1e-10).astype(np.float32))
+    return np.concatenate(out)
+
+
+def autocorrelation(features):
+    """Normalised, unbiased autocorrelation summed over feature columns."""
+    x = features - features.mean(axis=0)
+    length = len(x)
+    size = 1 << (2 * length - 1).bit_length()
+    spectrum = np.fft.rfft(x, size, axis=0)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), size, axis=0)[:length].sum(axis=1)
+    acf /= length - np.arange(length)
+    return acf / acf[0] if acf[0] else acf
+
+
+def pick_lag(acf, min_lag, max_lag):
+    """Shortest local ACF peak in [min_lag, max_lag] close to the best; returns (lag, score, top peaks)."""
+    lags = np.arange(max(1, min_lag), min(max_lag, len(acf) - 2) + 1)
+    if not lags.size:
+        return None, 0.0, []
+    values = acf[lags]
+    peaks = lags[(values >= acf[lags - 1]) & (values >= acf[lags + 1])]
+    if not peaks.size:
+        peaks = lags
+    best = acf[peaks].max()
+    lag = int(peaks[acf[peaks] >= PREFER_SHORT * best][0])
+    top = sorted(peaks, key=lambda p: -acf[p])[:3]
+    return lag, float(acf[lag]), [(int(p), float(acf[p])) for p in top]
+
+
+def refine_length(samples, start, length, search, window):
+    """Sample-accurate loop length near `length`, by FFT cross-correlation at the seam."""
+    ref = samples[start:start + window].astype(np.float32)
+    lo = start + length - search
+    region = samples[lo:lo + window + 2 * search].astype(np.float32)
+    if len(ref) < window or len(region) < window + 2 * search:
+        return length
+    size = 1 << (len(region) + window).bit_length()
+    xcorr = np.fft.irfft(np.fft.rfft(region, size) * np.conj(np.fft.rfft(ref, size)), size)
+    return length - search + int(np.argmax(xcorr[:2 * search + 1]))
+
+
+def nearest_rising_zero(samples, index, radius):
+    """Index of the rising zero crossing closest to `index`, or `index` if none is near."""
+    lo = max(1, index - radius)
+    window = samples[lo - 1:index + radius + 1].astype(np.int32)
+    crossings = np.flatnonzero((window[:-1] < 0) & (window[1:] >= 0)) + lo
+    if not crossings.size:
+        return index
+    return int(crossings[np.argmin(np.abs(crossings - index))])
+
+
+def find_loop(samples, rate, min_s, max_s, crossfade_ms=CROSSFADE_MS):
+    """Locate the best loop; returns (start, end, metadata) in samples."""
+    n = rate * FRAME_MS // 1000
+    acf = autocorrelation(spectral_envelope(samples, rate))
+    # At least two full periods must fit for the autocorrelation to mean anything
+    max_lag = min(int(max_s * 1000 / FRAME_MS), len(acf) // 2)
+    lag, score, top = pick_lag(acf, int(min_s * 1000 / FRAME_MS), max_lag)
+    if lag is None:
+        raise ValueError(f"sound too short for a {min_s}s+ loop ({len(samples) / rate:.1f}s)")
+
+    xfade = rate * crossfade_ms // 1000
+    # Lead-in silence sits at the front, so one chunk is enough to find it
+    active_start = analyse(samples[:rate * CHUNK_S], rate)["start"]
+    start = max(active_start + int(LEAD_IN_S * rate), xfade)
+    start = min(start, len(samples) - 2 * lag * n)
+    start = nearest_rising_zero(samples, max(start, xfade), n)
+
+    window = min(rate * REFINE_MS // 1000, lag * n)
+    length = refine_length(samples, start, lag * n, search=n, window=window)
+    end = nearest_rising_zero(samples, start + length, rate * END_SNAP_MS // 1000)
+    return start, end, {
+        "sample_rate": rate,
+        "loop_start_s": round(start / rate, 4),
+        "loop_length_s": round((end - start) / rate, 4),
+        "loop_samples": end - start,
+        "score": round(score, 4),
+        "candidates_s": [(round(p * FRAME_MS / 1000, 2), round(s, 4)) for p, s in top],
+        "crossfade_ms": crossfade_ms,
+    }
+
+
+def render_loop(samples, start, end, crossfade):
+    """Cut samples[start:end] and blend its tail into the audio preceding start."""
+    loop = samples[start:end].astype(np.float32)
+    crossfade = min(crossfade, start, len(loop))
+    if crossfade:
+        t = np.linspace(0.0, np.pi / 2, crossfade, dtype=np.float32)
+        loop[-crossfade:] = loop[-crossfade:] * np.cos(t) + samples[start - crossfade:start] * np.sin(t)
+    return np.clip(np.rint(loop), -32768, 32767).astype(np.int16)
+
+
+def write_wav(samples, rate, path):
+    tmp_path = f"{path}.tmp"
+    with wave.open(tmp_path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+    os.replace(tmp_path, path)
+
+
+def extract_loop(src, dst, min_s=2.0, max_s=30.0, crossfade_ms=CROSSFADE_MS, bitrate_kbps=96):
+    """Write a seamless loop of `src` to `dst` (.wav or .mp3) plus dst + ".json"; returns the metadata."""
+    samples, rate = decode_pcm(src)
+    start, end, meta = find_loop(samples, rate, min_s, max_s, crossfade_ms)
+    loop = render_loop(samples, start, end, rate * crossfade_ms // 1000)
+    if dst.endswith(".mp3"):
+        encode_mp3(loop, rate, bitrate_kbps, dst)
+    else:
+        write_wav(loop, rate, dst)
+
+    meta = dict(meta, source=os.path.basename(src), source_s=round(len(samples) / rate, 2),
+                bytes=os.path.getsize(dst))
+    with open(f"{dst}.json", "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract a seamless loop from a long ambient render")
+    parser.add_argument("src")
+    parser.add_argument("--out", help="loop file (.wav or .mp3), default: <src>_loop.wav")
+    parser.add_argument("--min-s", type=float, default=2.0, help="shortest loop to consider")
+    parser.add_argument("--max-s", type=float, default=30.0, help="longest loop to consider")
+    parser.add_argument("--crossfade-ms", type=int, default=CROSSFADE_MS)
+    parser.add_argument("--bitrate", type=int, default=96, help="kbps when writing .mp3")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    dst = args.out or f"{os.path.splitext(args.src)[0]}_loop.wav"
+    meta = extract_loop(args.src, dst, args.min_s, args.max_s, args.crossfade_ms, args.bitrate)
+    print(f"Loop: {meta['loop_length_s']:.3f}s from {meta['loop_start_s']:.3f}s "
+          f"(score {meta['score']:.3f}) of {meta['source_s']:.1f}s -> {dst} ({meta['bytes'] / 1024:.0f}K)")
+    print("Candidates: " + ", ".join(f"{lag}s ({score:.3f})" for lag, score in meta["candidates_s"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Sound asset optimisation: trim, normalise and re-encode to a bundle-size budget
+
+Each asset is decoded to mono 16-bit PCM and analysed in 10 ms frames with
+vectorised NumPy: leading/trailing silence below --silence-db is trimmed, the
+result is cut to the sound's max_duration from fetch_sounds.SOUNDS (with a short
+fade so the cut doesn't click), and its active-frame RMS level is normalised to
+--target-db without letting the peak exceed -1 dBFS.
+
+Bitrates are then allocated from the MP3 ladder so the total fits the budget:
+every asset starts at 128 kbps and the asset currently spending the most bytes
+steps down until the estimate fits, so long loops give up quality before short
+effects do.
+
+Decoding and encoding use ffmpeg ($FFMPEG); WAV input is decoded directly.
+
+Run on its own, it re-encodes every asset from the pristine downloads that
+fetch_sounds.py --optimise keeps in .cache/fetch_sounds_sources (refusing to
+run if any are missing) and records the new hashes, settings and bitrates in
+assets/sounds.lock.json.
+
+Usage:
+    python3 scripts/sound_optimize.py --budget-kb 400
+    python3 scripts/sound_optimize.py --budget-kb 300 --dry-run
+    python3 scripts/fetch_sounds.py --optimise --budget-kb 400
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+FFMPEG = os.environ.get("FFMPEG", "ffmpeg")
+
+SAMPLE_RATE = 44100
+FRAME_MS = 10
+SILENCE_DB = -50.0
+TARGET_DB = -18.0
+PEAK_CEILING_DB = -1.0
+# Kept either side of the detected sound so attacks and tails aren't clipped
+PAD_MS = 30
+FADE_IN_MS = 5
+FADE_OUT_MS = 50
+MP3_BITRATES = (32, 40, 48, 56, 64, 80, 96, 112, 128)
+DEFAULT_BUDGET_KB = 400
+
+
+def decode_pcm(path, rate=SAMPLE_RATE):
+    """Decode any audio file to mono int16 samples; returns (samples, rate)."""
+    with open(path, "rb") as f:
+        is_wav = f.read(4) == b"RIFF"
+    if is_wav:
+        with wave.open(path, "rb") as w:
+            if w.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit WAV is supported")
+            channels = w.getnchannels()
+            samples = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+            return samples, w.getframerate()
+
+    cmd = [FFMPEG, "-v", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(rate), "-"]
+    result = subprocess.run(cmd, capture_output=True, check=True)
+    return np.frombuffer(result.stdout, dtype="<i2"), rate
+
+
+def frame_levels(samples, rate, frame_ms=FRAME_MS):
+    """RMS level of each full frame in dBFS."""
+    n = rate * frame_ms // 1000
+    count = len(samples) // n
+    frames = samples[:count * n].reshape(count, n).astype(np.float32) / 32768
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def analyse(samples, rate, silence_db=SILENCE_DB, frame_ms=FRAME_MS):
+    """Find the non-silent region and its loudness.
+
+    Returns a dict with start/end sample offsets, active RMS level and peak in dBFS.
+    """
+    n = rate * frame_ms // 1000
+    levels = frame_levels(samples, rate, frame_ms)
+    active = np.flatnonzero(levels > silence_db)
+    if not active.size:
+        return {"start": 0, "end": 0, "rms_db": -np.inf, "peak_db": -np.inf}
+
+    pad = rate * PAD_MS // 1000
+    start = max(0, int(active[0]) * n - pad)
+    end = min(len(samples), (int(active[-1]) + 1) * n + pad)
+    # Power mean over active frames only, so trailing silence doesn't drag it down
+    rms_db = 10 * np.log10(np.mean(10 ** (levels[active] / 10)))
+    peak = np.max(np.abs(samples[start:end].astype(np.int32))) / 32768
+    return {"start": start, "end": end, "rms_db": float(rms_db),
+            "peak_db": float(20 * np.log10(max(peak, 1e-10)))}
+
+
+def process(samples, rate, max_duration, silence_db=SILENCE_DB, target_db=TARGET_DB, trim=True):
+    """Trim silence, cut to max_duration, fade the cut edges and normalise.
+
+    With trim=False (seamless loops) the samples are only normalised.
+    Returns (int16 samples, report dict).
+    """
+    info = analyse(samples, rate, silence_db)
+    start, end = (info["start"], info["end"]) if trim else (0, len(samples))
+    end = min(end, start + int(max_duration * rate))
+    out = samples[start:end].astype(np.float32)
+
+    gain_db = 0.0
+    if out.size:
+        gain_db = min(target_db - info["rms_db"], PEAK_CEILING_DB - info["peak_db"])
+        out *= 10 ** (gain_db / 20)
+        if start > 0:
+            fade = min(out.size, rate * FADE_IN_MS // 1000)
+            out[:fade] *= np.linspace(0.0, 1.0, fade, dtype=np.float32)
+        if end < len(samples):
+            fade = min(out.size, rate * FADE_OUT_MS // 1000)
+            out[-fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)
+
+    report = {
+        "duration_in_s": len(samples) / rate,
+        "duration_out_s": out.size / rate,
+        "lead_trim_s": start / rate,
+        "tail_trim_s": (len(samples) - end) / rate,
+        "rms_db": info["rms_db"],
+        "gain_db": gain_db,
+    }
+    return np.clip(np.rint(out), -32768, 32767).astype(np.int16), report
+
+
+def allocate_bitrates(durations, budget_bytes, ladder=MP3_BITRATES):
+    """Pick a ladder bitrate (kbps) per asset so the estimated total fits budget_bytes.
+
+    Returns ({name: kbps}, estimated total bytes). If even the lowest rung is
+    over budget, every asset gets the lowest rung.
+    """
+    steps = {name: len(ladder) - 1 for name in durations}
+
+    def size(name):
+        return ladder[steps[name]] * 1000 / 8 * durations[name]
+
+    total = sum(size(name) for name in durations)
+    while total > budget_bytes:
+        reducible = [name for name in durations if steps[name] > 0]
+        if not reducible:
+            break
+        name = max(reducible, key=size)
+        total -= size(name)
+        steps[name] -= 1
+        total += size(name)
+    return {name: ladder[step] for name, step in steps.items()}, total
+
+
+def encode_mp3(samples, rate, bitrate_kbps, path):
+    """Encode mono int16 samples to MP3, writing through a temp file next to `path`."""
+    directory, filename = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{filename}.encode.mp3")
+    cmd = [FFMPEG, "-v", "error", "-y", "-f", "s16le", "-ar", str(rate), "-ac", "1", "-i", "-",
+           "-codec:a", "libmp3lame", "-b:a", f"{bitrate_kbps}k", tmp_path]
+    try:
+        subprocess.run(cmd, input=samples.tobytes(), check=True)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return os.path.getsize(path)
+
+
+def optimise(jobs, budget_bytes, silence_db=SILENCE_DB, target_db=TARGET_DB, dry_run=False, workers=4):
+    """Trim, normalise and re-encode jobs to fit budget_bytes in total.
+
+    Each job is a dict with name, src, dst, max_duration and optionally
+    trim=False. Returns one report row per job with the chosen bitrate and sizes.
+    """
+    def prepare(job):
+        # Sized before encoding, since src and dst may be the same file
+        src_bytes = os.path.getsize(job["src"])
+        samples, rate = decode_pcm(job["src"])
+        out, report = process(samples, rate, job["max_duration"], silence_db, target_db,
+                              job.get("trim", True))
+        report["src_bytes"] = src_bytes
+        return out, rate, report
+
+    with ThreadPoolExecutor(workers) as pool:
+        prepared = list(pool.map(prepare, jobs))
+
+        durations = {job["name"]: report["duration_out_s"] for job, (_, _, report) in zip(jobs, prepared)}
+        bitrates, _ = allocate_bitrates(durations, budget_bytes)
+
+        def encode(item):
+            job, (out, rate, _) = item
+            if dry_run:
+                return None
+            return encode_mp3(out, rate, bitrates[job["name"]], job["dst"])
+
+        sizes = list(pool.map(encode, zip(jobs, prepared)))
+
+    rows = []
+    for job, (_, _, report), out_bytes in zip(jobs, prepared, sizes):
+        bitrate = bitrates[job["name"]]
+        rows.append(dict(report, name=job["name"], bitrate_kbps=bitrate,
+                         est_bytes=int(bitrate * 1000 / 8 * report["duration_out_s"]),
+                         out_bytes=out_bytes))
+    return rows
+
+
+def print_report(rows, budget_bytes, log=print):
+    log(f"\n{'FILE':<15} {'IN':>7} {'OUT':>7} {'LEAD':>6} {'TAIL':>7} {'GAIN':>7} {'KBPS':>5} "
+        f"{'BEFORE':>8} {'AFTER':>8}")
+    for r in rows:
+        after = r["out_bytes"] if r["out_bytes"] is not None else r["est_bytes"]
+        log(f"{r['name']:<15} {r['duration_in_s']:>6.1f}s {r['duration_out_s']:>6.1f}s "
+            f"{r['lead_trim_s']:>5.2f}s {r['tail_trim_s']:>6.1f}s {r['gain_db']:>+6.1f}dB "
+            f"{r['bitrate_kbps']:>5} {r['src_bytes'] / 1024:>7.0f}K {after / 1024:>7.0f}K")
+    before = sum(r["src_bytes"] for r in rows)
+    after = sum(r["out_bytes"] if r["out_bytes"] is not None else r["est_bytes"] for r in rows)
+    estimated = " (estimated)" if any(r["out_bytes"] is None for r in rows) else ""
+    log(f"Total: {before / 1024:.0f}K -> {after / 1024:.0f}K{estimated}, budget {budget_bytes / 1024:.0f}K")
+    if after > budget_bytes and all(r["bitrate_kbps"] == MP3_BITRATES[0] for r in rows):
+        log(f"⚠️ Over budget even at {MP3_BITRATES[0]} kbps; shorten max_duration or raise the budget")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Trim, normalise and re-encode sound assets to a size budget")
+    parser.add_argument("--budget-kb", type=float, default=DEFAULT_BUDGET_KB, help="total size budget in KB")
+    parser.add_argument("--silence-db", type=float, default=SILENCE_DB, help="frames below this are silence")
+    parser.add_argument("--target-db", type=float, default=TARGET_DB, help="target RMS level of the sound")
+    parser.add_argument("--dry-run", action="store_true", help="analyse and plan bitrates without encoding")
+    return parser.parse_args()
+
+
+def main():
+    import fetch_sounds
+
+    args = parse_args()
+    # Re-encode from the pristine downloads recorded in the lockfile, never from the shipped
+    # (already lossy) assets, and record the results so --verify and --optimise stay in step
+    fetch_sounds.ASSET_LOCK = fetch_sounds.AssetLock()
+    fetch_sounds.POSTPROCESS = {"budget_kb": args.budget_kb, "silence_db": args.silence_db,
+                                "target_db": args.target_db}
+    missing = []
+    for sound in fetch_sounds.SOUNDS:
+        entry = fetch_sounds.ASSET_LOCK.entries.get(sound["file"])
+        if entry is None:
+            missing.append(f"{sound['file']}: not in {fetch_sounds.LOCK_PATH}")
+            continue
+        src = os.path.join(fetch_sounds.SOURCES_DIR, f"{entry['video_id']}{os.path.splitext(sound['file'])[1]}")
+        if not os.path.exists(src):
+            missing.append(f"{sound['file']}: no pristine source at {src}")
+            continue
+        candidate = {"id": entry["video_id"], "webpage_url": entry.get("url"), "title": entry.get("title"),
+                     "channel": entry.get("channel")}
+        fetch_sounds.PENDING_OPTIMISE.append((sound, candidate, src))
+    if missing:
+        for line in missing:
+            print(f"❌ {line}")
+        print("Run python3 scripts/fetch_sounds.py --optimise to download the sources")
+        sys.exit(1)
+
+    start = time.monotonic()
+    fetch_sounds.optimise_pending(args.budget_kb, args.dry_run)
+    if not args.dry_run:
+        fetch_sounds.ASSET_LOCK.save()
+        print(f"💾 Updated {fetch_sounds.LOCK_PATH}")
+    print(f"Optimised {len(fetch_sounds.SOUNDS)} assets in {time.monotonic() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for doc_refs.py
+
+Compound identifier expansion, section ranges, the whole-identifier match that
+ranks a defining heading first, and context() around a mention.
+
+Usage:
+    python3 -m pytest -q scripts/test_doc_refs.py
+"""
+
+import pytest
+
+from doc_refs import DocRefIndex, expand_ref, find_refs, scan_file
+
+
+@pytest.mark.parametrize("suffix, expected", [
+    ("", ["RQ-048"]),
+    ("a/b", ["RQ-048a", "RQ-048b", "RQ-048"]),
+    ("cdf", ["RQ-048c", "RQ-048d", "RQ-048f", "RQ-048"]),
+    ("ab/c", ["RQ-048a", "RQ-048b", "RQ-048c", "RQ-048"]),
+])
+def test_expand_ref(suffix, expected):
+    assert expand_ref("RQ", "048", suffix) == expected
+
+
+def test_find_refs_keeps_identifiers_as_written():
+    text = "See RQ-048a/b, CD-015 and PD-116; again RQ-048a. Not XRQ-001 or RQ-."
+    assert find_refs(text) == ["RQ-048a", "RQ-048b", "CD-015", "PD-116"]
+    assert find_refs(b"RQ-010cdf") == ["RQ-010c", "RQ-010d", "RQ-010f"]
+
+
+def test_scan_file_sections_end_at_same_or_higher_heading():
+    raw = (b"intro RQ-001\n"
+           b"# Title\n"
+           b"## A\nRQ-002\n"
+           b"```\n## not a heading RQ-003\n```\n"
+           b"### A.1\nRQ-002\n"
+           b"## B\nRQ-004\n")
+    sections, mentions = scan_file(raw)
+    assert [s[3] for s in sections] == ["Title", "A", "A.1", "B"]
+    title, a, a1, b = sections
+    assert (title[0], title[1]) == (raw.index(b"# Title"), len(raw))
+    assert (a[0], a[1]) == (raw.index(b"## A"), raw.index(b"## B"))
+    assert (a1[0], a1[1]) == (raw.index(b"### A.1"), raw.index(b"## B"))
+    assert [(ref_id, section) for ref_id, section, _ in mentions] == [
+        ("RQ-001", -1), ("RQ-002", 1), ("RQ-003", 1), ("RQ-002", 2), ("RQ-004", 3)]
+
+
+@pytest.fixture
+def index(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "questions.md").write_text(
+        "# Questions\n"
+        "## RQ-0190 Follow-up\nBuilds on RQ-019.\n"
+        "## RQ-019a Sub-question\nNarrows RQ-019.\n"
+        "## Notes on PRE-RQ-019\nMentions RQ-019 in passing.\n"
+        "## RQ-019: Embedding model\nDefines RQ-019.\n")
+    before = "".join(f"Before {i}: background that does not mention anything.\n" for i in range(40))
+    after = "".join(f"After {i}: consequences that do not mention anything.\n" for i in range(40))
+    (docs / "long.md").write_text("# Long\n## Background\n" + before + "The decision in RQ-019 follows here.\n" + after)
+    return DocRefIndex.load(docs, tmp_path / "index.json")
+
+
+def test_lookup_ranks_only_whole_identifier_heading_first(index):
+    refs = [ref for ref in index.lookup("rq-019") if ref.path == "questions.md"]
+    assert [ref.heading for ref in refs] == [
+        "RQ-019: Embedding model", "RQ-0190 Follow-up", "RQ-019a Sub-question", "Notes on PRE-RQ-019"]
+    assert refs[0].rank < refs[1].rank == refs[2].rank == refs[3].rank
+
+
+def test_context_is_around_the_mention(index):
+    ref = next(ref for ref in index.lookup("RQ-019") if ref.path == "long.md")
+    text = index.context(ref, 300)
+    assert "The decision in RQ-019 follows here." in text
+    assert len(text) <= 300
+    # Starts on a whole line shortly before the mention, not at the top of the section
+    assert text.startswith("Before ") and "Before 0:" not in text
+
+
+def test_context_of_a_heading_mention_starts_at_the_body(index):
+    ref = next(ref for ref in index.lookup("RQ-019") if ref.heading == "RQ-019: Embedding model")
+    assert index.context(ref, 100) == "Defines RQ-019."
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Resume tests for embedding_backfill.py
+
+An interrupted JSONL backfill that is resumed from its checkpoint must produce
+the same output, byte for byte, as one uninterrupted run, and a resume must
+refuse an output file that no longer holds what the checkpoint vouches for.
+
+Usage:
+    python3 -m pytest -q scripts/test_embedding_backfill.py
+"""
+
+import json
+import threading
+
+import pytest
+
+from embedding_backfill import Checkpoint, HashEmbedder, JsonlSink, JsonlSource, backfill
+
+TABLE = "evidence_logs"
+DIM = 32
+ROWS = 250
+BATCH_SIZE = 20
+
+
+class FailingEmbedder(HashEmbedder):
+    """HashEmbedder that raises on every call after the first `calls`, as a dropped connection would."""
+
+    def __init__(self, calls):
+        super().__init__(DIM)
+        self.calls = calls
+        self.lock = threading.Lock()
+
+    def embed(self, texts):
+        with self.lock:
+            self.calls -= 1
+            if self.calls < 0:
+                raise RuntimeError("embedding call failed")
+        return super().embed(texts)
+
+
+@pytest.fixture
+def export(tmp_path):
+    """A JSONL export with some rows already embedded and a blank line, which the source skips."""
+    path = tmp_path / "evidence_logs.jsonl"
+    lines = []
+    for i in range(ROWS):
+        row = {"id": f"00000000-0000-0000-0000-{i:012d}", "event_type": "habit_completed",
+               "payload": {"habit_id": f"habit-{i % 7}", "emotion": "proud" if i % 3 else "tired",
+                           "engaged": i % 2 == 0}}
+        if i % 11 == 0:
+            row["embedding"] = "[0.1,0.2]"
+        lines.append(json.dumps(row))
+        if i == ROWS // 2:
+            lines.append("")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def run(source, out, checkpoint_path, embedder, resume=False):
+    checkpoint = Checkpoint(checkpoint_path, TABLE, source.describe())
+    if resume:
+        checkpoint.load()
+    sink = JsonlSink(out, checkpoint.sink_position)
+    try:
+        backfill(TABLE, source, embedder, sink, checkpoint, batch_size=BATCH_SIZE, workers=3, max_in_flight=2,
+                 dim=DIM, progress_every=0, log=lambda *args: None)
+    finally:
+        sink.close()
+    return checkpoint
+
+
+def interrupted_run(source, out, checkpoint_path):
+    with pytest.raises(RuntimeError):
+        run(source, out, checkpoint_path, FailingEmbedder(calls=4))
+    checkpoint = Checkpoint(checkpoint_path, TABLE, source.describe()).load()
+    assert 0 < checkpoint.rows < ROWS
+    assert checkpoint.sink_position == out.stat().st_size
+    return checkpoint
+
+
+def test_resumed_backfill_matches_uninterrupted_run(export, tmp_path):
+    source = JsonlSource(export)
+    full = run(source, tmp_path / "full.jsonl", tmp_path / "full.json", HashEmbedder(DIM))
+    embedded = sum(1 for line in export.read_text().splitlines() if line and "embedding" not in json.loads(line))
+    assert full.rows == embedded
+
+    out = tmp_path / "resumed.jsonl"
+    checkpoint_path = tmp_path / "resumed.json"
+    interrupted_run(source, out, checkpoint_path)
+    # A crash between the sink write and the checkpoint save leaves a torn batch behind
+    with open(out, "ab") as f:
+        f.write(b'{"id": "00000000-0000-0000-0000-0000000000')
+
+    resumed = run(source, out, checkpoint_path, HashEmbedder(DIM), resume=True)
+    assert resumed.rows == full.rows
+    assert out.read_bytes() == (tmp_path / "full.jsonl").read_bytes()
+
+
+@pytest.mark.parametrize("damage", ["missing", "shorter"])
+def test_resume_refuses_output_behind_checkpoint(export, tmp_path, damage):
+    source = JsonlSource(export)
+    out = tmp_path / "out.jsonl"
+    checkpoint = interrupted_run(source, out, tmp_path / "checkpoint.json")
+    if damage == "missing":
+        out.unlink()
+    else:
+        with open(out, "r+b") as f:
+            f.truncate(checkpoint.sink_position - 1)
+    size = out.stat().st_size if out.exists() else None
+
+    with pytest.raises(SystemExit, match="--restart"):
+        JsonlSink(out, checkpoint.sink_position)
+    assert (out.stat().st_size if out.exists() else None) == size
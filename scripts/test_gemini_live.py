@@ -12,14 +12,22 @@ Usage:
 Or set environment variable:
     export GEMINI_API_KEY=your_key
     python3 test_gemini_live.py
+
+Concurrent sweep (every model x voice x config at once):
+    python3 test_gemini_live.py --concurrent --max-concurrency 8 --rate 4
+
+Against the local stand-in server (no network or key needed):
+    python3 test_gemini_live.py --endpoint ws://127.0.0.1:8765
 """
 
+import argparse
 import asyncio
-import json
+import itertools
 import os
 import sys
 import time
 from datetime import datetime
+from urllib.parse import urlparse
 
 try:
     import websockets
@@ -28,6 +36,9 @@ except ImportError:
     os.system("pip3 install websockets")
     import websockets
 
+import gemini_live_codec as codec
+from gemini_live_spans import CONNECT, SEND_SETUP, SETUP_COMPLETE, TRACER, print_summary
+
 # Model names to test
 MODELS_TO_TEST = [
     # From Google AI Studio rate limits (user's actual quota)
@@ -38,6 +49,14 @@ MODELS_TO_TEST = [
     "gemini-2.5-flash-native-audio-preview-09-2025",
 ]
 
+# Voices and generation configs swept by --concurrent
+VOICES_TO_TEST = ["Kore", "Puck", "Charon"]
+
+CONFIGS_TO_TEST = {
+    "audio": {"responseModalities": ["AUDIO"]},
+    "text": {"responseModalities": ["TEXT"]},
+}
+
 # WebSocket endpoint
 WS_ENDPOINT = "wss://generativelanguage.googleapis.com/ws/google.ai.generativelanguage.v1beta.GenerativeService.BidiGenerateContent"
 
@@ -45,84 +64,209 @@ def log(msg):
     timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
     print(f"[{timestamp}] {msg}")
 
-async def test_model(api_key: str, model_name: str, timeout: int = 15):
-    """Test a single model name"""
-    log(f"\n{'='*60}")
-    log(f"TESTING MODEL: {model_name}")
-    log(f"{'='*60}")
-    
-    url = f"{WS_ENDPOINT}?key={api_key}"
-    log(f"URL: {WS_ENDPOINT}?key=***MASKED***")
-    
-    # Minimal setup message (only required fields)
-    setup_message = {
-        "setup": {
-            "model": f"models/{model_name}",
-            "generationConfig": {
-                "responseModalities": ["AUDIO"],
-                "speechConfig": {
-                    "voiceConfig": {
-                        "prebuiltVoiceConfig": {
-                            "voiceName": "Kore"
-                        }
-                    }
+def build_setup_message(model_name: str, voice: str = "Kore", config: dict = None):
+    """Minimal setup message (only required fields)"""
+    generation_config = {
+        "responseModalities": ["AUDIO"],
+        "speechConfig": {
+            "voiceConfig": {
+                "prebuiltVoiceConfig": {
+                    "voiceName": voice
                 }
             }
         }
     }
+    if config:
+        generation_config.update(config)
+    return {
+        "setup": {
+            "model": f"models/{model_name}",
+            "generationConfig": generation_config
+        }
+    }
+
+async def test_model(api_key: str, model_name: str, timeout: int = 15,
+                     voice: str = "Kore", config: dict = None, quiet: bool = False,
+                     endpoint: str = WS_ENDPOINT):
+    """Test a single model name
+
+    Returns (success, model_name, error, setup_ms). setup_ms is the time from
+    opening the socket to the first server response, or None if none arrived.
+    """
+    modalities = "+".join((config or {}).get("responseModalities", ["AUDIO"]))
+    with TRACER.session(f"{model_name}/{voice}/{modalities}"):
+        return await _probe_model(api_key, model_name, timeout, voice, config, quiet, endpoint)
+
+async def _probe_model(api_key, model_name, timeout, voice, config, quiet, endpoint):
+    # In concurrent mode only the summary table is printed
+    say = (lambda msg: None) if quiet else log
+
+    say(f"\n{'='*60}")
+    say(f"TESTING MODEL: {model_name}")
+    say(f"{'='*60}")
+    
+    url = f"{endpoint}?key={api_key}"
+    say(f"URL: {endpoint}?key=***MASKED***")
     
-    log(f"Setup message: {json.dumps(setup_message, indent=2)}")
+    setup_message = build_setup_message(model_name, voice, config)
     
-    start_time = time.time()
+    if not quiet:
+        say(f"Setup message: {codec.preview(setup_message)}")
+    
+    start_time = time.perf_counter()
     
     try:
-        log("Opening WebSocket connection...")
+        say("Opening WebSocket connection...")
         async with websockets.connect(url, close_timeout=5) as ws:
-            elapsed = (time.time() - start_time) * 1000
-            log(f"✅ WebSocket connected ({elapsed:.0f}ms)")
+            TRACER.event(CONNECT)
+            elapsed = (time.perf_counter() - start_time) * 1000
+            say(f"✅ WebSocket connected ({elapsed:.0f}ms)")
             
             # Send setup message
-            log("Sending setup message...")
-            await ws.send(json.dumps(setup_message))
-            log("Setup message sent, waiting for response...")
+            say("Sending setup message...")
+            TRACER.event(SEND_SETUP)
+            await ws.send(codec.dumps(setup_message))
+            say("Setup message sent, waiting for response...")
             
             # Wait for setupComplete
             try:
                 response = await asyncio.wait_for(ws.recv(), timeout=timeout)
-                elapsed = (time.time() - start_time) * 1000
+                elapsed = (time.perf_counter() - start_time) * 1000
                 
-                data = json.loads(response)
-                log(f"📨 Response received ({elapsed:.0f}ms)")
-                log(f"Response: {json.dumps(data, indent=2)[:500]}")
+                data = codec.loads(response)
+                say(f"📨 Response received ({elapsed:.0f}ms)")
+                if not quiet:
+                    say(f"Response: {codec.preview(data)}")
                 
                 if "setupComplete" in data:
-                    log(f"✅ SUCCESS! Model '{model_name}' works!")
-                    return True, model_name, None
+                    TRACER.event(SETUP_COMPLETE)
+                    say(f"✅ SUCCESS! Model '{model_name}' works!")
+                    return True, model_name, None, elapsed
                 elif "error" in data:
                     error_msg = data.get("error", {}).get("message", str(data))
-                    log(f"❌ Error from server: {error_msg}")
-                    return False, model_name, error_msg
+                    say(f"❌ Error from server: {error_msg}")
+                    return False, model_name, error_msg, elapsed
                 else:
-                    log(f"⚠️ Unexpected response: {data}")
-                    return False, model_name, f"Unexpected: {data}"
+                    say(f"⚠️ Unexpected response: {data}")
+                    return False, model_name, f"Unexpected: {data}", elapsed
                     
             except asyncio.TimeoutError:
-                elapsed = (time.time() - start_time) * 1000
-                log(f"❌ TIMEOUT after {elapsed:.0f}ms - no setupComplete received")
-                return False, model_name, "TIMEOUT - no setupComplete"
+                elapsed = (time.perf_counter() - start_time) * 1000
+                say(f"❌ TIMEOUT after {elapsed:.0f}ms - no setupComplete received")
+                return False, model_name, "TIMEOUT - no setupComplete", None
                 
     except websockets.exceptions.InvalidStatusCode as e:
-        log(f"❌ HTTP Error: {e.status_code}")
-        return False, model_name, f"HTTP {e.status_code}"
+        say(f"❌ HTTP Error: {e.status_code}")
+        return False, model_name, f"HTTP {e.status_code}", None
     except Exception as e:
-        log(f"❌ Connection error: {type(e).__name__}: {e}")
-        return False, model_name, str(e)
+        say(f"❌ Connection error: {type(e).__name__}: {e}")
+        return False, model_name, str(e), None
+
+class HostRateLimiter:
+    """Spaces out connection attempts to the same host.
+
+    At most `rate` new connections per second are opened against any one host;
+    different hosts are limited independently.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+async def run_concurrent(api_key: str, max_concurrency: int = 8, rate: float = 4.0,
+                         timeout: int = 15, models=None, voices=None, configs=None,
+                         endpoint: str = WS_ENDPOINT):
+    """Probe every model x voice x config combination concurrently.
+
+    A semaphore caps the number of sockets open at once and a per-host rate
+    limiter spaces out the handshakes, so the sweep takes roughly as long as
+    the slowest single probe. Returns result rows sorted by setup latency
+    (failures last).
+    """
+    models = models or MODELS_TO_TEST
+    voices = voices or VOICES_TO_TEST
+    configs = configs or CONFIGS_TO_TEST
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = HostRateLimiter(rate)
+
+    async def probe(model, voice, config_name):
+        async with semaphore:
+            await limiter.wait(endpoint)
+            success, name, error, setup_ms = await test_model(
+                api_key, model, timeout=timeout, voice=voice,
+                config=configs[config_name], quiet=True, endpoint=endpoint)
+        status = "✅" if success else "❌"
+        latency = f"{setup_ms:.0f}ms" if setup_ms is not None else "-"
+        log(f"{status} {model} / {voice} / {config_name}: {latency}")
+        return {
+            "model": name,
+            "voice": voice,
+            "config": config_name,
+            "success": success,
+            "error": error,
+            "setup_ms": setup_ms,
+        }
+
+    combos = list(itertools.product(models, voices, configs))
+    log(f"Probing {len(combos)} combinations "
+        f"(max {max_concurrency} concurrent, {rate:g} conn/s per host)...")
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(probe(*combo) for combo in combos))
+    elapsed = (time.perf_counter() - start_time) * 1000
+
+    results.sort(key=lambda r: (not r["success"],
+                                r["setup_ms"] if r["setup_ms"] is not None else float("inf")))
+    log(f"Sweep finished in {elapsed:.0f}ms")
+    return results
+
+def print_results_table(results):
+    """Print concurrent sweep results, fastest setup first."""
+    log(f"\n{'='*60}")
+    log("RESULTS (ordered by setup latency)")
+    log(f"{'='*60}")
+    width = max(len(r["model"]) for r in results)
+    log(f"  {'MODEL':<{width}}  {'VOICE':<8} {'CONFIG':<6} {'SETUP':>8}  STATUS")
+    for r in results:
+        latency = f"{r['setup_ms']:.0f}ms" if r["setup_ms"] is not None else "-"
+        status = "✅ WORKS" if r["success"] else f"❌ {r['error']}"
+        log(f"  {r['model']:<{width}}  {r['voice']:<8} {r['config']:<6} {latency:>8}  {status}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gemini Live API WebSocket test")
+    parser.add_argument("api_key", nargs="?", default=os.environ.get("GEMINI_API_KEY"),
+                        help="Gemini API key (default: $GEMINI_API_KEY)")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Probe every model x voice x config combination at once")
+    parser.add_argument("--max-concurrency", type=int, default=8,
+                        help="Maximum sockets open at once in --concurrent mode")
+    parser.add_argument("--rate", type=float, default=4.0,
+                        help="Maximum new connections per second per host (0 = unlimited)")
+    parser.add_argument("--timeout", type=int, default=15,
+                        help="Seconds to wait for setupComplete")
+    parser.add_argument("--endpoint", default=WS_ENDPOINT,
+                        help="WebSocket endpoint, e.g. ws://127.0.0.1:8765 for gemini_live_standin_server.py")
+    parser.add_argument("--chrome-trace", help="write Chrome trace-event JSON of every probe here")
+    return parser.parse_args()
 
 async def main():
-    # Get API key
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if len(sys.argv) > 1:
-        api_key = sys.argv[1]
+    args = parse_args()
+    api_key = args.api_key
+    if not api_key and args.endpoint != WS_ENDPOINT:
+        api_key = "local-stand-in"  # the stand-in server ignores the key
     
     if not api_key:
         print("Usage: python3 test_gemini_live.py <API_KEY>")
@@ -130,12 +274,22 @@ async def main():
         sys.exit(1)
     
     log(f"API Key: {api_key[:10]}...{api_key[-4:]}")
-    log(f"Endpoint: {WS_ENDPOINT}")
+    log(f"Endpoint: {args.endpoint}")
+    if args.chrome_trace:
+        TRACER.enable()
+
+    if args.concurrent:
+        rows = await run_concurrent(api_key, args.max_concurrency, args.rate, args.timeout,
+                                    endpoint=args.endpoint)
+        print_results_table(rows)
+        write_chrome_trace(args.chrome_trace)
+        return
     
     results = []
     
     for model in MODELS_TO_TEST:
-        success, name, error = await test_model(api_key, model)
+        success, name, error, _ = await test_model(api_key, model, timeout=args.timeout,
+                                                   endpoint=args.endpoint)
         results.append((success, name, error))
         await asyncio.sleep(1)  # Brief pause between tests
     
@@ -160,5 +314,14 @@ async def main():
         log("  2. Regional restriction")
         log("  3. All model names are wrong")
 
+    write_chrome_trace(args.chrome_trace)
+
+def write_chrome_trace(path):
+    if not path:
+        return
+    TRACER.write(path)
+    log(f"\n🧭 Chrome trace written to {path}")
+    print_summary(TRACER.summary(), log)
+
 if __name__ == "__main__":
     asyncio.run(main())
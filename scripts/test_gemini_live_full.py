@@ -4,10 +4,15 @@ Gemini Live API Full Test - Match Flutter Implementation Exactly
 Phase 34.4g: Diagnose why Flutter fails but Python works
 
 This script replicates the exact Flutter setup message to find the issue.
+
+Usage:
+    python3 test_gemini_live_full.py <API_KEY>
+    python3 test_gemini_live_full.py --endpoint ws://127.0.0.1:8765
+    python3 test_gemini_live_full.py <API_KEY> --trace session.gltr
 """
 
+import argparse
 import asyncio
-import json
 import os
 import sys
 import time
@@ -15,6 +20,10 @@ from datetime import datetime
 
 import websockets
 
+import gemini_live_codec as codec
+from gemini_live_spans import (CONNECT, FIRST_AUDIO, FIRST_SERVER_CONTENT, SEND_SETUP, SEND_TURN,
+                               SETUP_COMPLETE, TRACER, print_summary)
+
 MODEL = "gemini-2.5-flash-native-audio-preview-12-2025"
 WS_ENDPOINT = "wss://generativelanguage.googleapis.com/ws/google.ai.generativelanguage.v1beta.GenerativeService.BidiGenerateContent"
 
@@ -35,18 +44,11 @@ def log(msg):
     timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
     print(f"[{timestamp}] {msg}")
 
-async def test_with_system_instruction(api_key: str):
-    """Test with the exact Flutter setup message including systemInstruction"""
-    log(f"\n{'='*60}")
-    log(f"TESTING WITH SYSTEM INSTRUCTION")
-    log(f"{'='*60}")
-    
-    url = f"{WS_ENDPOINT}?key={api_key}"
-    
-    # Exact Flutter setup message
-    setup_message = {
+def build_flutter_setup_message(model: str = MODEL, instruction: str = SYSTEM_INSTRUCTION):
+    """Exact Flutter setup message"""
+    return {
         "setup": {
-            "model": f"models/{MODEL}",
+            "model": f"models/{model}",
             "generationConfig": {
                 "responseModalities": ["AUDIO"],
                 "speechConfig": {
@@ -58,10 +60,35 @@ async def test_with_system_instruction(api_key: str):
                 }
             },
             "systemInstruction": {
-                "parts": [{"text": SYSTEM_INSTRUCTION}]
+                "parts": [{"text": instruction}]
             }
         }
     }
+
+# Text turn sent after setup by the load and pool scripts
+TURN_MESSAGE = {
+    "clientContent": {
+        "turns": [{
+            "role": "user",
+            "parts": [{"text": "Hello, I want to build a habit"}]
+        }],
+        "turnComplete": True
+    }
+}
+
+async def test_with_system_instruction(api_key: str, endpoint: str = WS_ENDPOINT, trace_path: str = None):
+    """Test with the exact Flutter setup message including systemInstruction"""
+    with TRACER.session("flutter-parity"):
+        return await _run_flutter_parity(api_key, endpoint, trace_path)
+
+async def _run_flutter_parity(api_key, endpoint, trace_path):
+    log(f"\n{'='*60}")
+    log(f"TESTING WITH SYSTEM INSTRUCTION")
+    log(f"{'='*60}")
+    
+    url = f"{endpoint}?key={api_key}"
+    
+    setup_message = build_flutter_setup_message()
     
     log(f"Setup message (truncated):")
     log(f"  model: models/{MODEL}")
@@ -69,28 +96,39 @@ async def test_with_system_instruction(api_key: str):
     log(f"  voiceName: Kore")
     log(f"  systemInstruction: {len(SYSTEM_INSTRUCTION)} chars")
     
-    start_time = time.time()
+    recorder = None
+    if trace_path:
+        # Imported lazily: gemini_live_trace itself imports this module
+        from gemini_live_trace import TraceRecorder, TracingWebSocket
+        recorder = TraceRecorder(trace_path)
+    
+    start_time = time.perf_counter()
     
     try:
         log("Opening WebSocket connection...")
         async with websockets.connect(url, close_timeout=5) as ws:
-            elapsed = (time.time() - start_time) * 1000
+            TRACER.event(CONNECT)
+            if recorder:
+                ws = TracingWebSocket(ws, recorder)
+            elapsed = (time.perf_counter() - start_time) * 1000
             log(f"✅ WebSocket connected ({elapsed:.0f}ms)")
             
             # Send setup message
             log("Sending setup message...")
-            await ws.send(json.dumps(setup_message))
+            TRACER.event(SEND_SETUP)
+            await ws.send(codec.dumps(setup_message))
             log("Setup message sent, waiting for response...")
             
             # Wait for setupComplete
             try:
                 response = await asyncio.wait_for(ws.recv(), timeout=15)
-                elapsed = (time.time() - start_time) * 1000
+                elapsed = (time.perf_counter() - start_time) * 1000
                 
-                data = json.loads(response)
+                data = codec.loads(response)
                 log(f"📨 Response received ({elapsed:.0f}ms)")
                 
                 if "setupComplete" in data:
+                    TRACER.event(SETUP_COMPLETE)
                     log(f"✅ SUCCESS with systemInstruction!")
                     
                     # Now test sending a text message with thoughtSignature
@@ -106,12 +144,17 @@ async def test_with_system_instruction(api_key: str):
                         "thoughtSignature": "test_signature_12345"  # This might cause issues!
                     }
                     log("Sending text message with thoughtSignature...")
-                    await ws.send(json.dumps(text_message))
+                    TRACER.event(SEND_TURN)
+                    await ws.send(codec.dumps(text_message))
                     
                     try:
                         response2 = await asyncio.wait_for(ws.recv(), timeout=10)
-                        data2 = json.loads(response2)
-                        log(f"📨 Response to text: {json.dumps(data2)[:300]}...")
+                        data2 = codec.loads(response2)
+                        if "serverContent" in data2:
+                            TRACER.event(FIRST_SERVER_CONTENT)
+                            if codec.is_audio_chunk(data2):
+                                TRACER.event(FIRST_AUDIO)
+                        log(f"📨 Response to text: {codec.preview(data2, 300)}...")
                         
                         if "error" in data2:
                             log(f"❌ Error with thoughtSignature: {data2['error']}")
@@ -128,30 +171,54 @@ async def test_with_system_instruction(api_key: str):
                     log(f"❌ Error from server: {error_msg}")
                     return False
                 else:
-                    log(f"⚠️ Unexpected response: {json.dumps(data)[:500]}")
+                    log(f"⚠️ Unexpected response: {codec.preview(data, 500)}")
                     return False
                     
             except asyncio.TimeoutError:
-                elapsed = (time.time() - start_time) * 1000
+                elapsed = (time.perf_counter() - start_time) * 1000
                 log(f"❌ TIMEOUT after {elapsed:.0f}ms")
                 return False
                 
     except Exception as e:
         log(f"❌ Connection error: {type(e).__name__}: {e}")
         return False
+    finally:
+        if recorder:
+            recorder.close()
+            log(f"🎞️ Trace: {recorder.records} frames written to {trace_path}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gemini Live API full Flutter-parity test")
+    parser.add_argument("api_key", nargs="?", default=os.environ.get("GEMINI_API_KEY"),
+                        help="Gemini API key (default: $GEMINI_API_KEY)")
+    parser.add_argument("--endpoint", default=WS_ENDPOINT,
+                        help="WebSocket endpoint, e.g. ws://127.0.0.1:8765 for gemini_live_standin_server.py")
+    parser.add_argument("--trace", help="record every frame to this binary trace (see gemini_live_trace.py)")
+    parser.add_argument("--chrome-trace", help="write Chrome trace-event JSON of the session here")
+    return parser.parse_args()
 
 async def main():
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if len(sys.argv) > 1:
-        api_key = sys.argv[1]
+    args = parse_args()
+    api_key = args.api_key
+    if not api_key and args.endpoint != WS_ENDPOINT:
+        api_key = "local-stand-in"  # the stand-in server ignores the key
     
     if not api_key:
         print("Usage: python3 test_gemini_live_full.py <API_KEY>")
         sys.exit(1)
     
     log(f"API Key: {api_key[:10]}...{api_key[-4:]}")
+    log(f"Endpoint: {args.endpoint}")
     
-    await test_with_system_instruction(api_key)
+    if args.chrome_trace:
+        TRACER.enable()
+    
+    await test_with_system_instruction(api_key, args.endpoint, args.trace)
+
+    if args.chrome_trace:
+        TRACER.write(args.chrome_trace)
+        log(f"\n🧭 Chrome trace written to {args.chrome_trace}")
+        print_summary(TRACER.summary(), log)
 
 if __name__ == "__main__":
     asyncio.run(main())
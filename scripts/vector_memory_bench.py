@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Offline ANN benchmark for the search_memory vector indexes
+
+supabase/migrations/20260105_vector_memory.sql indexes the 768-dim
+evidence_logs.embedding and conversation_turns.embedding columns with
+ivfflat (lists = 100). The Master Tracker (A-02..A-04) plans 3072-dim
+embeddings under HNSW (m = 16, ef_construction = 64). This script measures
+those parameters against a corpus shaped like ours: many users with a few
+hundred rows each, queried one user at a time.
+
+search_memory's semantics are reproduced exactly. Each source is searched
+for the user's rows with similarity 1 - cosine distance > p_match_threshold.
+The two sources are merged, ordered by similarity and limited to
+p_match_count. Exact top-k is computed with one matrix product per user and
+is the ground truth. It is also what the function does as written, since the
+threshold predicate and the ORDER BY over the UNION keep the planner off the
+vector indexes.
+
+When the indexes are used (ORDER BY embedding <=> q LIMIT k), pgvector
+searches the whole table and applies the user and threshold filters
+afterwards. ivfflat scans every row in the `probes` nearest lists; HNSW
+returns ef_search candidates. The local implementations below do the same
+(IVF: spherical k-means on 50 x lists sampled rows; HNSW: the paper's
+neighbour-selection heuristic, 2m links on layer 0), so recall@k shows how
+often the post-filter starves a query. SHORT is the share of queries
+returning fewer rows than exact search.
+
+Latencies are from these NumPy/Python implementations and are only
+comparable with each other. SCANNED (vectors compared per query) carries
+over to pgvector. Index sizes are given both for the local structures and
+as a pgvector on-disk estimate from 8 KB pages. Over 2000 dims, pgvector
+can only index halfvec, so the estimate uses 2-byte elements.
+
+Usage:
+    python3 scripts/vector_memory_bench.py
+    python3 scripts/vector_memory_bench.py --users 200 --rows-per-user 250 --lists 50,100,200 --probes 1,10
+    python3 scripts/vector_memory_bench.py --dim 3072 --skip-ivf --hnsw-m 16 --ef-search 40,100
+    python3 scripts/vector_memory_bench.py --corpus embeddings.npz --out bench.json
+"""
+
+import argparse
+import heapq
+import json
+import math
+import time
+
+import numpy as np
+
+# search_memory defaults
+MATCH_THRESHOLD = 0.65
+MATCH_COUNT = 10
+SOURCES = ("evidence", "conversation")
+
+# Synthetic corpus shape: rows are a shared topic, a per-user offset and noise, so a
+# user's rows on a topic match each other (~0.78) while other users' rows on the
+# same topic sit just under the threshold (~0.62) and crowd the global index
+TOPICS = 64
+TOPICS_PER_USER = 8
+USER_WEIGHT = 0.5
+ROW_NOISE = 0.6
+QUERY_NOISE = 0.3
+CONVERSATION_SHARE = 0.3
+
+# pgvector page layout, for size estimates
+PAGE_SIZE = 8192
+PAGE_USABLE = PAGE_SIZE - 24 - 16
+PGVECTOR_MAX_DIM = 2000
+PGVECTOR_HALFVEC_MAX_DIM = 4000
+KMEANS_SAMPLE_PER_LIST = 50
+
+
+def normalise(x):
+    return (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+
+
+class Corpus:
+    """Unit-norm embeddings with their user and source, sorted by user so each user's rows are contiguous."""
+
+    def __init__(self, vectors, users, sources):
+        order = np.lexsort((sources, users))
+        self.vectors = normalise(np.asarray(vectors, dtype=np.float32)[order])
+        self.users = np.asarray(users)[order]
+        self.sources = np.asarray(sources)[order]
+        self.user_ids, self.user_starts = np.unique(self.users, return_index=True)
+        self.user_ends = np.append(self.user_starts[1:], len(self.users))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def user_rows(self, user):
+        k = np.searchsorted(self.user_ids, user)
+        return slice(int(self.user_starts[k]), int(self.user_ends[k]))
+
+    @classmethod
+    def synthetic(cls, users, rows_per_user, dim, rng):
+        topics = normalise(rng.standard_normal((TOPICS, dim)))
+        offsets = normalise(rng.standard_normal((users, dim))) * USER_WEIGHT
+        user = np.repeat(np.arange(users), rows_per_user)
+        user_topics = np.stack([rng.choice(TOPICS, TOPICS_PER_USER, replace=False) for _ in range(users)])
+        topic = user_topics[user, rng.integers(0, TOPICS_PER_USER, len(user))]
+        noise = rng.standard_normal((len(user), dim)).astype(np.float32) * (ROW_NOISE / math.sqrt(dim))
+        sources = (rng.random(len(user)) < CONVERSATION_SHARE).astype(np.int8)
+        return cls(topics[topic] + offsets[user] + noise, user, sources)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        sources = data["sources"] if "sources" in data else np.zeros(len(data["users"]), dtype=np.int8)
+        return cls(data["embeddings"], data["users"], sources)
+
+    def save(self, path):
+        np.savez(path, embeddings=self.vectors, users=self.users, sources=self.sources)
+
+    def sample_queries(self, count, rng):
+        """Paraphrase-like queries: a random row of a random user plus a little noise."""
+        rows = rng.integers(0, len(self), count)
+        noise = rng.standard_normal((count, self.dim)).astype(np.float32) * (QUERY_NOISE / math.sqrt(self.dim))
+        return normalise(self.vectors[rows] + noise), self.users[rows]
+
+
+def exact_search(corpus, queries, query_users, threshold=MATCH_THRESHOLD, k=MATCH_COUNT):
+    """search_memory's result ids per query: one matrix product per user, then threshold and top-k."""
+    results = [None] * len(queries)
+    for user in np.unique(query_users):
+        rows = corpus.user_rows(user)
+        which = np.flatnonzero(query_users == user)
+        sims = queries[which] @ corpus.vectors[rows].T
+        for q, row in zip(which, sims):
+            hits = np.flatnonzero(row > threshold)
+            if len(hits) > k:
+                hits = hits[np.argpartition(-row[hits], k - 1)[:k]]
+            results[q] = rows.start + hits[np.argsort(-row[hits], kind="stable")]
+    return results
+
+
+class ExactIndex:
+    """Sequential scan of one user's rows, as search_memory runs today."""
+
+    def __init__(self, corpus, source):
+        self.corpus = corpus
+        self.source = source
+
+    def candidates(self, q, user):
+        rows = self.corpus.user_rows(user)
+        # Rows are sorted by (user, source), so this source's rows of the user are contiguous
+        lo, hi = np.searchsorted(self.corpus.sources[rows], [self.source, self.source + 1]) + rows.start
+        return np.arange(lo, hi), self.corpus.vectors[lo:hi] @ q, hi - lo
+
+    def memory_bytes(self):
+        return 0
+
+
+def kmeans(vectors, lists, rng, iterations=10):
+    """Spherical k-means on a sample of KMEANS_SAMPLE_PER_LIST rows per list, like ivfflat's build."""
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE_PER_LIST * lists), replace=False)]
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = normalise(sums)
+    return centroids
+
+
+class IVFFlatIndex:
+    """Inverted lists over k-means centroids; a query scans every row of its `probes` nearest lists."""
+
+    def __init__(self, corpus, ids, lists, rng):
+        self.corpus = corpus
+        vectors = corpus.vectors[ids]
+        self.centroids = kmeans(vectors, min(lists, len(ids)), rng)
+        assign = np.concatenate([np.argmax(vectors[i:i + 8192] @ self.centroids.T, axis=1)
+                                 for i in range(0, len(vectors), 8192)])
+        order = np.argsort(assign, kind="stable")
+        self.members = ids[order]
+        self.offsets = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+
+    def candidates(self, q, user, probes=1):
+        probes = min(probes, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ q), probes - 1)[:probes]
+        ids = np.concatenate([self.members[self.offsets[c]:self.offsets[c + 1]] for c in nearest])
+        return ids, self.corpus.vectors[ids] @ q, len(ids) + len(self.centroids)
+
+    def list_sizes(self):
+        return np.diff(self.offsets)
+
+    def memory_bytes(self):
+        return self.centroids.nbytes + self.members.nbytes + self.offsets.nbytes
+
+
+class HNSWIndex:
+    """Hierarchical navigable small world graph (Malkov & Yashunin), built one row at a time."""
+
+    def __init__(self, corpus, ids, m, ef_construction, rng):
+        self.corpus = corpus
+        self.ids = ids
+        self.data = corpus.vectors[ids]
+        self.m = m
+        self.ef_construction = ef_construction
+        self.levels = (-np.log(1 - rng.random(len(ids))) / math.log(m)).astype(int)
+        self.layers = [[[] for _ in range(len(ids))]] + [{} for _ in range(int(self.levels.max(initial=0)))]
+        self.entry = None
+        self.computed = 0
+        for i in range(len(ids)):
+            self._insert(i)
+
+    def _layer_m(self, layer):
+        return 2 * self.m if layer == 0 else self.m
+
+    def _search_layer(self, q, entries, ef, layer):
+        """Best `ef` (sim, node) pairs reachable from entries on one layer."""
+        graph = self.layers[layer]
+        visited = {node for _, node in entries}
+        candidates = [(-sim, node) for sim, node in entries]
+        heapq.heapify(candidates)
+        results = list(entries)
+        heapq.heapify(results)
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if -neg_sim < results[0][0] and len(results) >= ef:
+                break
+            fresh = [n for n in graph[node] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            self.computed += len(fresh)
+            for sim, n in zip((self.data[fresh] @ q).tolist(), fresh):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, n))
+                    heapq.heappush(results, (sim, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return results
+
+    def _select(self, scored, m):
+        """Neighbour-selection heuristic: keep a candidate only if it is closer to the base than to any kept one."""
+        scored = sorted(scored, reverse=True)
+        if len(scored) <= m:
+            return [node for _, node in scored]
+        nodes = [node for _, node in scored]
+        sims = np.array([sim for sim, _ in scored], dtype=np.float32)
+        vecs = self.data[nodes]
+        pairwise = vecs @ vecs.T
+        kept = []
+        for j in range(len(nodes)):
+            if not kept or sims[j] > pairwise[j, kept].max():
+                kept.append(j)
+                if len(kept) == m:
+                    break
+        return [nodes[j] for j in kept]
+
+    def _insert(self, i):
+        q = self.data[i]
+        level = int(self.levels[i])
+        for layer in range(1, level + 1):
+            self.layers[layer][i] = []
+        if self.entry is None:
+            self.entry, self.top = i, level
+            return
+
+        entries = [(float(self.data[self.entry] @ q), self.entry)]
+        for layer in range(self.top, level, -1):
+            entries = [max(self._search_layer(q, entries, 1, layer))]
+        for layer in range(min(level, self.top), -1, -1):
+            found = self._search_layer(q, entries, self.ef_construction, layer)
+            limit = self._layer_m(layer)
+            graph = self.layers[layer]
+            graph[i] = self._select(found, limit)
+            for n in graph[i]:
+                links = graph[n]
+                links.append(i)
+                if len(links) > limit:
+                    graph[n] = self._select(list(zip((self.data[links] @ self.data[n]).tolist(), links)), limit)
+            entries = found
+        if level > self.top:
+            self.entry, self.top = i, level
+
+    def candidates(self, q, user, ef_search=40):
+        self.computed = 1
+        entries = [(float(self.data[self.entry] @ q), self.entry)]
+        for layer in range(self.top, 0, -1):
+            entries = [max(self._search_layer(q, entries, 1, layer))]
+        found = self._search_layer(q, entries, ef_search, 0)
+        nodes = np.array([node for _, node in found], dtype=np.int64)
+        return self.ids[nodes], np.array([sim for sim, _ in found], dtype=np.float32), self.computed
+
+    def link_counts(self):
+        return [sum(len(links) for links in (layer if isinstance(layer, list) else layer.values()))
+                for layer in self.layers]
+
+    def memory_bytes(self):
+        # int32 neighbour ids plus one level byte per node
+        return 4 * sum(self.link_counts()) + len(self.levels)
+
+
+def _tuple_bytes(payload):
+    # IndexTupleData header, MAXALIGNed, plus its line pointer
+    return (8 + payload + 7) // 8 * 8 + 4
+
+
+def pgvector_bytes(index, dim):
+    """Rough on-disk size of the equivalent pgvector index (vector, or halfvec above PGVECTOR_MAX_DIM)."""
+    element = 2 if dim > PGVECTOR_MAX_DIM else 4
+    vector = 8 + element * dim
+    if isinstance(index, IVFFlatIndex):
+        per_page = PAGE_USABLE // _tuple_bytes(vector)
+        # Each list's entries start on their own page chain; centroids fill pages of their own
+        pages = sum(-(-int(size) // per_page) for size in index.list_sizes() if size)
+        pages += -(-len(index.centroids) // max(1, PAGE_USABLE // _tuple_bytes(vector + 8)))
+        return (pages + 1) * PAGE_SIZE
+    if isinstance(index, HNSWIndex):
+        # Element tuple (vector + up to 10 heap TIDs) and neighbour tuple ((level + 2) * m TIDs)
+        sizes = _tuple_bytes(vector + 64) + np.array([_tuple_bytes(8 + 6 * (level + 2) * index.m)
+                                                      for level in index.levels])
+        per_page = np.maximum(1, PAGE_USABLE // sizes)
+        return int(np.sum(1 / per_page) * PAGE_SIZE) + PAGE_SIZE
+    return 0
+
+
+def search_memory(corpus, indexes, q, user, threshold=MATCH_THRESHOLD, k=MATCH_COUNT, **params):
+    """search_memory over local indexes: candidates per source, user and threshold post-filter, merged top-k."""
+    found, scores, scanned = [], [], 0
+    for index in indexes:
+        ids, sims, computed = index.candidates(q, user, **params)
+        scanned += computed
+        keep = (corpus.users[ids] == user) & (sims > threshold)
+        found.append(ids[keep])
+        scores.append(sims[keep])
+    ids, sims = np.concatenate(found), np.concatenate(scores)
+    return ids[np.argsort(-sims, kind="stable")[:k]], scanned
+
+
+def run_queries(corpus, indexes, queries, query_users, truth, threshold, k, **params):
+    latencies, recalls, scanned, short = [], [], 0, 0
+    for q, user, expected in zip(queries, query_users, truth):
+        start = time.perf_counter()
+        ids, computed = search_memory(corpus, indexes, q, user, threshold, k, **params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        scanned += computed
+        short += len(ids) < len(expected)
+        if len(expected):
+            recalls.append(len(np.intersect1d(ids, expected)) / len(expected))
+    latencies = np.array(latencies)
+    return {
+        "recall": float(np.mean(recalls)) if recalls else None,
+        "short": short / len(queries),
+        "scanned": scanned / len(queries),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def build(corpus, make, label):
+    """One index per source, as the migration creates them; returns (indexes, build seconds)."""
+    start = time.perf_counter()
+    indexes = [make(np.flatnonzero(corpus.sources == s)) for s in range(len(SOURCES))
+               if np.any(corpus.sources == s)]
+    elapsed = time.perf_counter() - start
+    print(f"  built {label} in {elapsed:.1f}s")
+    return indexes, elapsed
+
+
+def print_row(row):
+    recall = f"{row['recall']:.3f}" if row["recall"] is not None else "-"
+    print(f"{row['index']:<8} {row['params']:<22} {row['build_s']:>7.1f} {row['local_mb']:>8.1f} "
+          f"{row['pgvector_mb']:>8.1f} {recall:>7} {row['short'] * 100:>6.1f}% {row['scanned']:>8.0f} "
+          f"{row['p50_ms']:>7.2f} {row['p95_ms']:>7.2f}")
+
+
+def parse_list(text):
+    return [int(x) for x in text.split(",") if x]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark IVF/HNSW parameters for search_memory")
+    parser.add_argument("--corpus", help="npz with embeddings, users and optional sources (0 evidence, 1 conversation)")
+    parser.add_argument("--save-corpus", help="write the synthetic corpus here as npz")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rows-per-user", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD, help="p_match_threshold")
+    parser.add_argument("--k", type=int, default=MATCH_COUNT, help="p_match_count")
+    parser.add_argument("--lists", type=parse_list, default=[25, 50, 100, 200])
+    parser.add_argument("--probes", type=parse_list, default=[1, 5, 10, 20])
+    parser.add_argument("--hnsw-m", type=parse_list, default=[16])
+    parser.add_argument("--ef-construction", type=parse_list, default=[64])
+    parser.add_argument("--ef-search", type=parse_list, default=[10, 40, 100, 200])
+    parser.add_argument("--skip-ivf", action="store_true")
+    parser.add_argument("--skip-hnsw", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write all rows as JSON here")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    if args.corpus:
+        corpus = Corpus.load(args.corpus)
+    else:
+        corpus = Corpus.synthetic(args.users, args.rows_per_user, args.dim, rng)
+        if args.save_corpus:
+            corpus.save(args.save_corpus)
+    queries, query_users = corpus.sample_queries(args.queries, rng)
+
+    print(f"Corpus: {len(corpus):,} rows x {corpus.dim} dims, {len(corpus.user_ids)} users, "
+          f"{np.mean(corpus.sources == 1) * 100:.0f}% conversation turns; {len(queries)} queries, "
+          f"threshold {args.threshold}, k {args.k}")
+    if corpus.dim > PGVECTOR_HALFVEC_MAX_DIM:
+        print(f"⚠️ pgvector cannot index {corpus.dim} dims at all (halfvec max {PGVECTOR_HALFVEC_MAX_DIM})")
+    elif corpus.dim > PGVECTOR_MAX_DIM:
+        print(f"⚠️ pgvector indexes vector up to {PGVECTOR_MAX_DIM} dims; {corpus.dim} dims needs halfvec "
+              f"(sizes below assume halfvec)")
+
+    start = time.perf_counter()
+    truth = exact_search(corpus, queries, query_users, args.threshold, args.k)
+    exact_s = time.perf_counter() - start
+    matched = sum(len(t) > 0 for t in truth)
+    print(f"Exact top-{args.k}: {exact_s * 1000:.0f}ms batched ({exact_s * 1e6 / len(queries):.0f}µs per query), "
+          f"{matched}/{len(queries)} queries match, {np.mean([len(t) for t in truth]):.1f} rows on average")
+    print(f"pgvector guidance for ivfflat: lists ≈ rows / 1000 = {max(1, len(corpus) // 1000)}\n")
+
+    rows = []
+
+    def record(index_name, params, indexes, build_s, **query_params):
+        stats = run_queries(corpus, indexes, queries, query_users, truth, args.threshold, args.k, **query_params)
+        row = dict(stats, index=index_name, params=params, build_s=build_s,
+                   local_mb=sum(ix.memory_bytes() for ix in indexes) / 2 ** 20,
+                   pgvector_mb=sum(pgvector_bytes(ix, corpus.dim) for ix in indexes) / 2 ** 20)
+        rows.append(row)
+        return row
+
+    results = [record("exact", "per-user scan", [ExactIndex(corpus, s) for s in range(len(SOURCES))], 0.0)]
+    if not args.skip_ivf:
+        for lists in args.lists:
+            indexes, build_s = build(corpus, lambda ids: IVFFlatIndex(corpus, ids, lists, rng), f"ivfflat lists={lists}")
+            for probes in args.probes:
+                if probes <= lists:
+                    results.append(record("ivfflat", f"lists={lists} probes={probes}", indexes, build_s,
+                                          probes=probes))
+    if not args.skip_hnsw:
+        for m in args.hnsw_m:
+            for ef_construction in args.ef_construction:
+                indexes, build_s = build(corpus, lambda ids: HNSWIndex(corpus, ids, m, ef_construction, rng),
+                                         f"hnsw m={m} ef_construction={ef_construction}")
+                for ef_search in args.ef_search:
+                    results.append(record("hnsw", f"m={m} efc={ef_construction} ef={ef_search}", indexes, build_s,
+                                          ef_search=ef_search))
+
+    print(f"\n{'INDEX':<8} {'PARAMS':<22} {'BUILD s':>7} {'LOCAL MB':>8} {'PGVEC MB':>8} "
+          f"{'R@' + str(args.k):>7} {'SHORT':>7} {'SCANNED':>8} {'P50 ms':>7} {'P95 ms':>7}")
+    for row in results:
+        print_row(row)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"rows": len(corpus), "dim": corpus.dim, "users": len(corpus.user_ids),
+                       "queries": len(queries), "threshold": args.threshold, "k": args.k, "results": rows},
+                      f, indent=2)
+        print(f"\n💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Offline yt-dlp stand-in for fetch_sounds.py
+
+Understands the two invocations fetch_sounds.py makes:
+  --dump-json ytsearchN:<query>   -> N candidate JSON lines, one every --resolve-ms
+  -x ... -o <path> <url>          -> a WAV tone of the candidate's duration, padded
+                                     with silence, written to <path> after --download-ms
+
+Delays come from YT_DLP_STANDIN_RESOLVE_MS / YT_DLP_STANDIN_DOWNLOAD_MS so the
+pipeline can be timed without network access.
+
+Usage:
+    YT_DLP=scripts/yt_dlp_standin.py python3 scripts/fetch_sounds.py --pipeline
+"""
+
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+import time
+import wave
+
+RESOLVE_MS = float(os.environ.get("YT_DLP_STANDIN_RESOLVE_MS", "400"))
+DOWNLOAD_MS = float(os.environ.get("YT_DLP_STANDIN_DOWNLOAD_MS", "1500"))
+CHANNELS = ["Pixabay", "Some Uploader", "Audio Library", "Free Sound Effects", "Tiny Channel"]
+
+
+def search(spec: str):
+    prefix, _, query = spec.partition(":")
+    limit = int(prefix[len("ytsearch"):] or 1)
+    for i in range(limit):
+        time.sleep(RESOLVE_MS / 1000)
+        digest = hashlib.sha1(f"{query}/{i}".encode()).hexdigest()
+        print(json.dumps({
+            "id": digest[:11],
+            "title": f"{query} #{i}" + (" royalty free" if i % 2 else ""),
+            "uploader": CHANNELS[i % len(CHANNELS)],
+            "channel": CHANNELS[i % len(CHANNELS)],
+            "channel_follower_count": int(digest[:6], 16) * 10,
+            "duration": 2 + int(digest[6:8], 16) % 30,
+            "webpage_url": f"https://www.youtube.com/watch?v={digest[:11]}",
+        }), flush=True)
+
+
+def download(path: str, url: str):
+    time.sleep(DOWNLOAD_MS / 1000)
+    rate = 16000
+    video_id = url.rsplit("=", 1)[-1]
+    # Same duration search() reported for this ID (its hex digits 6-8)
+    duration = 2 + int(video_id[6:8], 16) % 30
+    freq = 220 + int(video_id[:2], 16)
+    silence = [0] * (rate // 2)
+    tone = [int(8000 * math.sin(2 * math.pi * freq * i / rate)) for i in range(rate * duration)]
+    samples = silence + tone + silence * 2
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+
+
+def main():
+    args = sys.argv[1:]
+    if "--dump-json" in args:
+        search(args[-1])
+    elif "-o" in args:
+        download(args[args.index("-o") + 1], args[-1])
+    else:
+        print(f"yt_dlp_standin: unsupported arguments {args}", file=sys.stderr)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()